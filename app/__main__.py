@@ -0,0 +1,160 @@
+# __main__.py
+# Production launcher, run from the repository root:
+#
+#   python -m app serve --workers 4              # Flask app (app.py) on gunicorn
+#   python -m app serve --workers 4 --asgi       # async app (asgi.py) on uvicorn workers
+#   python -m app rollups rebuild                # recompute flight_rollups from flights
+#   python -m app rollups check                  # compare flight_rollups with a recomputation
+#   python -m app partitions ensure              # create the flights partitions for the months ahead
+#   python -m app partitions archive             # move completed months past retention to the archive
+#
+# The app is imported once in the master and workers are forked from it. Connection
+# pools are reset in each worker right after fork, so no socket is ever shared
+# between processes. Pool sizing comes from database/config.py (DB_POOL_* variables).
+import argparse
+import os
+import sys
+from datetime import timedelta
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Modules in this directory import each other as top-level modules (app, models, database,
+# services), as when run from inside app/. Forget the 'app' package -m just imported so
+# that 'import app' finds app.py.
+sys.path.insert(0, APP_DIR)
+sys.modules.pop('app', None)
+
+from database import config  # noqa: E402
+
+
+def load_application(use_asgi):
+    if use_asgi:
+        import asgi
+        return asgi.app
+    from app import app
+    return app
+
+
+def reset_pools_after_fork(server, worker):
+    """gunicorn post_fork hook: drop pooled connections inherited from the master."""
+    from models import db
+    from app import app
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False leaves the parent's sockets alone and just forgets them
+            engine.dispose(close=False)
+    if 'asgi' in sys.modules:
+        sys.modules['asgi'].engine.sync_engine.dispose(close=False)
+
+
+def flush_write_behind(server, worker):
+    """gunicorn worker_exit hook: write buffered telemetry before the worker goes away."""
+    from services.write_behind import write_behind_buffer
+    write_behind_buffer.stop()
+
+
+def serve(args):
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            options = {
+                'bind': args.bind,
+                'workers': args.workers,
+                'preload_app': True,
+                'post_fork': reset_pools_after_fork,
+                'worker_exit': flush_write_behind,
+                'timeout': args.timeout,
+                'graceful_timeout': args.timeout,
+                # Recycle workers now and then so slow leaks cannot accumulate
+                'max_requests': 10000,
+                'max_requests_jitter': 1000,
+            }
+            if args.asgi:
+                options['worker_class'] = 'uvicorn.workers.UvicornWorker'
+            else:
+                # Threads let one worker hold SSE streams while still serving requests
+                options['worker_class'] = 'gthread'
+                options['threads'] = args.threads
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_application(args.asgi)
+
+    Server().run()
+
+
+def run_rollups(args):
+    from app import app
+    from services import rollups
+
+    with app.app_context():
+        if args.action == 'rebuild':
+            print(f"flight_rollups rebuilt: {rollups.rebuild()} rows")
+            return 0
+        count, examples = rollups.check()
+        if not count:
+            print("flight_rollups match a full recomputation")
+            return 0
+        print(f"flight_rollups differ from a full recomputation in {count} rows, e.g.:")
+        for source, row in examples:
+            print(f"  {source:<8} {tuple(row)[1:]}")
+        return 1
+
+
+def run_partitions(args):
+    from app import app
+    from services import partitions
+
+    with app.app_context():
+        if not partitions.is_partitioned():
+            print("flights is not a partitioned table (load database/airport_tracker.sql)")
+            return 1
+        if args.action == 'ensure':
+            created = partitions.ensure(args.months_ahead)
+            print(f"Created {created} partitions ({args.months_ahead} months ahead)")
+        elif args.action == 'archive':
+            reports = partitions.archive(timedelta(days=args.retention_days), dry_run=args.dry_run)
+            for report in reports:
+                detail = f", {report['unfinished']} unfinished" if report['action'] == 'blocked' else ''
+                print(f"{report['partition']:<16} {report['action']:<14} {report['rows']} flights{detail}")
+            if not reports:
+                print(f"No months ended more than {args.retention_days} days ago")
+        else:
+            for partition in partitions.list_partitions():
+                print(f"{partition['name']:<16} {partition['start']:%Y-%m-%d} to {partition['end']:%Y-%m-%d}  "
+                      f"~{partition['estimated_rows']} flights")
+            archived_before = partitions.archived_before()
+            if archived_before:
+                print(f"Archived in {partitions.ARCHIVE_SCHEMA}: everything before {archived_before:%Y-%m-%d}")
+    return 0
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(prog='python -m app')
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help='Run the API with pre-forked workers')
+    serve_parser.add_argument('--workers', type=int, default=config.SERVER_WORKERS)
+    serve_parser.add_argument('--threads', type=int, default=config.SERVER_THREADS)
+    serve_parser.add_argument('--bind', default=config.SERVER_BIND)
+    serve_parser.add_argument('--timeout', type=int, default=30)
+    serve_parser.add_argument('--asgi', action='store_true', help='Serve asgi.py instead of app.py')
+    rollups_parser = commands.add_parser('rollups', help='Rebuild or verify the on-time performance rollups')
+    rollups_parser.add_argument('action', choices=('rebuild', 'check'))
+    partitions_parser = commands.add_parser('partitions', help='Create or archive monthly flights partitions')
+    partitions_parser.add_argument('action', choices=('ensure', 'archive', 'list'))
+    partitions_parser.add_argument('--months-ahead', type=int, default=config.PARTITION_MONTHS_AHEAD)
+    partitions_parser.add_argument('--retention-days', type=int, default=config.ARCHIVE_RETENTION_DAYS)
+    partitions_parser.add_argument('--dry-run', action='store_true', help='report what archive would do')
+    args = arg_parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args)
+    elif args.command == 'rollups':
+        sys.exit(run_rollups(args))
+    elif args.command == 'partitions':
+        sys.exit(run_partitions(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,16 @@
 # app.py
-from flask import Flask, request, jsonify
+import queue
+from urllib.parse import urlencode
+from flask import Flask, request, jsonify, Response, stream_with_context
 from models import db, Airline, Airport, Flight, init_db
-from database import config
+from database import config, pool
+from database.routing import replica_router
+from services import bulk, export, flight_api, metrics, partitions, rollups
+from services.reference_cache import reference_cache
+from services.airport_index import airport_index, parse_nearby_args
+from services.timetable import timetable, parse_itinerary_args
+from services.events import event_bus, Subscription
+from services.write_behind import write_behind_buffer, parse_telemetry, overlay, BufferFull
 
 app = Flask(__name__)
 
@@ -9,9 +18,17 @@ app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = config.SQLALCHEMY_DATABASE_URI
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = config.SQLALCHEMY_TRACK_MODIFICATIONS
 app.config['SECRET_KEY'] = config.SECRET_KEY
+# Pool size/overflow/timeouts and server-side statement_timeout from config.py
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = pool.engine_options()
+# One bind per read replica; GET requests are routed to them (database/routing.py)
+app.config['SQLALCHEMY_BINDS'] = replica_router.binds()
 
 # Initialize the database with the app
 init_db(app)
+# Per-route latency/SQL/size metrics for GET /metrics
+metrics.instrument(app)
+if config.DATABASE_REPLICA_URLS:
+    replica_router.instrument(app)
 
 # --- Helper Functions ---
 def get_or_404(model, identifier):
@@ -21,11 +38,75 @@ def get_or_404(model, identifier):
         return jsonify({"message": f"{model.__name__} not found"}), 404
     return obj
 
+def run_bulk_ingest(model):
+    """Shared handler for the bulk endpoints: parses a JSON array or NDJSON body and ingests it."""
+    policy = request.args.get('on_conflict', 'error')
+    if policy not in bulk.CONFLICT_POLICIES:
+        return jsonify({"message": f"Invalid on_conflict policy. Use one of {', '.join(bulk.CONFLICT_POLICIES)}."}), 400
+
+    is_ndjson = request.mimetype in ('application/x-ndjson', 'application/jsonl')
+    try:
+        report = bulk.bulk_ingest(model, bulk.iter_records(request.stream, is_ndjson), policy)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"message": "Invalid JSON or NDJSON body", "error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Failed to ingest {model.__tablename__}", "error": str(e)}), 500
+    finally:
+        if model is not Flight:
+            reference_cache.invalidate(model)
+        if model is Airport:
+            airport_index.invalidate()
+        if model is Flight:
+            timetable.invalidate()
+    return jsonify(report), 200
+
+def not_modified(etag, last_modified):
+    """Returns a 304 response if the request's validators still match, else None."""
+    if not flight_api.validators_match(request.if_none_match, request.if_modified_since, etag, last_modified):
+        return None
+    response = Response(status=304)
+    set_validators(response, etag, last_modified)
+    return response
+
+def set_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+def flights_collection_validators(filters):
+    """Returns (etag, last_modified) for a filtered listing from max(updated_at) and count(*)."""
+    last_modified, count = db.session.execute(flight_api.collection_validators_statement(filters)).one()
+    return flight_api.collection_etag(last_modified, count, request.query_string.decode()), last_modified
+
 # --- Root Endpoint ---
 @app.route('/')
 def index():
     return jsonify({"message": "Welcome to the Flight Tracking MVP API!"})
 
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(reference_cache.stats()), 200
+
+@app.route('/pool/stats', methods=['GET'])
+def get_pool_stats():
+    return jsonify(pool.InstrumentedQueuePool.metrics.snapshot(db.engine.pool)), 200
+
+@app.route('/replicas/stats', methods=['GET'])
+def get_replica_stats():
+    return jsonify(replica_router.stats()), 200
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    body = metrics.request_metrics.render() + metrics.render_pool(pool.InstrumentedQueuePool.metrics, db.engine.pool)
+    if config.WRITE_BEHIND:
+        body += write_behind_buffer.render()
+    if config.DATABASE_REPLICA_URLS:
+        body += replica_router.render()
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
 # --- Airline CRUD Endpoints ---
 
 @app.route('/airlines', methods=['POST'])
@@ -47,26 +128,33 @@ def create_airline():
     try:
         db.session.add(new_airline)
         db.session.commit()
+        reference_cache.invalidate(Airline, new_airline.airline_id)
         return jsonify(new_airline.to_dict()), 201 # Created
     except Exception as e:
         db.session.rollback()
         return jsonify({"message": "Failed to create airline", "error": str(e)}), 500
 
+@app.route('/airlines/bulk', methods=['POST'])
+def create_airlines_bulk():
+    return run_bulk_ingest(Airline)
+
 @app.route('/airlines', methods=['GET'])
 def get_airlines():
     try:
-        all_airlines = Airline.query.all()
-        return jsonify([airline.to_dict() for airline in all_airlines]), 200
+        body, etag = reference_cache.get_all(Airline)
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({"message": "Failed to retrieve airlines", "error": str(e)}), 500
 
 
 @app.route('/airlines/<string:airline_id>', methods=['GET'])
 def get_airline(airline_id):
-    airline = get_or_404(Airline, airline_id)
-    if isinstance(airline, tuple): # Check if it's the 404 response
-        return airline
-    return jsonify(airline.to_dict()), 200
+    airline = reference_cache.get(Airline, airline_id)
+    if airline is None:
+        return jsonify({"message": "Airline not found"}), 404
+    return jsonify(airline), 200
 
 @app.route('/airlines/<string:airline_id>', methods=['PUT'])
 def update_airline(airline_id):
@@ -84,6 +172,7 @@ def update_airline(airline_id):
 
     try:
         db.session.commit()
+        reference_cache.invalidate(Airline, airline_id)
         return jsonify(airline.to_dict()), 200
     except Exception as e:
         db.session.rollback()
@@ -101,6 +190,7 @@ def delete_airline(airline_id):
 
         db.session.delete(airline)
         db.session.commit()
+        reference_cache.invalidate(Airline, airline_id)
         return jsonify({"message": "Airline deleted successfully"}), 200
     except Exception as e:
         db.session.rollback()
@@ -138,26 +228,47 @@ def create_airport():
     try:
         db.session.add(new_airport)
         db.session.commit()
+        reference_cache.invalidate(Airport, new_airport.airport_id)
+        airport_index.upsert(new_airport.to_dict())
         return jsonify(new_airport.to_dict()), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({"message": "Failed to create airport", "error": str(e)}), 500
 
 
+@app.route('/airports/bulk', methods=['POST'])
+def create_airports_bulk():
+    return run_bulk_ingest(Airport)
+
 @app.route('/airports', methods=['GET'])
 def get_airports():
     try:
-        all_airports = Airport.query.all()
-        return jsonify([airport.to_dict() for airport in all_airports]), 200
+        body, etag = reference_cache.get_all(Airport)
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({"message": "Failed to retrieve airports", "error": str(e)}), 500
 
+@app.route('/airports/nearby', methods=['GET'])
+def get_nearby_airports():
+    try:
+        latitude, longitude, k, radius_km = parse_nearby_args(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        nearby = airport_index.nearest(latitude, longitude, k, radius_km)
+    except Exception as e:
+        return jsonify({"message": "Failed to search airports", "error": str(e)}), 500
+    return jsonify([{**airport, "distance_km": round(distance, 3)} for airport, distance in nearby]), 200
+
 
 @app.route('/airports/<string:airport_id>', methods=['GET'])
 def get_airport(airport_id):
-    airport = get_or_404(Airport, airport_id)
-    if isinstance(airport, tuple): return airport
-    return jsonify(airport.to_dict()), 200
+    airport = reference_cache.get(Airport, airport_id)
+    if airport is None:
+        return jsonify({"message": "Airport not found"}), 404
+    return jsonify(airport), 200
 
 @app.route('/airports/<string:airport_id>', methods=['PUT'])
 def update_airport(airport_id):
@@ -184,6 +295,8 @@ def update_airport(airport_id):
 
     try:
         db.session.commit()
+        reference_cache.invalidate(Airport, airport_id)
+        airport_index.upsert(airport.to_dict())
         return jsonify(airport.to_dict()), 200
     except Exception as e:
         db.session.rollback()
@@ -202,6 +315,8 @@ def delete_airport(airport_id):
 
         db.session.delete(airport)
         db.session.commit()
+        reference_cache.invalidate(Airport, airport_id)
+        airport_index.remove(airport_id)
         return jsonify({"message": "Airport deleted successfully"}), 200
     except Exception as e:
         db.session.rollback()
@@ -210,114 +325,287 @@ def delete_airport(airport_id):
 
 # --- Flight CRUD Endpoints --- (Similar structure)
 # Note: Handling timestamps and foreign keys requires care
+# Parsing, queries and serialization live in services/flight_api.py, shared with asgi.py
 
 @app.route('/flights', methods=['POST'])
 def create_flight():
     data = request.get_json()
-    required = ['airline_id', 'flight_number', 'departure_airport', 'arrival_airport', 'scheduled_departure', 'scheduled_arrival']
-    if not data or not all(k in data for k in required):
+    if not data or not all(k in data for k in flight_api.FLIGHT_REQUIRED_FIELDS):
         return jsonify({"message": "Missing required fields"}), 400
 
-    # Validate foreign keys exist
-    if not db.session.get(Airline, data['airline_id']):
-        return jsonify({"message": f"Airline {data['airline_id']} not found"}), 400
-    if not db.session.get(Airport, data['departure_airport']):
-         return jsonify({"message": f"Departure airport {data['departure_airport']} not found"}), 400
-    if not db.session.get(Airport, data['arrival_airport']):
-         return jsonify({"message": f"Arrival airport {data['arrival_airport']} not found"}), 400
+    # Validate foreign keys exist (served from the reference cache)
+    for model, identifier, message in flight_api.flight_fk_checks(data):
+        if not reference_cache.exists(model, identifier):
+            return jsonify({"message": message}), 400
 
     try:
-        # Convert ISO timestamp strings back to datetime objects
-        # Basic error handling for timestamp format
-        from dateutil import parser
-        scheduled_departure = parser.isoparse(data['scheduled_departure'])
-        scheduled_arrival = parser.isoparse(data['scheduled_arrival'])
-        actual_departure = parser.isoparse(data['actual_departure']) if data.get('actual_departure') else None
-        actual_arrival = parser.isoparse(data['actual_arrival']) if data.get('actual_arrival') else None
-
+        new_flight = Flight(**flight_api.parse_new_flight(data))
     except ValueError:
          return jsonify({"message": "Invalid timestamp format. Use ISO 8601 format."}), 400
 
-    new_flight = Flight(
-        airline_id=data['airline_id'],
-        flight_number=data['flight_number'],
-        departure_airport=data['departure_airport'],
-        arrival_airport=data['arrival_airport'],
-        scheduled_departure=scheduled_departure,
-        scheduled_arrival=scheduled_arrival,
-        actual_departure=actual_departure, # Handle optional fields
-        actual_arrival=actual_arrival,     # Handle optional fields
-        status=data.get('status', 'Scheduled') # Use default if not provided
-    )
     try:
         db.session.add(new_flight)
         db.session.commit()
         # Access the auto-generated flight_id AFTER commit
-        return jsonify(new_flight.to_dict()), 201
+        flight_data = new_flight.to_dict()
+        event_bus.publish('created', flight_data)
+        timetable.upsert(flight_data)
+        return jsonify(flight_data), 201
     except Exception as e:
         db.session.rollback()
+        if partitions.is_missing_partition(e):
+            return jsonify({"message": partitions.MISSING_PARTITION_MESSAGE}), 422
         return jsonify({"message": "Failed to create flight", "error": str(e)}), 500
 
+@app.route('/flights/bulk', methods=['POST'])
+def create_flights_bulk():
+    return run_bulk_ingest(Flight)
+
+def publish_status_updates(flights):
+    """Called after each committed batch of PATCH /flights/status."""
+    for flight_data in flights:
+        event_bus.publish('updated', flight_data)
+        # Status changes only matter to the timetable when a flight is cancelled, or no
+        # longer is (write-behind flushes do not check transitions); the schedule is unchanged
+        if flight_data['status'] == 'Cancelled':
+            timetable.remove(flight_data['flight_id'])
+        elif not timetable.contains(flight_data['flight_id']):
+            timetable.upsert(flight_data)
+
+# Write-behind mode (WRITE_BEHIND=true) flushes buffered telemetry through the same path
+write_behind_buffer.configure(app, on_flushed=publish_status_updates)
+
+@app.route('/flights/status', methods=['PATCH'])
+def update_flight_statuses():
+    is_ndjson = request.mimetype in ('application/x-ndjson', 'application/jsonl')
+    try:
+        if config.WRITE_BEHIND:
+            # Transitions are checked against the stored statuses, so write buffered ones first
+            write_behind_buffer.flush(everything=True)
+        report = bulk.apply_status_updates(bulk.iter_records(request.stream, is_ndjson),
+                                           on_commit=publish_status_updates)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"message": "Invalid JSON or NDJSON body", "error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": "Failed to update flight statuses", "error": str(e)}), 500
+    return jsonify(report), 200
+
 @app.route('/flights', methods=['GET'])
 def get_flights():
-    # Optional query parameters for filtering (example)
-    status_filter = request.args.get('status')
-    airline_filter = request.args.get('airline_id')
+    # Optional keyset pagination and streaming
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit')
+    stream = request.args.get('stream')
+
+    try:
+        filters = flight_api.flight_filters(request.args)
+        serializer = flight_api.flight_serializer(request.args)
+        descending = flight_api.sort_descending(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    query = flight_api.flights_statement(filters, serializer, descending)
+
+    if stream:
+        if stream not in flight_api.STREAM_FORMATS:
+            return jsonify({"message": "Invalid stream format. Use 'json' or 'ndjson'."}), 400
+        mimetype = 'application/x-ndjson' if stream == 'ndjson' else 'application/json'
+        # Server-side cursor: memory stays flat however many rows match
+        rows = db.session.execute(query.execution_options(yield_per=flight_api.STREAM_BATCH_SIZE))
+        return Response(stream_with_context(flight_api.stream_chunks(rows, stream, serializer)), mimetype=mimetype)
+
+    if cursor is None and limit is None:
+        # Unpaginated listing kept for existing clients
+        try:
+            etag, last_modified = flights_collection_validators(filters)
+        except Exception as e:
+            return jsonify({"message": "Failed to retrieve flights", "error": str(e)}), 500
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return cached
+        try:
+            all_flights = db.session.execute(query).all()
+            response = Response(serializer.dumps(all_flights), mimetype='application/json')
+            return set_validators(response, etag, last_modified), 200
+        except Exception as e:
+            return jsonify({"message": "Failed to retrieve flights", "error": str(e)}), 500
 
-    query = Flight.query
-    if status_filter:
-        query = query.filter(Flight.status == status_filter)
-    if airline_filter:
-        query = query.filter(Flight.airline_id == airline_filter)
+    try:
+        page_size = flight_api.parse_page_size(limit)
+    except ValueError:
+        return jsonify({"message": flight_api.INVALID_LIMIT_MESSAGE}), 400
+    try:
+        query = flight_api.page_statement(query, cursor, page_size, descending)
+    except ValueError:
+        return jsonify({"message": "Invalid cursor"}), 400
 
     try:
-        all_flights = query.order_by(Flight.scheduled_departure.desc()).all()
-        return jsonify([flight.to_dict() for flight in all_flights]), 200
+        flights = db.session.execute(query).all()
     except Exception as e:
         return jsonify({"message": "Failed to retrieve flights", "error": str(e)}), 500
+    # Validated from the page's own rows; no Last-Modified, since it cannot reflect deletions
+    etag = flight_api.page_etag(flights, request.query_string.decode())
+    cached = not_modified(etag, None)
+    if cached:
+        return cached
+
+    response = Response(serializer.dumps(flights[:page_size]), mimetype='application/json')
+    if len(flights) > page_size:
+        next_cursor = flight_api.encode_cursor(flights[page_size - 1])
+        response.headers['X-Next-Cursor'] = next_cursor
+        args = request.args.to_dict()
+        args.update(cursor=next_cursor, limit=page_size)
+        next_url = f"{request.base_url}?{urlencode(args)}"
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return set_validators(response, etag, None), 200
+
+
+@app.route('/flights/export', methods=['GET'])
+def export_flights():
+    # Every matching flight, streamed in bounded memory (services/export.py)
+    try:
+        fmt = export.parse_format(request.args)
+        filters = flight_api.flight_filters(request.args)
+        serializer = flight_api.flight_serializer(request.args)
+        descending = flight_api.sort_descending(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if not export.available(fmt):
+        return jsonify({"message": f"Export as {fmt} requires pyarrow, which is not installed"}), 501
+
+    mimetype, extension = export.EXPORT_FORMATS[fmt]
+    chunks = export.export_chunks(db.session, export.export_statement(filters, serializer, descending), serializer, fmt)
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="flights.{extension}"'})
+
+
+@app.route('/flights/changes', methods=['GET'])
+def get_flight_changes():
+    since = request.args.get('since')
+    try:
+        page_size = flight_api.parse_page_size(request.args.get('limit'))
+    except ValueError:
+        return jsonify({"message": flight_api.INVALID_LIMIT_MESSAGE}), 400
+    try:
+        position = flight_api.decode_change_cursor(since) if since else (0, 0)
+    except ValueError:
+        return jsonify({"message": "Invalid cursor"}), 400
+
+    try:
+        rows = db.session.execute(flight_api.change_feed_statement(position, page_size)).all()
+        upsert_ids = [row.flight_id for row in rows[:page_size] if not row.deleted]
+        flights = {}
+        if upsert_ids:
+            flights = {
+                flight.flight_id: flight
+                for flight in db.session.execute(db.select(Flight).where(Flight.flight_id.in_(upsert_ids))).scalars()
+            }
+    except Exception as e:
+        return jsonify({"message": "Failed to retrieve flight changes", "error": str(e)}), 500
+
+    return jsonify(flight_api.change_feed_body(rows, flights, page_size, since)), 200
+
+
+@app.route('/flights/stream', methods=['GET'])
+def stream_flight_events():
+    statuses = request.args.get('status')
+    subscription = Subscription(
+        airline_id=request.args.get('airline_id'),
+        airport=request.args.get('airport'),
+        statuses=statuses.split(',') if statuses else None,
+        max_queue=config.EVENT_QUEUE_SIZE,
+    )
+
+    def generate():
+        event_bus.subscribe(subscription)
+        try:
+            yield flight_api.SSE_PREAMBLE
+            while True:
+                if subscription.overflowed and subscription.queue.empty():
+                    # Events were dropped; the client should resync from /flights/changes
+                    yield flight_api.SSE_OVERFLOW
+                    return
+                try:
+                    event = subscription.queue.get(timeout=config.SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield flight_api.SSE_KEEPALIVE
+                    continue
+                yield flight_api.sse_event(event)
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers=flight_api.SSE_HEADERS)
 
 
 @app.route('/flights/<int:flight_id>', methods=['GET'])
 def get_flight(flight_id):
+    pending = write_behind_buffer.pending_for(flight_id) if config.WRITE_BEHIND else None
+    if pending is not None:
+        # Read-your-writes: not yet flushed, so the stored validators would be stale
+        flight = get_or_404(Flight, flight_id)
+        if isinstance(flight, tuple): return flight
+        return jsonify(overlay(flight.to_dict(), pending)), 200
+
+    # Check validators against updated_at alone before loading the full row
+    updated_at = db.session.execute(
+        db.select(Flight.updated_at).where(Flight.flight_id == flight_id)
+    ).one_or_none()
+    if updated_at is None:
+        return jsonify({"message": "Flight not found"}), 404
+    updated_at = updated_at[0]
+    etag = flight_api.flight_etag(flight_id, updated_at)
+    cached = not_modified(etag, updated_at)
+    if cached:
+        return cached
+
     flight = get_or_404(Flight, flight_id)
     if isinstance(flight, tuple): return flight
-    return jsonify(flight.to_dict()), 200
+    # Tag the row actually sent, in case it changed between the two reads
+    response = jsonify(flight.to_dict())
+    return set_validators(response, flight_api.flight_etag(flight_id, flight.updated_at), flight.updated_at), 200
 
 @app.route('/flights/<int:flight_id>', methods=['PUT', 'PATCH']) # Allow PATCH for partial updates
 def update_flight(flight_id):
+    data = request.get_json()
+    if config.WRITE_BEHIND and data:
+        try:
+            telemetry = parse_telemetry(data)
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+        if telemetry is not None:
+            # The flight's last known row answers the request, so buffering reads nothing
+            flight_data = write_behind_buffer.known_row(flight_id)
+            if flight_data is None:
+                flight = get_or_404(Flight, flight_id)
+                if isinstance(flight, tuple): return flight
+                flight_data = write_behind_buffer.remember(flight.to_dict())
+            try:
+                write_behind_buffer.submit(flight_id, telemetry)
+            except BufferFull:
+                response = jsonify({"message": "Too many pending updates, retry later"})
+                response.headers['Retry-After'] = str(max(1, round(config.WRITE_BEHIND_FLUSH_INTERVAL)))
+                return response, 429
+            # Accepted; written by the next flush
+            return jsonify(overlay(flight_data, write_behind_buffer.pending_for(flight_id) or telemetry)), 202
+
     flight = get_or_404(Flight, flight_id)
     if isinstance(flight, tuple): return flight
 
-    data = request.get_json()
     if not data:
         return jsonify({"message": "No input data provided"}), 400
 
-    try:
-        from dateutil import parser
-        # Update only fields provided in the request
-        if 'airline_id' in data:
-            if not db.session.get(Airline, data['airline_id']): return jsonify({"message": f"Airline {data['airline_id']} not found"}), 400
-            flight.airline_id = data['airline_id']
-        if 'flight_number' in data:
-            flight.flight_number = data['flight_number']
-        if 'departure_airport' in data:
-            if not db.session.get(Airport, data['departure_airport']): return jsonify({"message": f"Departure airport {data['departure_airport']} not found"}), 400
-            flight.departure_airport = data['departure_airport']
-        if 'arrival_airport' in data:
-            if not db.session.get(Airport, data['arrival_airport']): return jsonify({"message": f"Arrival airport {data['arrival_airport']} not found"}), 400
-            flight.arrival_airport = data['arrival_airport']
-        if 'scheduled_departure' in data:
-            flight.scheduled_departure = parser.isoparse(data['scheduled_departure'])
-        if 'scheduled_arrival' in data:
-            flight.scheduled_arrival = parser.isoparse(data['scheduled_arrival'])
-        if 'actual_departure' in data:
-            flight.actual_departure = parser.isoparse(data['actual_departure']) if data['actual_departure'] else None
-        if 'actual_arrival' in data:
-            flight.actual_arrival = parser.isoparse(data['actual_arrival']) if data['actual_arrival'] else None
-        if 'status' in data:
-            # Optional: Validate against allowed flight_status ENUM values if needed
-            flight.status = data['status']
+    if config.WRITE_BEHIND:
+        # Written directly: apply anything still buffered first so this update wins
+        for field, value in (write_behind_buffer.take(flight_id) or {}).items():
+            setattr(flight, field, value)
 
+    try:
+        for model, identifier, message in flight_api.flight_fk_checks(data):
+            if not reference_cache.exists(model, identifier):
+                return jsonify({"message": message}), 400
+        for field, value in flight_api.parse_flight_changes(data).items():
+            setattr(flight, field, value)
     except ValueError:
          return jsonify({"message": "Invalid timestamp format. Use ISO 8601 format."}), 400
     except Exception as e:
@@ -326,9 +614,14 @@ def update_flight(flight_id):
 
     try:
         db.session.commit()
-        return jsonify(flight.to_dict()), 200
+        flight_data = flight.to_dict()
+        event_bus.publish('updated', flight_data)
+        timetable.upsert(flight_data)
+        return jsonify(flight_data), 200
     except Exception as e:
         db.session.rollback()
+        if partitions.is_missing_partition(e):
+            return jsonify({"message": partitions.MISSING_PARTITION_MESSAGE}), 422
         return jsonify({"message": "Failed to update flight", "error": str(e)}), 500
 
 
@@ -337,14 +630,91 @@ def delete_flight(flight_id):
     flight = get_or_404(Flight, flight_id)
     if isinstance(flight, tuple): return flight
 
+    if config.WRITE_BEHIND:
+        write_behind_buffer.take(flight_id)
+
     try:
+        # Snapshot before deleting so stream subscribers can filter the event
+        flight_data = flight.to_dict()
         db.session.delete(flight)
         db.session.commit()
+        event_bus.publish('deleted', flight_data)
+        timetable.remove(flight_id)
         return jsonify({"message": "Flight deleted successfully"}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({"message": "Failed to delete flight", "error": str(e)}), 500
 
+# --- On-Time Performance ---
+
+@app.route('/stats/airlines/<string:airline_id>', methods=['GET'])
+def get_airline_stats(airline_id):
+    if not reference_cache.exists(Airline, airline_id):
+        return jsonify({"message": "Airline not found"}), 404
+    try:
+        start, end, bucket = rollups.parse_stats_args(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        performance = rollups.performance('airline', airline_id, start, end, bucket)
+    except Exception as e:
+        return jsonify({"message": "Failed to retrieve airline statistics", "error": str(e)}), 500
+    return jsonify({
+        "airline_id": airline_id, "from": start.isoformat(), "to": end.isoformat(), "bucket": bucket, **performance,
+    }), 200
+
+@app.route('/stats/airports/<string:airport_id>', methods=['GET'])
+def get_airport_stats(airport_id):
+    if not reference_cache.exists(Airport, airport_id):
+        return jsonify({"message": "Airport not found"}), 404
+    try:
+        start, end, bucket = rollups.parse_stats_args(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        departures = rollups.performance('departure_airport', airport_id, start, end, bucket)
+        arrivals = rollups.performance('arrival_airport', airport_id, start, end, bucket)
+    except Exception as e:
+        return jsonify({"message": "Failed to retrieve airport statistics", "error": str(e)}), 500
+    return jsonify({
+        "airport_id": airport_id, "from": start.isoformat(), "to": end.isoformat(), "bucket": bucket,
+        "departures": departures, "arrivals": arrivals,
+    }), 200
+
+
+# --- Itinerary Search ---
+
+@app.route('/itineraries', methods=['GET'])
+def get_itineraries():
+    try:
+        origin, destination, depart_after, max_legs, min_connection = parse_itinerary_args(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    try:
+        journeys = timetable.search(origin, destination, depart_after, max_legs, min_connection)
+        leg_ids = {flight_id for journey in journeys for flight_id in journey}
+        legs = {}
+        if leg_ids:
+            flights = db.session.execute(db.select(Flight).where(Flight.flight_id.in_(leg_ids))).scalars()
+            legs = {flight.flight_id: flight.to_dict() for flight in flights}
+    except Exception as e:
+        return jsonify({"message": "Failed to search itineraries", "error": str(e)}), 500
+
+    itineraries = []
+    for journey in journeys:
+        if any(flight_id not in legs for flight_id in journey):
+            continue  # Deleted by another worker since this worker's timetable was loaded
+        flights = [legs[flight_id] for flight_id in journey]
+        itineraries.append({
+            "legs": len(flights),
+            "departure": flights[0]['scheduled_departure'],
+            "arrival": flights[-1]['scheduled_arrival'],
+            "flights": flights,
+        })
+    return jsonify({"itineraries": itineraries}), 200
+
+
 # --- Run the App ---
 if __name__ == '__main__':
     # Note: `debug=True` is helpful for development but should be `False` in production
@@ -0,0 +1,401 @@
+# asgi.py
+# Async entry point: serves the same routes and JSON contracts as app.py on asyncio,
+# with SQLAlchemy's async engine (asyncpg).
+#
+#   cd app && uvicorn asgi:app --workers 4
+#
+# The /flights routes, the hot path for dashboards and trackers, run natively here on
+# the parsing/query/serialization layer in services/flight_api.py that app.py also uses.
+# Every other route (airlines, airports, bulk ingest, cache stats) is answered by the
+# Flask app mounted underneath, so the two modes cannot drift apart.
+import asyncio
+import json
+from email.utils import format_datetime, parsedate_to_datetime
+from datetime import timezone
+from urllib.parse import urlencode
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+from app import app as flask_app
+from database import config, pool
+from models import Flight
+from services import flight_api, partitions
+from services.events import event_bus, AsyncSubscription
+from services.reference_cache import reference_cache
+from services.timetable import timetable
+from services.write_behind import write_behind_buffer, parse_telemetry, overlay, BufferFull
+
+engine = create_async_engine(config.ASYNC_SQLALCHEMY_DATABASE_URI, **pool.engine_options(async_driver=True))
+# Objects stay usable after commit; server-generated columns are reloaded with refresh()
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+
+# --- Helper Functions ---
+
+def message(text, status_code, **extra):
+    return JSONResponse({"message": text, **extra}, status_code=status_code)
+
+def json_bytes(body, status_code=200):
+    """Response for a body already encoded by services/fast_json.py."""
+    return Response(body, status_code=status_code, media_type='application/json')
+
+async def read_json(request):
+    """Returns the decoded body, or None if it is missing or not JSON (like Flask's get_json)."""
+    try:
+        return json.loads(await request.body())
+    except ValueError:
+        return None
+
+def if_none_match(request):
+    header = request.headers.get('if-none-match')
+    if not header:
+        return None
+    # Strong comparison: weak tags (W/"...") never match
+    return {tag.strip().strip('"') for tag in header.split(',') if not tag.strip().startswith('W/')}
+
+def if_modified_since(request):
+    header = request.headers.get('if-modified-since')
+    try:
+        return parsedate_to_datetime(header) if header else None
+    except (TypeError, ValueError):
+        return None
+
+def set_validators(response, etag, last_modified):
+    response.headers['ETag'] = f'"{etag}"'
+    if last_modified:
+        response.headers['Last-Modified'] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return response
+
+def not_modified(request, etag, last_modified):
+    if not flight_api.validators_match(if_none_match(request), if_modified_since(request), etag, last_modified):
+        return None
+    return set_validators(Response(status_code=304), etag, last_modified)
+
+async def reference_exists(session, model, identifier):
+    """FK check through the shared reference cache, loading misses with the async session."""
+    value, generation = reference_cache.peek(model, identifier)
+    if value is not None:
+        return True
+    obj = await session.get(model, identifier)
+    if obj is None:
+        return False
+    reference_cache.fill(model, identifier, obj.to_dict(), generation)
+    return True
+
+
+# --- Flight Endpoints ---
+
+async def get_flights(request):
+    args = request.query_params
+    cursor = args.get('cursor')
+    limit = args.get('limit')
+    stream = args.get('stream')
+
+    try:
+        filters = flight_api.flight_filters(args)
+        serializer = flight_api.flight_serializer(args)
+        descending = flight_api.sort_descending(args)
+    except ValueError as e:
+        return message(str(e), 400)
+    query = flight_api.flights_statement(filters, serializer, descending)
+
+    if stream:
+        if stream not in flight_api.STREAM_FORMATS:
+            return message("Invalid stream format. Use 'json' or 'ndjson'.", 400)
+
+        async def generate():
+            # The session lives as long as the stream; rows come from a server-side cursor
+            async with Session() as session:
+                rows = await session.stream(query.execution_options(yield_per=flight_api.STREAM_BATCH_SIZE))
+                yield flight_api.stream_open(stream)
+                first = True
+                async for row in rows:
+                    yield flight_api.stream_item(row, stream, first, serializer)
+                    first = False
+                yield flight_api.stream_close(stream)
+
+        media_type = 'application/x-ndjson' if stream == 'ndjson' else 'application/json'
+        return StreamingResponse(generate(), media_type=media_type)
+
+    page_size = None
+    if cursor is not None or limit is not None:
+        try:
+            page_size = flight_api.parse_page_size(limit)
+        except ValueError:
+            return message(flight_api.INVALID_LIMIT_MESSAGE, 400)
+
+    async with Session() as session:
+        if page_size is None:
+            try:
+                last_modified, count = (await session.execute(flight_api.collection_validators_statement(filters))).one()
+            except Exception as e:
+                return message("Failed to retrieve flights", 500, error=str(e))
+            etag = flight_api.collection_etag(last_modified, count, request.url.query)
+            cached = not_modified(request, etag, last_modified)
+            if cached:
+                return cached
+        else:
+            try:
+                query = flight_api.page_statement(query, cursor, page_size, descending)
+            except ValueError:
+                return message("Invalid cursor", 400)
+        try:
+            flights = (await session.execute(query)).all()
+        except Exception as e:
+            return message("Failed to retrieve flights", 500, error=str(e))
+
+    if page_size is None:
+        return set_validators(json_bytes(serializer.dumps(flights)), etag, last_modified)
+
+    # Validated from the page's own rows; no Last-Modified, since it cannot reflect deletions
+    etag = flight_api.page_etag(flights, request.url.query)
+    cached = not_modified(request, etag, None)
+    if cached:
+        return cached
+
+    response = json_bytes(serializer.dumps(flights[:page_size]))
+    if len(flights) > page_size:
+        next_cursor = flight_api.encode_cursor(flights[page_size - 1])
+        response.headers['X-Next-Cursor'] = next_cursor
+        next_args = dict(args)
+        next_args.update(cursor=next_cursor, limit=page_size)
+        response.headers['Link'] = f'<{request.url.replace(query=urlencode(next_args))}>; rel="next"'
+    return set_validators(response, etag, None)
+
+
+async def get_flight_changes(request):
+    since = request.query_params.get('since')
+    try:
+        page_size = flight_api.parse_page_size(request.query_params.get('limit'))
+    except ValueError:
+        return message(flight_api.INVALID_LIMIT_MESSAGE, 400)
+    try:
+        position = flight_api.decode_change_cursor(since) if since else (0, 0)
+    except ValueError:
+        return message("Invalid cursor", 400)
+
+    async with Session() as session:
+        try:
+            rows = (await session.execute(flight_api.change_feed_statement(position, page_size))).all()
+            upsert_ids = [row.flight_id for row in rows[:page_size] if not row.deleted]
+            flights = {}
+            if upsert_ids:
+                result = await session.execute(select(Flight).where(Flight.flight_id.in_(upsert_ids)))
+                flights = {flight.flight_id: flight for flight in result.scalars()}
+        except Exception as e:
+            return message("Failed to retrieve flight changes", 500, error=str(e))
+
+    return JSONResponse(flight_api.change_feed_body(rows, flights, page_size, since))
+
+
+async def stream_flight_events(request):
+    statuses = request.query_params.get('status')
+    subscription = AsyncSubscription(
+        asyncio.get_running_loop(),
+        airline_id=request.query_params.get('airline_id'),
+        airport=request.query_params.get('airport'),
+        statuses=statuses.split(',') if statuses else None,
+        max_queue=config.EVENT_QUEUE_SIZE,
+    )
+
+    async def generate():
+        event_bus.subscribe(subscription)
+        try:
+            yield flight_api.SSE_PREAMBLE
+            while True:
+                if subscription.overflowed and subscription.queue.empty():
+                    # Events were dropped; the client should resync from /flights/changes
+                    yield flight_api.SSE_OVERFLOW
+                    return
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), config.SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield flight_api.SSE_KEEPALIVE
+                    continue
+                yield flight_api.sse_event(event)
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(generate(), media_type='text/event-stream', headers=flight_api.SSE_HEADERS)
+
+
+async def create_flight(request):
+    data = await read_json(request)
+    if not data or not all(k in data for k in flight_api.FLIGHT_REQUIRED_FIELDS):
+        return message("Missing required fields", 400)
+
+    async with Session() as session:
+        for model, identifier, text in flight_api.flight_fk_checks(data):
+            if not await reference_exists(session, model, identifier):
+                return message(text, 400)
+
+        try:
+            new_flight = Flight(**flight_api.parse_new_flight(data))
+        except ValueError:
+            return message("Invalid timestamp format. Use ISO 8601 format.", 400)
+
+        try:
+            session.add(new_flight)
+            await session.commit()
+            # Load flight_id's row back with its server-side defaults
+            await session.refresh(new_flight)
+        except Exception as e:
+            await session.rollback()
+            if partitions.is_missing_partition(e):
+                return message(partitions.MISSING_PARTITION_MESSAGE, 422)
+            return message("Failed to create flight", 500, error=str(e))
+
+    flight_data = new_flight.to_dict()
+    await run_in_threadpool(event_bus.publish, 'created', flight_data)
+    await run_in_threadpool(timetable.upsert, flight_data)
+    return JSONResponse(flight_data, status_code=201)
+
+
+async def get_flight(request):
+    flight_id = request.path_params['flight_id']
+    pending = write_behind_buffer.pending_for(flight_id) if config.WRITE_BEHIND else None
+    if pending is not None:
+        # Read-your-writes: not yet flushed, so the stored validators would be stale
+        async with Session() as session:
+            flight = await session.get(Flight, flight_id)
+        if flight is None:
+            return message("Flight not found", 404)
+        return JSONResponse(overlay(flight.to_dict(), pending))
+
+    async with Session() as session:
+        # Check validators against updated_at alone before loading the full row
+        updated_at = (await session.execute(
+            select(Flight.updated_at).where(Flight.flight_id == flight_id)
+        )).one_or_none()
+        if updated_at is None:
+            return message("Flight not found", 404)
+        updated_at = updated_at[0]
+        cached = not_modified(request, flight_api.flight_etag(flight_id, updated_at), updated_at)
+        if cached:
+            return cached
+
+        flight = await session.get(Flight, flight_id)
+    if flight is None:
+        return message("Flight not found", 404)
+    response = JSONResponse(flight.to_dict())
+    return set_validators(response, flight_api.flight_etag(flight_id, flight.updated_at), flight.updated_at)
+
+
+async def update_flight(request):
+    flight_id = request.path_params['flight_id']
+    data = await read_json(request)
+    if config.WRITE_BEHIND and data:
+        try:
+            telemetry = parse_telemetry(data)
+        except ValueError as e:
+            return message(str(e), 400)
+        if telemetry is not None:
+            # The flight's last known row answers the request, so buffering reads nothing
+            flight_data = write_behind_buffer.known_row(flight_id)
+            if flight_data is None:
+                async with Session() as session:
+                    flight = await session.get(Flight, flight_id)
+                if flight is None:
+                    return message("Flight not found", 404)
+                flight_data = write_behind_buffer.remember(flight.to_dict())
+            try:
+                write_behind_buffer.submit(flight_id, telemetry)
+            except BufferFull:
+                return JSONResponse({"message": "Too many pending updates, retry later"}, status_code=429,
+                                    headers={'Retry-After': str(max(1, round(config.WRITE_BEHIND_FLUSH_INTERVAL)))})
+            # Accepted; written by the next flush
+            pending = write_behind_buffer.pending_for(flight_id) or telemetry
+            return JSONResponse(overlay(flight_data, pending), status_code=202)
+
+    async with Session() as session:
+        flight = await session.get(Flight, flight_id)
+        if flight is None:
+            return message("Flight not found", 404)
+
+        if not data:
+            return message("No input data provided", 400)
+
+        if config.WRITE_BEHIND:
+            # Written directly: apply anything still buffered first so this update wins
+            for field, value in (await run_in_threadpool(write_behind_buffer.take, flight_id) or {}).items():
+                setattr(flight, field, value)
+
+        try:
+            for model, identifier, text in flight_api.flight_fk_checks(data):
+                if not await reference_exists(session, model, identifier):
+                    return message(text, 400)
+            for field, value in flight_api.parse_flight_changes(data).items():
+                setattr(flight, field, value)
+        except ValueError:
+            return message("Invalid timestamp format. Use ISO 8601 format.", 400)
+        except Exception as e:
+            return message("Failed to parse update data", 400, error=str(e))
+
+        try:
+            await session.commit()
+            # updated_at is set by the database
+            await session.refresh(flight)
+        except Exception as e:
+            await session.rollback()
+            if partitions.is_missing_partition(e):
+                return message(partitions.MISSING_PARTITION_MESSAGE, 422)
+            return message("Failed to update flight", 500, error=str(e))
+
+    flight_data = flight.to_dict()
+    await run_in_threadpool(event_bus.publish, 'updated', flight_data)
+    await run_in_threadpool(timetable.upsert, flight_data)
+    return JSONResponse(flight_data)
+
+
+async def delete_flight(request):
+    flight_id = request.path_params['flight_id']
+    async with Session() as session:
+        flight = await session.get(Flight, flight_id)
+        if flight is None:
+            return message("Flight not found", 404)
+        if config.WRITE_BEHIND:
+            await run_in_threadpool(write_behind_buffer.take, flight_id)
+
+        try:
+            # Snapshot before deleting so stream subscribers can filter the event
+            flight_data = flight.to_dict()
+            await session.delete(flight)
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            return message("Failed to delete flight", 500, error=str(e))
+
+    await run_in_threadpool(event_bus.publish, 'deleted', flight_data)
+    await run_in_threadpool(timetable.remove, flight_id)
+    return message("Flight deleted successfully", 200)
+
+
+async def flush_write_behind():
+    # Buffered telemetry is written with the Flask app's (sync) engine
+    await run_in_threadpool(write_behind_buffer.stop)
+
+
+async def dispose_engine():
+    await engine.dispose()
+
+
+app = Starlette(
+    routes=[
+        Route('/flights', get_flights, methods=['GET']),
+        Route('/flights', create_flight, methods=['POST']),
+        Route('/flights/changes', get_flight_changes, methods=['GET']),
+        Route('/flights/stream', stream_flight_events, methods=['GET']),
+        Route('/flights/{flight_id:int}', get_flight, methods=['GET']),
+        Route('/flights/{flight_id:int}', update_flight, methods=['PUT', 'PATCH']),
+        Route('/flights/{flight_id:int}', delete_flight, methods=['DELETE']),
+        # Everything else is served by the Flask app in a thread pool
+        Mount('/', app=WSGIMiddleware(flask_app)),
+    ],
+    on_shutdown=[flush_write_behind, dispose_engine],
+)
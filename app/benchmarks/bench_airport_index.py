@@ -0,0 +1,124 @@
+# bench_airport_index.py
+# k-nearest airports: the in-memory index (services/airport_index.py) versus a SQL haversine
+# scan ordered by distance. Seeds a world-sized set of synthetic airports clustered around
+# random population centres, checks that both return the same airports, then times them.
+#
+# Run from the app/ directory. Uses an in-memory SQLite database (math functions registered
+# from Python) unless --database-uri points at a scratch PostgreSQL database:
+#   python -m benchmarks.bench_airport_index --airports 40000
+import argparse
+import math
+import random
+import string
+import time
+
+from flask import Flask
+from sqlalchemy import event, func, select
+
+from models import db, Airport
+from services.airport_index import airport_index, EARTH_RADIUS_KM
+
+ID_ALPHABET = string.ascii_uppercase + string.digits
+
+
+def airport_code(i, length):
+    code = ''
+    for _ in range(length):
+        i, digit = divmod(i, len(ID_ALPHABET))
+        code += ID_ALPHABET[digit]
+    return code
+
+
+def seed(count):
+    rng = random.Random(42)
+    centres = [(rng.uniform(-55, 70), rng.uniform(-180, 180)) for _ in range(count // 100 + 1)]
+    rows = []
+    for i in range(count):
+        lat, lon = rng.choice(centres)
+        rows.append({
+            'airport_id': airport_code(i, 3),
+            'icao_code': airport_code(i, 4),
+            'name': f'Bench Airport {i}',
+            'city': 'Bench City',
+            'country': 'Benchland',
+            'latitude': round(max(-90.0, min(90.0, rng.gauss(lat, 4))), 6),
+            'longitude': round((rng.gauss(lon, 4) + 180) % 360 - 180, 6),
+        })
+    db.session.execute(Airport.__table__.insert(), rows)
+    db.session.commit()
+
+
+def register_sqlite_math(engine):
+    @event.listens_for(engine, 'connect')
+    def connect(dbapi_connection, connection_record):
+        for name, fn in (('sin', math.sin), ('cos', math.cos), ('asin', math.asin),
+                         ('sqrt', math.sqrt), ('radians', math.radians)):
+            dbapi_connection.create_function(name, 1, fn)
+
+
+def haversine_statement(latitude, longitude, k):
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2, lon2 = func.radians(Airport.latitude), func.radians(Airport.longitude)
+    h = (func.sin((lat2 - lat1) / 2) * func.sin((lat2 - lat1) / 2)
+         + math.cos(lat1) * func.cos(lat2) * func.sin((lon2 - lon1) / 2) * func.sin((lon2 - lon1) / 2))
+    distance = (2 * EARTH_RADIUS_KM * func.asin(func.sqrt(h))).label('distance_km')
+    return select(Airport.airport_id, distance).order_by(distance, Airport.airport_id).limit(k)
+
+
+def measure(name, fn, queries):
+    timings = []
+    for latitude, longitude in queries:
+        start = time.perf_counter()
+        fn(latitude, longitude)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    mean = sum(timings) / len(timings)
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f"{name:<10} mean {mean * 1000:9.3f} ms   p99 {p99 * 1000:9.3f} ms")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--airports', type=int, default=40000)
+    arg_parser.add_argument('--queries', type=int, default=1000)
+    arg_parser.add_argument('--sql-queries', type=int, default=50)
+    arg_parser.add_argument('--k', type=int, default=10)
+    arg_parser.add_argument('--database-uri', default='sqlite://')
+    args = arg_parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.database_uri
+    db.init_app(app)
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            register_sqlite_math(db.engine)
+        db.create_all()
+        try:
+            seed(args.airports)
+            rng = random.Random(7)
+            queries = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(args.queries)]
+
+            start = time.perf_counter()
+            airport_index.invalidate()
+            airport_index.nearest(0, 0, 1)
+            print(f"index load + build: {(time.perf_counter() - start) * 1000:.0f} ms for {args.airports} airports")
+
+            def index_knn(latitude, longitude):
+                return [a['airport_id'] for a, _ in airport_index.nearest(latitude, longitude, args.k)]
+
+            def sql_knn(latitude, longitude):
+                return db.session.execute(haversine_statement(latitude, longitude, args.k)).scalars().all()
+
+            for latitude, longitude in queries[:args.sql_queries]:
+                assert index_knn(latitude, longitude) == sql_knn(latitude, longitude), (latitude, longitude)
+            print(f"results match on {args.sql_queries} queries (k={args.k})")
+
+            measure('index', index_knn, queries)
+            measure('sql', sql_knn, queries[:args.sql_queries])
+        finally:
+            db.session.rollback()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
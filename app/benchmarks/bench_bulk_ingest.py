@@ -0,0 +1,88 @@
+# bench_bulk_ingest.py
+# Compares POST /flights (one row per request) with POST /flights/bulk.
+#
+# Run from the app/ directory against the database in database/config.py:
+#   python -m benchmarks.bench_bulk_ingest --rows 5000
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from app import app
+from models import db, Airline, Airport, Flight
+from services import partitions
+
+BENCH_START = datetime(2030, 1, 1, tzinfo=timezone.utc)
+BENCH_AIRLINE = {'airline_id': 'ZZB', 'iata_code': 'Z9', 'name': 'Benchmark Air', 'country': 'Nowhere'}
+BENCH_AIRPORTS = [
+    {'airport_id': 'ZZA', 'icao_code': 'ZZZA', 'name': 'Bench A', 'city': 'A', 'country': 'Nowhere',
+     'latitude': 10.0, 'longitude': 10.0},
+    {'airport_id': 'ZZC', 'icao_code': 'ZZZC', 'name': 'Bench C', 'city': 'C', 'country': 'Nowhere',
+     'latitude': 20.0, 'longitude': 20.0},
+]
+
+
+def make_flights(count, prefix):
+    for i in range(count):
+        departure = BENCH_START + timedelta(minutes=i)
+        yield {
+            'airline_id': 'ZZB',
+            'flight_number': f'{prefix}{i}',
+            'departure_airport': 'ZZA',
+            'arrival_airport': 'ZZC',
+            'scheduled_departure': departure.isoformat(),
+            'scheduled_arrival': (departure + timedelta(hours=2)).isoformat(),
+        }
+
+
+def cleanup():
+    with app.app_context():
+        Flight.query.filter_by(airline_id='ZZB').delete()
+        Airport.query.filter(Airport.airport_id.in_(['ZZA', 'ZZC'])).delete()
+        Airline.query.filter_by(airline_id='ZZB').delete()
+        db.session.commit()
+
+
+def bench_single(client, rows):
+    start = time.perf_counter()
+    for flight in make_flights(rows, 'S'):
+        response = client.post('/flights', json=flight)
+        assert response.status_code == 201, response.get_json()
+    return time.perf_counter() - start
+
+
+def bench_bulk(client, rows):
+    body = '\n'.join(json.dumps(flight) for flight in make_flights(rows, 'B'))
+    start = time.perf_counter()
+    response = client.post('/flights/bulk', data=body, content_type='application/x-ndjson')
+    elapsed = time.perf_counter() - start
+    report = response.get_json()
+    assert response.status_code == 200 and report['inserted'] == rows, report
+    return elapsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--rows', type=int, default=5000)
+    args = arg_parser.parse_args()
+
+    cleanup()
+    with app.app_context():
+        if partitions.is_partitioned():
+            partitions.create_partitions(BENCH_START, BENCH_START + timedelta(minutes=args.rows))
+    client = app.test_client()
+    client.post('/airlines/bulk?on_conflict=skip', json=[BENCH_AIRLINE])
+    client.post('/airports/bulk?on_conflict=skip', json=BENCH_AIRPORTS)
+    try:
+        single = bench_single(client, args.rows)
+        bulk = bench_bulk(client, args.rows)
+    finally:
+        cleanup()
+
+    print(f"single-row POST /flights : {args.rows / single:10.0f} rows/s ({single:.2f}s)")
+    print(f"POST /flights/bulk       : {args.rows / bulk:10.0f} rows/s ({bulk:.2f}s)")
+    print(f"speedup                  : {single / bulk:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
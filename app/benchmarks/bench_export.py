@@ -0,0 +1,90 @@
+# bench_export.py
+# Throughput (MB/s, rows/s) and peak memory of GET /flights/export in each format,
+# reading the whole response through the Flask test client. Each format runs in its own
+# process so its peak RSS is not inherited from another; `list` (opt-in) measures the
+# unpaginated GET /flights the export replaces, which holds every row in memory.
+#
+# Run from the app/ directory against the database in database/config.py, after
+# seeding it (PostgreSQL, so that CSV goes through COPY):
+#   python -m benchmarks.generator --database-uri postgresql://... --flights 10000000 --days 365 --reset
+#   python -m benchmarks.bench_export --output export.json
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+FORMATS = ('csv', 'ndjson', 'parquet', 'arrow')
+PATHS = {fmt: f'/flights/export?format={fmt}' for fmt in FORMATS}
+PATHS['list'] = '/flights'
+
+
+def max_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_child(fmt):
+    """Exports once in this process and prints the measurements as JSON."""
+    from database import config
+    config.SLOW_REQUEST_MS = 0
+    from app import app
+    from models import db, Flight
+
+    with app.app_context():
+        rows = db.session.execute(db.select(db.func.count()).select_from(Flight)).scalar_one()
+    client = app.test_client()
+    baseline_rss = max_rss_mb()
+    started = time.perf_counter()
+    response = client.get(PATHS[fmt], buffered=False)
+    if response.status_code != 200:
+        print(json.dumps({'error': f"HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}"}))
+        return
+    size = 0
+    for chunk in response.iter_encoded():
+        size += len(chunk)
+    response.close()
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        'rows': rows,
+        'bytes': size,
+        'seconds': round(elapsed, 3),
+        'mb_per_s': round(size / elapsed / 1e6, 1),
+        'rows_per_s': round(rows / elapsed),
+        'baseline_rss_mb': baseline_rss,
+        'peak_rss_mb': max_rss_mb(),
+    }))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--formats', nargs='+', choices=list(PATHS), default=list(FORMATS))
+    arg_parser.add_argument('--output', help='write results as JSON')
+    arg_parser.add_argument('--child', choices=list(PATHS), help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+    if args.child:
+        run_child(args.child)
+        return
+
+    results = {}
+    print(f"{'format':<8} {'rows':>10} {'MB':>9} {'MB/s':>8} {'rows/s':>10} {'peak RSS MB':>12} {'growth MB':>10}")
+    for fmt in args.formats:
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_export', '--child', fmt],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results[fmt] = result
+        if 'error' in result:
+            print(f"{fmt:<8} {result['error']}")
+            continue
+        print(f"{fmt:<8} {result['rows']:>10} {result['bytes'] / 1e6:>9.1f} {result['mb_per_s']:>8} "
+              f"{result['rows_per_s']:>10} {result['peak_rss_mb']:>12} "
+              f"{result['peak_rss_mb'] - result['baseline_rss_mb']:>10.1f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# bench_itineraries.py
+# GET /itineraries search latency versus timetable size. Builds synthetic timetables
+# in memory (no database): a hub-and-spoke network where each airport mostly flies to
+# and from a few hubs, spread over as many days as it takes to reach the requested size.
+#
+# Run from the app/ directory:
+#   python -m benchmarks.bench_itineraries --sizes 10000 100000 1000000
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from services.timetable import Timetable
+
+START = datetime(2030, 1, 1, tzinfo=timezone.utc)
+FLIGHTS_PER_DAY = 30000
+
+
+def make_rows(size, airports, hubs, rng):
+    days = max(1, size // FLIGHTS_PER_DAY)
+    rows = []
+    for flight_id in range(1, size + 1):
+        # Half the flights feed a hub, half leave one
+        if rng.random() < 0.5:
+            origin, destination = rng.choice(airports), rng.choice(hubs)
+        else:
+            origin, destination = rng.choice(hubs), rng.choice(airports)
+        if destination == origin:
+            continue
+        departure = START + timedelta(minutes=rng.randrange(days * 24 * 60))
+        rows.append((flight_id, origin, destination, departure, departure + timedelta(minutes=rng.randint(45, 600))))
+    rows.sort(key=lambda row: (row[3], row[0]))
+    return rows, days
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    arg_parser.add_argument('--airports', type=int, default=3000)
+    arg_parser.add_argument('--hubs', type=int, default=50)
+    arg_parser.add_argument('--queries', type=int, default=200)
+    arg_parser.add_argument('--max-legs', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(42)
+    airports = [f'B{i:05d}' for i in range(args.airports)]
+    hubs = airports[:args.hubs]
+
+    for size in args.sizes:
+        rows, days = make_rows(size, airports, hubs, rng)
+        timetable = Timetable(ttl=float('inf'))
+        start = time.perf_counter()
+        timetable.load_rows(rows)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        timings = []
+        found = 0
+        for _ in range(args.queries):
+            origin, destination = rng.sample(airports, 2)
+            depart_after = START + timedelta(minutes=rng.randrange(days * 24 * 60))
+            start = time.perf_counter()
+            itineraries = timetable.search(origin, destination, depart_after, args.max_legs, timedelta(minutes=45))
+            timings.append(time.perf_counter() - start)
+            found += bool(itineraries)
+        timings.sort()
+        mean = sum(timings) / len(timings)
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        print(f"{size:>9} flights  load {load_ms:8.0f} ms  search mean {mean * 1000:8.2f} ms  "
+              f"p99 {p99 * 1000:8.2f} ms  ({found}/{args.queries} with a route)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+# bench_partitions.py
+# Insert rate and query latency for flights as one table versus monthly partitions, at
+# production scale (50M rows by default). Both tables get the indexes and constraints of
+# airport_tracker.sql (no triggers or foreign keys, which cost the same either way) and
+# identical rows, generated server-side in chronological order like real ingest.
+#
+# Run from the app/ directory against the PostgreSQL database in database/config.py.
+# Loading 50M rows into both tables takes a while; --skip-load reuses an earlier load:
+#   python -m benchmarks.bench_partitions --rows 50000000 --output partitions.json
+#   python -m benchmarks.bench_partitions --skip-load
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import create_engine, text
+
+from database import config
+
+SCHEMA = 'bench_partitions'
+TABLES = ('flights_plain', 'flights_partitioned')
+START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+LOAD_CHUNK = 1000000
+AIRLINES = 60
+AIRPORTS = 800
+# Same as airport_tracker.sql
+INDEXES = {
+    'airline': 'airline_id, scheduled_departure, flight_id',
+    'departure_airport': 'departure_airport, scheduled_departure, flight_id',
+    'arrival_airport': 'arrival_airport, scheduled_departure, flight_id',
+    'route': 'departure_airport, arrival_airport, scheduled_departure, flight_id',
+    'flight_number': 'flight_number, scheduled_departure, flight_id',
+    'status': 'status, scheduled_departure, flight_id',
+    'scheduled_departure': 'scheduled_departure, flight_id',
+}
+COLUMNS = """
+    flight_id BIGINT NOT NULL,
+    airline_id VARCHAR(3) NOT NULL,
+    flight_number VARCHAR(10) NOT NULL,
+    departure_airport VARCHAR(3) NOT NULL,
+    arrival_airport VARCHAR(3) NOT NULL,
+    scheduled_departure TIMESTAMP WITH TIME ZONE NOT NULL,
+    scheduled_arrival TIMESTAMP WITH TIME ZONE NOT NULL,
+    actual_departure TIMESTAMP WITH TIME ZONE,
+    actual_arrival TIMESTAMP WITH TIME ZONE,
+    status flight_status NOT NULL DEFAULT 'Scheduled',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    change_txid BIGINT
+"""
+# Row g of n: departures spread evenly over the span with up to 2h of jitter, cubic skew
+# towards a few busy airports, 2% cancelled, and everything but the newest 2% finished
+ROWS_SQL = """
+    INSERT INTO {table} (flight_id, airline_id, flight_number, departure_airport, arrival_airport,
+                         scheduled_departure, scheduled_arrival, actual_departure, actual_arrival, status)
+    SELECT g, airline_id, flight_number, departure_airport, arrival_airport,
+           departure, departure + block,
+           CASE WHEN status = 'Landed' THEN departure + delay END,
+           CASE WHEN status = 'Landed' THEN departure + block + delay END,
+           status::flight_status
+    FROM (
+        SELECT g,
+               'A' || lpad((g % {airlines})::text, 2, '0') AS airline_id,
+               'F' || (g % 100000) AS flight_number,
+               lpad(to_hex(floor(power(((g * 2654435761) % 1000003) / 1000003.0, 3) * {airports})::int), 3, '0') AS departure_airport,
+               lpad(to_hex(floor(power(((g * 40503) % 999983) / 999983.0, 3) * {airports})::int), 3, '0') AS arrival_airport,
+               :start + make_interval(secs => g * :seconds_per_row) + make_interval(mins => ((g * 7919) % 120)::int) AS departure,
+               make_interval(mins => (45 + (g * 104729) % 600)::int) AS block,
+               make_interval(mins => ((g * 15485863) % 40 - 5)::int) AS delay,
+               CASE WHEN g % 50 = 0 THEN 'Cancelled' WHEN g < :finished THEN 'Landed' ELSE 'Scheduled' END AS status
+        FROM generate_series(:first, :last) AS g
+    ) AS rows
+"""
+
+
+def create_tables(conn, months):
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    conn.execute(text(
+        f"CREATE TABLE {SCHEMA}.flights_plain ({COLUMNS}, PRIMARY KEY (flight_id), "
+        f"UNIQUE (airline_id, flight_number, scheduled_departure))"
+    ))
+    conn.execute(text(
+        f"CREATE TABLE {SCHEMA}.flights_partitioned ({COLUMNS}, PRIMARY KEY (flight_id, scheduled_departure), "
+        f"UNIQUE (airline_id, flight_number, scheduled_departure)) PARTITION BY RANGE (scheduled_departure)"
+    ))
+    # One extra month after the data for the insert benchmark
+    for month in range(months + 1):
+        start = START + relativedelta(months=month)
+        conn.execute(text(
+            f"CREATE TABLE {SCHEMA}.flights_partitioned_{start:%Y_%m} PARTITION OF {SCHEMA}.flights_partitioned "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{(start + relativedelta(months=1)).isoformat()}')"
+        ))
+    for table in TABLES:
+        for name, columns in INDEXES.items():
+            conn.execute(text(f"CREATE INDEX {table}_{name} ON {SCHEMA}.{table} ({columns})"))
+
+def load(conn, table, rows, months):
+    """Inserts the rows in chunks; returns rows/s for the first and last chunk and overall."""
+    seconds_per_row = ((START + relativedelta(months=months)) - START).total_seconds() / rows
+    rates = []
+    started = time.perf_counter()
+    for first in range(0, rows, LOAD_CHUNK):
+        last = min(first + LOAD_CHUNK, rows) - 1
+        chunk_started = time.perf_counter()
+        conn.execute(
+            text(ROWS_SQL.format(table=f'{SCHEMA}.{table}', airlines=AIRLINES, airports=AIRPORTS)),
+            {'start': START, 'seconds_per_row': seconds_per_row, 'finished': int(rows * 0.98),
+             'first': first, 'last': last},
+        )
+        rates.append((last - first + 1) / (time.perf_counter() - chunk_started))
+        print(f"  {table}: {last + 1} rows ({rates[-1]:.0f} rows/s)")
+    elapsed = time.perf_counter() - started
+    conn.execute(text(f"ANALYZE {SCHEMA}.{table}"))
+    return {'first_chunk_rows_per_s': round(rates[0]), 'last_chunk_rows_per_s': round(rates[-1]),
+            'overall_rows_per_s': round(rows / elapsed)}
+
+
+def operations(rng, rows, months):
+    """name -> function returning (sql, params) for one randomly chosen execution."""
+    end = START + relativedelta(months=months)
+    span_days = (end - START).days
+    recent = int(rows * 0.98)
+    next_ids = iter(range(rows, rows * 2))
+
+    def day():
+        return START + relativedelta(days=rng.randrange(span_days))
+
+    def airline():
+        return f'A{rng.randrange(AIRLINES):02d}'
+
+    def airport():
+        return f'{int(rng.random() ** 3 * AIRPORTS):03x}'
+
+    def airline_day():
+        return ("SELECT * FROM {table} WHERE airline_id = :airline AND scheduled_departure >= :day "
+                "AND scheduled_departure < :day + interval '1 day' "
+                "ORDER BY scheduled_departure DESC, flight_id DESC LIMIT 101"), {'airline': airline(), 'day': day()}
+
+    def airport_window():
+        return ("SELECT * FROM {table} WHERE departure_airport = :airport AND scheduled_departure >= :day "
+                "AND scheduled_departure < :day + interval '6 hours' "
+                "ORDER BY scheduled_departure DESC, flight_id DESC LIMIT 101"), {'airport': airport(), 'day': day()}
+
+    def latest_page():
+        return "SELECT * FROM {table} ORDER BY scheduled_departure DESC, flight_id DESC LIMIT 101", {}
+
+    def point_get():
+        return "SELECT * FROM {table} WHERE flight_id = :id", {'id': rng.randrange(rows)}
+
+    def insert():
+        # Into the month after the data, as new schedules arrive
+        flight_id = next(next_ids)
+        return ("INSERT INTO {table} (flight_id, airline_id, flight_number, departure_airport, arrival_airport, "
+                "scheduled_departure, scheduled_arrival) VALUES "
+                "(:id, :airline, :number, :origin, :destination, :departure, :departure + interval '2 hours')"), {
+            'id': flight_id, 'airline': airline(), 'number': f'N{flight_id}', 'origin': airport(),
+            'destination': airport(), 'departure': end + relativedelta(minutes=rng.randrange(30 * 24 * 60)),
+        }
+
+    def update_status():
+        return ("UPDATE {table} SET status = 'Delayed', updated_at = now() WHERE flight_id = :id",
+                {'id': rng.randrange(recent, rows)})
+
+    return {operation.__name__: operation for operation in (
+        airline_day, airport_window, latest_page, point_get, insert, update_status,
+    )}
+
+def measure(conn, table, make_statement, iterations):
+    timings = []
+    for _ in range(iterations):
+        sql, params = make_statement()
+        started = time.perf_counter()
+        result = conn.execute(text(sql.format(table=f'{SCHEMA}.{table}')), params)
+        if result.returns_rows:
+            result.fetchall()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'p50_ms': round(timings[len(timings) // 2] * 1000, 3),
+        'p99_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000, 3),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--rows', type=int, default=50000000)
+    arg_parser.add_argument('--months', type=int, default=60, help='months of schedule the rows cover')
+    arg_parser.add_argument('--iterations', type=int, default=2000, help='executions per operation and table')
+    arg_parser.add_argument('--skip-load', action='store_true', help=f'reuse the tables in the {SCHEMA} schema')
+    arg_parser.add_argument('--seed', type=int, default=42)
+    arg_parser.add_argument('--output', help='write results as JSON')
+    args = arg_parser.parse_args()
+
+    # Every statement commits on its own, like the API's single-row writes
+    engine = create_engine(config.SQLALCHEMY_DATABASE_URI, isolation_level='AUTOCOMMIT')
+    results = {'rows': args.rows, 'months': args.months, 'load': {}, 'operations': {}}
+    with engine.connect() as conn:
+        if not args.skip_load:
+            create_tables(conn, args.months)
+            for table in TABLES:
+                print(f"Loading {args.rows} rows into {table}...")
+                results['load'][table] = load(conn, table, args.rows, args.months)
+
+        for table in TABLES:
+            # Same statements and parameters for both tables
+            rng = random.Random(args.seed)
+            for name, make_statement in operations(rng, args.rows, args.months).items():
+                results['operations'].setdefault(name, {})[table] = measure(conn, table, make_statement, args.iterations)
+        # Drop the inserted rows so --skip-load runs start from the same data
+        for table in TABLES:
+            conn.execute(text(f"DELETE FROM {SCHEMA}.{table} WHERE flight_id >= :rows"), {'rows': args.rows})
+
+    for table, load_result in results['load'].items():
+        print(f"load {table:<20} first chunk {load_result['first_chunk_rows_per_s']:>8} rows/s, "
+              f"last chunk {load_result['last_chunk_rows_per_s']:>8} rows/s")
+    print(f"\n{'operation':<16} {'plain p50':>10} {'p99':>10} {'partitioned p50':>16} {'p99':>10}")
+    for name, by_table in results['operations'].items():
+        plain, partitioned = by_table[TABLES[0]], by_table[TABLES[1]]
+        print(f"{name:<16} {plain['p50_ms']:>10} {plain['p99_ms']:>10} "
+              f"{partitioned['p50_ms']:>16} {partitioned['p99_ms']:>10}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# bench_reference_cache.py
+# Counts DB round trips per POST /flights with the reference cache off and on.
+#
+# Run from the app/ directory against the database in database/config.py:
+#   python -m benchmarks.bench_reference_cache --rows 1000
+import argparse
+import time
+
+from sqlalchemy import event
+
+from app import app
+from models import db
+from services.reference_cache import reference_cache
+from benchmarks.bench_bulk_ingest import BENCH_AIRLINE, BENCH_AIRPORTS, make_flights, cleanup
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+def run(client, rows, prefix, max_entries):
+    reference_cache.clear()
+    reference_cache.max_entries = max_entries
+    counter = StatementCounter()
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', counter)
+    start = time.perf_counter()
+    try:
+        for flight in make_flights(rows, prefix):
+            response = client.post('/flights', json=flight)
+            assert response.status_code == 201, response.get_json()
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+    return counter.count / rows, time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--rows', type=int, default=1000)
+    args = arg_parser.parse_args()
+
+    cleanup()
+    client = app.test_client()
+    client.post('/airlines/bulk?on_conflict=skip', json=[BENCH_AIRLINE])
+    client.post('/airports/bulk?on_conflict=skip', json=BENCH_AIRPORTS)
+    max_entries = reference_cache.max_entries
+    try:
+        uncached, uncached_time = run(client, args.rows, 'U', 0)
+        cached, cached_time = run(client, args.rows, 'C', max_entries)
+    finally:
+        reference_cache.max_entries = max_entries
+        cleanup()
+
+    print(f"cache off: {uncached:.2f} statements/write, {args.rows / uncached_time:8.0f} writes/s")
+    print(f"cache on : {cached:.2f} statements/write, {args.rows / cached_time:8.0f} writes/s")
+    print(f"saved    : {uncached - cached:.2f} round trips per flight write")
+    print(f"cache    : {reference_cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# bench_serialization.py
+# Rows/sec and peak allocated bytes per row for listing flights: ORM instances + to_dict() + json
+# (the old path) versus column projection + compiled serializer (services/fast_json.py).
+#
+# Run from the app/ directory; uses an in-memory SQLite database unless --database-uri is given:
+#   python -m benchmarks.bench_serialization --rows 100000
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask
+
+from models import db, Flight
+from services import fast_json
+
+
+def seed(rows):
+    start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    db.session.execute(Flight.__table__.insert(), [
+        {
+            'flight_id': i + 1,
+            'airline_id': 'ZZB',
+            'flight_number': str(i),
+            'departure_airport': 'ZZA',
+            'arrival_airport': 'ZZC',
+            'scheduled_departure': start + timedelta(minutes=i),
+            'scheduled_arrival': start + timedelta(minutes=i, hours=2),
+            'actual_departure': start + timedelta(minutes=i + 5),
+            'actual_arrival': None,
+            'status': 'Departed',
+            'created_at': start,
+            'updated_at': start,
+        }
+        for i in range(rows)
+    ])
+    db.session.commit()
+
+
+def orm_path():
+    flights = db.session.execute(db.select(Flight)).scalars().all()
+    body = json.dumps([flight.to_dict() for flight in flights]).encode()
+    db.session.expunge_all()
+    return body
+
+
+def projection_path():
+    return fast_json.FLIGHTS.dumps(db.session.execute(fast_json.FLIGHTS.statement()).all())
+
+
+def measure(name, fn, rows, repeat):
+    fn()  # Warm up caches and compiled statements
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+
+    # Peak traced memory during one run: how much a request allocates per row at once
+    tracemalloc.start()
+    body = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<12} {rows / elapsed:12.0f} rows/s  {peak / rows:8.0f} peak allocated bytes/row  "
+          f"({len(body)} bytes of JSON)")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--rows', type=int, default=100000)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--database-uri', default='sqlite://')
+    args = arg_parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.database_uri
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        seed(args.rows)
+        print(f"encoder: {'orjson' if fast_json.orjson else 'json'}")
+        measure('orm', orm_path, args.rows, args.repeat)
+        measure('projection', projection_path, args.rows, args.repeat)
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# bench_status_updates.py
+# Compares status updates through PATCH /flights/<id> (one flight per request) with
+# PATCH /flights/status (one set-based UPDATE per batch of 1000), plus a retry of the
+# same batch, which must change nothing.
+#
+# Run from the app/ directory against the database in database/config.py:
+#   python -m benchmarks.bench_status_updates --rows 5000
+import argparse
+import json
+import time
+from datetime import timedelta
+
+from app import app
+from benchmarks.bench_bulk_ingest import BENCH_AIRLINE, BENCH_AIRPORTS, BENCH_START, cleanup, make_flights
+from models import db, Flight
+from services import partitions
+
+
+def create_flights(client, rows):
+    """Creates rows flights for each path; returns their ids split in two halves."""
+    body = '\n'.join(json.dumps(flight) for flight in make_flights(rows * 2, 'U'))
+    response = client.post('/flights/bulk', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200 and response.get_json()['inserted'] == rows * 2, response.get_json()
+    with app.app_context():
+        flight_ids = db.session.execute(
+            db.select(Flight.flight_id).where(Flight.airline_id == BENCH_AIRLINE['airline_id'])
+            .order_by(Flight.flight_id)
+        ).scalars().all()
+    return flight_ids[:rows], flight_ids[rows:]
+
+
+def bench_single(client, flight_ids):
+    start = time.perf_counter()
+    for flight_id in flight_ids:
+        response = client.patch(f'/flights/{flight_id}', json={'status': 'Boarding'})
+        assert response.status_code == 200, response.get_json()
+    return time.perf_counter() - start
+
+
+def bench_batch(client, flight_ids, expected):
+    body = '\n'.join(json.dumps({'flight_id': flight_id, 'status': 'Boarding'}) for flight_id in flight_ids)
+    start = time.perf_counter()
+    response = client.patch('/flights/status', data=body, content_type='application/x-ndjson')
+    elapsed = time.perf_counter() - start
+    report = response.get_json()
+    assert response.status_code == 200 and report[expected] == len(flight_ids), \
+        {key: value for key, value in report.items() if key != 'results'}
+    return elapsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--rows', type=int, default=5000)
+    args = arg_parser.parse_args()
+
+    cleanup()
+    with app.app_context():
+        if partitions.is_partitioned():
+            partitions.create_partitions(BENCH_START, BENCH_START + timedelta(minutes=args.rows * 2))
+    client = app.test_client()
+    client.post('/airlines/bulk?on_conflict=skip', json=[BENCH_AIRLINE])
+    client.post('/airports/bulk?on_conflict=skip', json=BENCH_AIRPORTS)
+    try:
+        single_ids, batch_ids = create_flights(client, args.rows)
+        single = bench_single(client, single_ids)
+        batch = bench_batch(client, batch_ids, 'updated')
+        retry = bench_batch(client, batch_ids, 'unchanged')
+    finally:
+        cleanup()
+
+    print(f"PATCH /flights/<id>          : {args.rows / single:10.0f} updates/s ({single:.2f}s)")
+    print(f"PATCH /flights/status        : {args.rows / batch:10.0f} updates/s ({batch:.2f}s)")
+    print(f"PATCH /flights/status, retry : {args.rows / retry:10.0f} rows/s ({retry:.2f}s)")
+    print(f"speedup                      : {single / batch:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
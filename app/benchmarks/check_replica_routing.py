@@ -0,0 +1,100 @@
+# check_replica_routing.py
+# Checks read-replica routing (database/routing.py) end to end through the Flask test
+# client: a client that just wrote reads its write back, and GET requests from other
+# clients are served by the replica.
+#
+# Run from the app/ directory. By default the primary and the replica are two SQLite
+# files with no replication between them, so a read served by the replica cannot see
+# the write. Against a PostgreSQL primary and a streaming standby of it, pass both URIs
+# (the standby eventually has the row, so only read-your-writes is checked):
+#   python -m benchmarks.check_replica_routing
+#   python -m benchmarks.check_replica_routing --primary postgresql://.../db --replica postgresql://.../db
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from database import config
+
+PIN_SECONDS = 1.0
+# Same fixtures as benchmarks/bench_bulk_ingest.py, which cannot be imported before the
+# database URIs are set
+AIRLINE = {'airline_id': 'ZZB', 'iata_code': 'Z9', 'name': 'Benchmark Air', 'country': 'Nowhere'}
+AIRPORTS = [
+    {'airport_id': 'ZZA', 'icao_code': 'ZZZA', 'name': 'Bench A', 'city': 'A', 'country': 'Nowhere',
+     'latitude': 10.0, 'longitude': 10.0},
+    {'airport_id': 'ZZC', 'icao_code': 'ZZZC', 'name': 'Bench C', 'city': 'C', 'country': 'Nowhere',
+     'latitude': 20.0, 'longitude': 20.0},
+]
+FLIGHT = {
+    'airline_id': 'ZZB',
+    'flight_number': 'REPLICA1',
+    'departure_airport': 'ZZA',
+    'arrival_airport': 'ZZC',
+    'scheduled_departure': '2030-01-01T10:00:00+00:00',
+    'scheduled_arrival': '2030-01-01T12:00:00+00:00',
+}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--primary', help='primary database URI (default: a temporary SQLite file)')
+    arg_parser.add_argument('--replica', help='replica database URI (default: a temporary SQLite file)')
+    args = arg_parser.parse_args()
+    stand_ins = not (args.primary and args.replica)
+    directory = tempfile.mkdtemp(prefix='replica-routing-')
+
+    # Read by app.py and database/routing.py when they are imported below
+    config.SQLALCHEMY_DATABASE_URI = args.primary or f"sqlite:///{os.path.join(directory, 'primary.sqlite3')}"
+    config.DATABASE_REPLICA_URLS = [args.replica or f"sqlite:///{os.path.join(directory, 'replica.sqlite3')}"]
+    config.REPLICA_PIN_SECONDS = PIN_SECONDS
+    config.SLOW_REQUEST_MS = 0
+
+    from app import app
+    from models import db, Flight
+    from services import partitions
+
+    with app.app_context():
+        if stand_ins:
+            db.create_all()
+            # Same (empty) tables on the stand-in replica
+            db.metadata.create_all(db.engines['replica0'])
+        if partitions.is_partitioned():
+            partitions.create_partitions(FLIGHT['scheduled_departure'], FLIGHT['scheduled_departure'])
+        db.session.execute(db.delete(Flight).where(Flight.flight_number == FLIGHT['flight_number']))
+        db.session.commit()
+
+    writer = app.test_client()
+    reader = app.test_client()
+    failures = 0
+
+    def expect(name, ok):
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+
+    # 409 if they exist already
+    writer.post('/airlines', json=AIRLINE)
+    for airport in AIRPORTS:
+        writer.post('/airports', json=airport)
+    response = writer.post('/flights', json=FLIGHT)
+    expect('POST /flights returns a consistency token', response.status_code == 201 and 'X-Consistency-Token' in response.headers)
+    flight_id = response.get_json().get('flight_id')
+
+    try:
+        expect('the writer reads its own write', writer.get(f'/flights/{flight_id}').status_code == 200)
+        if stand_ins:
+            expect('a reader without a token is served by the replica', reader.get(f'/flights/{flight_id}').status_code == 404)
+            time.sleep(PIN_SECONDS + 0.1)
+            expect('the writer reads from the replica once unpinned', writer.get(f'/flights/{flight_id}').status_code == 404)
+        stats = reader.get('/replicas/stats').get_json()
+        expect('the replica is healthy', stats['replicas'][0]['healthy'])
+        print(f"     reads: {stats['reads']}")
+    finally:
+        writer.delete(f'/flights/{flight_id}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
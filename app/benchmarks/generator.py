@@ -0,0 +1,239 @@
+# generator.py
+# Seeded synthetic data matching airport_tracker.sql: airlines, airports and a daily
+# flight schedule. The same seed and sizes always give the same rows.
+#
+# Flights come from a fixed set of routes, each flown once a day by one airline under
+# one flight number, so (airline_id, flight_number, scheduled_departure) is unique as
+# uq_flight requires. Airport traffic follows a Zipf-like popularity curve, block times
+# follow great-circle distance, and statuses/actual times depend on where each flight
+# sits relative to the --as-of instant (landed, in the air, boarding, scheduled, ...).
+#
+# Run from the app/ directory. For PostgreSQL, load database/airport_tracker.sql first
+# (the triggers live there); SQLite tables are created from the models:
+#   python -m benchmarks.generator --database-uri sqlite:///bench.sqlite3 --flights 1000000 --reset
+import argparse
+import math
+import random
+import string
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask
+from sqlalchemy import text
+
+from models import db, Airline, Airport, Flight
+from services import partitions
+
+DEFAULT_START = datetime(2030, 1, 1, tzinfo=timezone.utc)
+BATCH_SIZE = 10000
+CRUISE_KMH = 800
+TAXI_MINUTES = 30
+COUNTRIES = ('United States', 'Canada', 'Mexico', 'Brazil', 'United Kingdom', 'France', 'Germany', 'Spain',
+             'Italy', 'Turkey', 'United Arab Emirates', 'India', 'China', 'Japan', 'Australia', 'South Africa')
+
+
+def _codes(rng, length, count, alphabet=string.ascii_uppercase):
+    """count distinct random codes of the given length."""
+    codes = set()
+    while len(codes) < count:
+        codes.add(''.join(rng.choice(alphabet) for _ in range(length)))
+    return sorted(codes)
+
+def _distance_km(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (a['latitude'], a['longitude'], b['latitude'], b['longitude']))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+class Generator:
+    def __init__(self, seed=42, airlines=60, airports=800, flights=100000, days=30,
+                 start=DEFAULT_START, as_of=None):
+        self.rng = random.Random(seed)
+        self.flight_count = flights
+        self.days = days
+        self.start = start
+        self.as_of = as_of or start + timedelta(days=days / 2)
+        self.airlines = self._make_airlines(airlines)
+        self.airports = self._make_airports(airports)
+        self.routes = self._make_routes(math.ceil(flights / days))
+
+    def _make_airlines(self, count):
+        ids = _codes(self.rng, 3, count)
+        iata = _codes(self.rng, 2, count, string.ascii_uppercase + string.digits)
+        return [
+            {'airline_id': airline_id, 'iata_code': iata_code, 'name': f'{airline_id.title()} Airways',
+             'country': self.rng.choice(COUNTRIES)}
+            for airline_id, iata_code in zip(ids, iata)
+        ]
+
+    def _make_airports(self, count):
+        ids = _codes(self.rng, 3, count)
+        icao = _codes(self.rng, 4, count)
+        self.rng.shuffle(icao)
+        # Airports cluster around regional centres, like real ones around population
+        centres = [(self.rng.uniform(-40, 60), self.rng.uniform(-130, 150)) for _ in range(max(1, count // 25))]
+        airports = []
+        for airport_id, icao_code in zip(ids, icao):
+            lat, lon = self.rng.choice(centres)
+            airports.append({
+                'airport_id': airport_id, 'icao_code': icao_code, 'name': f'{airport_id} International',
+                'city': f'City {airport_id}', 'country': self.rng.choice(COUNTRIES),
+                'latitude': round(max(-89.0, min(89.0, self.rng.gauss(lat, 5))), 6),
+                'longitude': round((self.rng.gauss(lon, 5) + 180) % 360 - 180, 6),
+            })
+        return airports
+
+    def _make_routes(self, count):
+        # Zipf-like popularity: a few hubs see most of the traffic
+        weights = [1 / (rank + 1) for rank in range(len(self.airports))]
+        numbers = {airline['airline_id']: 100 for airline in self.airlines}
+        routes = []
+        while len(routes) < count:
+            origin, destination = self.rng.choices(self.airports, weights, k=2)
+            if origin is destination:
+                continue
+            airline = self.rng.choice(self.airlines)
+            numbers[airline['airline_id']] += 1
+            block = TAXI_MINUTES + _distance_km(origin, destination) / CRUISE_KMH * 60
+            routes.append({
+                'airline_id': airline['airline_id'],
+                'flight_number': f"{airline['iata_code']}{numbers[airline['airline_id']]}",
+                'departure_airport': origin['airport_id'],
+                'arrival_airport': destination['airport_id'],
+                'minute_of_day': self.rng.randrange(24 * 60),
+                'block_minutes': round(block),
+            })
+        return routes
+
+    def _status_and_times(self, departure, arrival):
+        """Status, actual_departure, actual_arrival for a flight relative to as_of."""
+        rng = self.rng
+        # Most flights leave within 15 minutes of schedule; the rest have a long-tailed delay
+        delay = timedelta(minutes=rng.uniform(-5, 15) if rng.random() < 0.75 else 15 + rng.expovariate(1 / 40))
+        actual_departure = departure + delay
+        actual_arrival = arrival + delay + timedelta(minutes=rng.uniform(-15, 10))
+        roll = rng.random()
+        if actual_arrival <= self.as_of:
+            if roll < 0.02:
+                return 'Cancelled', None, None
+            if roll < 0.023:
+                return 'Diverted', actual_departure, None
+            return 'Landed', actual_departure, actual_arrival
+        if actual_departure <= self.as_of:
+            return ('In Air' if roll < 0.9 else 'Departed'), actual_departure, None
+        if roll < 0.01:
+            return 'Cancelled', None, None
+        if delay > timedelta(minutes=15) and departure - self.as_of < timedelta(hours=6):
+            return 'Delayed', None, None
+        if departure - self.as_of < timedelta(minutes=45):
+            return 'Boarding', None, None
+        return 'Scheduled', None, None
+
+    def flights(self):
+        """Yields flight rows day by day, at most `flights` of them."""
+        produced = 0
+        for day in range(self.days):
+            midnight = self.start + timedelta(days=day)
+            for route in self.routes:
+                if produced == self.flight_count:
+                    return
+                departure = midnight + timedelta(minutes=route['minute_of_day'])
+                arrival = departure + timedelta(minutes=route['block_minutes'])
+                status, actual_departure, actual_arrival = self._status_and_times(departure, arrival)
+                yield {
+                    'airline_id': route['airline_id'],
+                    'flight_number': route['flight_number'],
+                    'departure_airport': route['departure_airport'],
+                    'arrival_airport': route['arrival_airport'],
+                    'scheduled_departure': departure,
+                    'scheduled_arrival': arrival,
+                    'actual_departure': actual_departure,
+                    'actual_arrival': actual_arrival,
+                    'status': status,
+                }
+                produced += 1
+
+
+def reset():
+    """Empties the flight tables (and the tables derived from them)."""
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text(
+            "TRUNCATE flights, airports, airlines, flight_tombstones, flight_rollups RESTART IDENTITY"
+        ))
+    else:
+        for model in (Flight, Airport, Airline):
+            db.session.execute(model.__table__.delete())
+    db.session.commit()
+
+def seed_database(generator, log=print):
+    """Inserts the generator's rows in batches; the flight tables must be empty."""
+    if db.session.execute(db.select(Flight.flight_id).limit(1)).first() is not None:
+        raise RuntimeError("flights is not empty; rerun with --reset to replace its rows")
+    if partitions.is_partitioned():
+        partitions.create_partitions(generator.start, generator.start + timedelta(days=generator.days))
+    db.session.execute(Airline.__table__.insert(), generator.airlines)
+    db.session.execute(Airport.__table__.insert(), generator.airports)
+    db.session.commit()
+
+    started = time.perf_counter()
+    batch = []
+    inserted = 0
+    for flight in generator.flights():
+        batch.append(flight)
+        if len(batch) == BATCH_SIZE:
+            db.session.execute(Flight.__table__.insert(), batch)
+            db.session.commit()
+            inserted += len(batch)
+            batch = []
+            log(f"  {inserted} flights ({inserted / (time.perf_counter() - started):.0f} rows/s)")
+    if batch:
+        db.session.execute(Flight.__table__.insert(), batch)
+        db.session.commit()
+        inserted += len(batch)
+    return inserted
+
+
+def _utc(value):
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def add_arguments(arg_parser):
+    arg_parser.add_argument('--seed', type=int, default=42)
+    arg_parser.add_argument('--airlines', type=int, default=60)
+    arg_parser.add_argument('--airports', type=int, default=800)
+    arg_parser.add_argument('--flights', type=int, default=100000)
+    arg_parser.add_argument('--days', type=int, default=30)
+    arg_parser.add_argument('--start', type=_utc, default=DEFAULT_START,
+                            help='first day of the schedule (ISO 8601, UTC)')
+    arg_parser.add_argument('--as-of', type=_utc, default=None,
+                            help='"now" for statuses and actual times (default: middle of the schedule)')
+
+def from_arguments(args):
+    return Generator(seed=args.seed, airlines=args.airlines, airports=args.airports,
+                     flights=args.flights, days=args.days, start=args.start, as_of=args.as_of)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--database-uri', required=True)
+    arg_parser.add_argument('--reset', action='store_true', help='empty the flight tables first')
+    add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.database_uri
+    db.init_app(app)
+    with app.app_context():
+        # No-op for tables that exist; on PostgreSQL, prefer airport_tracker.sql (triggers)
+        db.create_all()
+        if args.reset:
+            reset()
+        generator = from_arguments(args)
+        started = time.perf_counter()
+        inserted = seed_database(generator)
+        print(f"{len(generator.airlines)} airlines, {len(generator.airports)} airports, "
+              f"{inserted} flights in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
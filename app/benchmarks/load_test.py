@@ -0,0 +1,99 @@
+# load_test.py
+# Compares requests/sec and latency percentiles of running servers at several concurrency levels.
+#
+# Start both modes against the same database, e.g.
+#   cd app && python app.py                          # sync, :5000
+#   cd app && uvicorn asgi:app --port 8000 --workers 1  # async, :8000
+# then run from the app/ directory:
+#   python -m benchmarks.load_test --target sync=http://localhost:5000 --target async=http://localhost:8000
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+# Request mix: (weight, path) — read-heavy, like the dashboards
+DEFAULT_PATHS = [
+    (5, '/flights?limit=50'),
+    (3, '/flights/{flight_id}'),
+    (1, '/flights?status=Delayed&limit=50'),
+    (1, '/flights/changes?limit=100'),
+]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def fetch_flight_ids(client):
+    response = await client.get('/flights?limit=1000')
+    response.raise_for_status()
+    return [flight['flight_id'] for flight in response.json()] or [1]
+
+
+async def run_level(base_url, concurrency, duration, paths, flight_ids):
+    latencies, errors = [], 0
+    weights = [weight for weight, _ in paths]
+    templates = [path for _, path in paths]
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                path = random.choices(templates, weights)[0].format(flight_id=random.choice(flight_ids))
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+async def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--target', action='append', required=True, help='name=base_url, repeatable')
+    arg_parser.add_argument('--concurrency', type=int, nargs='+', default=[100, 250, 500, 1000])
+    arg_parser.add_argument('--duration', type=float, default=20, help='seconds per level')
+    args = arg_parser.parse_args()
+
+    results = {}
+    for target in args.target:
+        name, base_url = target.split('=', 1)
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            flight_ids = await fetch_flight_ids(client)
+        results[name] = []
+        for concurrency in args.concurrency:
+            result = await run_level(base_url, concurrency, args.duration, DEFAULT_PATHS, flight_ids)
+            results[name].append(result)
+            print(f"{name:>8} c={concurrency:<5} {result['requests_per_sec']:>9} req/s  "
+                  f"p50={result['p50_ms']}ms  p99={result['p99_ms']}ms  errors={result['errors']}")
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
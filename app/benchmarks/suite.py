@@ -0,0 +1,235 @@
+# suite.py
+# Scripted workloads against the Flask app (in process, through its test client),
+# reported as throughput, p50/p99 latency and peak memory in a JSON file so runs can
+# be compared across commits.
+#
+# Run from the app/ directory. Uses the PostgreSQL database in database/config.py,
+# falling back to a SQLite file when it cannot connect (or use --database-uri):
+#   python -m benchmarks.suite --generate --flights 1000000 --output results.json
+#   python -m benchmarks.suite --output new.json --baseline results.json
+import argparse
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine
+
+from benchmarks import generator as data_generator
+from database import config
+from services import partitions
+
+SQLITE_FALLBACK = 'sqlite:///benchmarks.sqlite3'
+WORKLOADS = ('list', 'filter', 'point_get', 'create', 'update_status', 'mix')
+MIX_WEIGHTS = {'point_get': 50, 'filter': 20, 'list': 10, 'create': 10, 'update_status': 10}
+WARMUP_REQUESTS = 50
+# Flights created by the create workload; generated flight numbers are an IATA code plus digits
+CREATED_PREFIX = 'BENCH'
+UPDATE_STATUSES = ('Boarding', 'Departed', 'In Air', 'Landed', 'Delayed')
+
+
+def resolve_database_uri(requested):
+    if requested:
+        return requested
+    try:
+        with create_engine(config.SQLALCHEMY_DATABASE_URI).connect():
+            return config.SQLALCHEMY_DATABASE_URI
+    except Exception as e:
+        print(f"PostgreSQL unavailable ({type(e).__name__}); falling back to {SQLITE_FALLBACK}")
+        return SQLITE_FALLBACK
+
+
+class Workloads:
+    """Builds (method, path, json body) requests for each workload from a seeded RNG."""
+
+    def __init__(self, rng, flight_ids, airline_ids, airport_ids, first_day, days):
+        self.rng = rng
+        self.flight_ids = flight_ids
+        self.airline_ids = airline_ids
+        self.airport_ids = airport_ids
+        self.first_day = first_day
+        self.days = days
+        self.created = 0
+
+    def _day(self):
+        return self.first_day + timedelta(days=self.rng.randrange(self.days))
+
+    def list(self):
+        return 'GET', '/flights?limit=100', None
+
+    def filter(self):
+        day = self._day()
+        kind = self.rng.randrange(3)
+        if kind == 0:
+            return 'GET', f'/flights?airline_id={self.rng.choice(self.airline_ids)}&date={day:%Y-%m-%d}&limit=100', None
+        if kind == 1:
+            window = f'departs_after={day.isoformat()}&departs_before={(day + timedelta(hours=6)).isoformat()}'
+            return 'GET', f'/flights?departure_airport={self.rng.choice(self.airport_ids)}&{window}&limit=100'.replace('+', '%2B'), None
+        origin, destination = self.rng.sample(self.airport_ids, 2)
+        return 'GET', f'/flights?departure_airport={origin}&arrival_airport={destination}&limit=100', None
+
+    def point_get(self):
+        return 'GET', f'/flights/{self.rng.choice(self.flight_ids)}', None
+
+    def create(self):
+        self.created += 1
+        origin, destination = self.rng.sample(self.airport_ids, 2)
+        departure = self.first_day + timedelta(days=self.days, minutes=self.created)
+        return 'POST', '/flights', {
+            'airline_id': self.rng.choice(self.airline_ids),
+            'flight_number': f'{CREATED_PREFIX}{self.created}',
+            'departure_airport': origin,
+            'arrival_airport': destination,
+            'scheduled_departure': departure.isoformat(),
+            'scheduled_arrival': (departure + timedelta(hours=2)).isoformat(),
+        }
+
+    def update_status(self):
+        return 'PATCH', f'/flights/{self.rng.choice(self.flight_ids)}', {'status': self.rng.choice(UPDATE_STATUSES)}
+
+    def mix(self):
+        name = self.rng.choices(list(MIX_WEIGHTS), list(MIX_WEIGHTS.values()))[0]
+        return getattr(self, name)()
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def max_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def run_workload(client, make_request, requests):
+    for _ in range(WARMUP_REQUESTS):
+        method, path, body = make_request()
+        client.open(path, method=method, json=body)
+
+    timings = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        method, path, body = make_request()
+        request_started = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        response.get_data()
+        timings.append(time.perf_counter() - request_started)
+        errors += response.status_code >= 400
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        'requests': requests,
+        'errors': errors,
+        'throughput_rps': round(requests / elapsed, 1),
+        'p50_ms': round(percentile(timings, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+        'max_rss_mb': max_rss_mb(),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline):
+    print(f"\n{'vs baseline':<14} {'throughput':>12} {'p50':>10} {'p99':>10}")
+    for name, current in results['workloads'].items():
+        previous = baseline.get('workloads', {}).get(name)
+        if not previous:
+            continue
+        changes = [
+            (current[key] - previous[key]) / previous[key] * 100 if previous[key] else 0.0
+            for key in ('throughput_rps', 'p50_ms', 'p99_ms')
+        ]
+        print(f"{name:<14} {changes[0]:>+11.1f}% {changes[1]:>+9.1f}% {changes[2]:>+9.1f}%")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--database-uri', help='default: database/config.py, else ' + SQLITE_FALLBACK)
+    arg_parser.add_argument('--generate', action='store_true', help='replace the flight tables with generated data')
+    arg_parser.add_argument('--requests', type=int, default=2000, help='measured requests per workload')
+    arg_parser.add_argument('--workloads', nargs='+', choices=WORKLOADS, default=list(WORKLOADS))
+    arg_parser.add_argument('--output', help='write results as JSON')
+    arg_parser.add_argument('--baseline', help='earlier --output file to compare against')
+    data_generator.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    database_uri = resolve_database_uri(args.database_uri)
+    # Read by app.py when it is imported below; slow-request logging would swamp the output
+    config.SQLALCHEMY_DATABASE_URI = database_uri
+    config.SLOW_REQUEST_MS = 0
+
+    from app import app
+    from models import db, Airline, Airport, Flight
+
+    with app.app_context():
+        db.create_all()
+        if args.generate:
+            data_generator.reset()
+            generator = data_generator.from_arguments(args)
+            print(f"Generating {args.flights} flights (seed {args.seed})...")
+            data_generator.seed_database(generator)
+
+        db.session.execute(db.delete(Flight).where(Flight.flight_number.like(f'{CREATED_PREFIX}%')))
+        db.session.commit()
+        flight_ids = db.session.execute(db.select(Flight.flight_id)).scalars().all()
+        airline_ids = db.session.execute(db.select(Airline.airline_id)).scalars().all()
+        airport_ids = db.session.execute(db.select(Airport.airport_id)).scalars().all()
+        first, last = db.session.execute(
+            db.select(db.func.min(Flight.scheduled_departure), db.func.max(Flight.scheduled_departure))
+        ).one()
+        if not flight_ids or len(airport_ids) < 2:
+            sys.exit("No flights to benchmark; run with --generate")
+        if partitions.is_partitioned():
+            # The create and mix workloads schedule a flight a minute after the last generated day
+            partitions.create_partitions(last, last + timedelta(days=1, minutes=2 * (args.requests + WARMUP_REQUESTS)))
+
+    first = first if first.tzinfo else first.replace(tzinfo=timezone.utc)
+    last = last if last.tzinfo else last.replace(tzinfo=timezone.utc)
+    first_day = first.replace(hour=0, minute=0, second=0, microsecond=0)
+    workloads = Workloads(random.Random(args.seed), flight_ids, airline_ids, airport_ids,
+                          first_day, max(1, (last - first_day).days + 1))
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'database': database_uri.split(':', 1)[0],
+            'flights': len(flight_ids),
+            'seed': args.seed,
+            'requests_per_workload': args.requests,
+        },
+        'workloads': {},
+    }
+    client = app.test_client()
+    print(f"{'workload':<14} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8} {'rss MB':>8}")
+    for name in args.workloads:
+        result = run_workload(client, getattr(workloads, name), args.requests)
+        results['workloads'][name] = result
+        print(f"{name:<14} {result['throughput_rps']:>10} {result['p50_ms']:>10} {result['p99_ms']:>10} "
+              f"{result['errors']:>8} {result['max_rss_mb']:>8}")
+
+    with app.app_context():
+        db.session.execute(db.delete(Flight).where(Flight.flight_number.like(f'{CREATED_PREFIX}%')))
+        db.session.commit()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,10 @@ CREATE TYPE flight_status AS ENUM (
 );
 
 -- Drop tables if they exist (for clean setup)
+DROP SCHEMA IF EXISTS flights_archive CASCADE;
+DROP TABLE IF EXISTS flight_archives CASCADE;
+DROP TABLE IF EXISTS flight_rollups CASCADE;
+DROP TABLE IF EXISTS flight_tombstones CASCADE;
 DROP TABLE IF EXISTS flights CASCADE;
 DROP TABLE IF EXISTS airlines CASCADE;
 DROP TABLE IF EXISTS airports CASCADE;
@@ -41,8 +45,12 @@ CREATE TABLE airports (
 COMMENT ON TABLE airports IS 'Basic information about airports';
 
 -- Flights table (Simplified)
+-- Range-partitioned by month of scheduled_departure, so indexes stay partition-sized and
+-- queries with a time window only touch the months they cover. Every unique constraint
+-- must include the partition key, hence the (flight_id, scheduled_departure) primary key;
+-- flight_id still comes from a single sequence and is unique in practice.
 CREATE TABLE flights (
-    flight_id SERIAL PRIMARY KEY, -- Simplified to auto-incrementing integer
+    flight_id SERIAL, -- Simplified to auto-incrementing integer
     airline_id VARCHAR(3) NOT NULL REFERENCES airlines(airline_id),
     flight_number VARCHAR(10) NOT NULL,
     departure_airport VARCHAR(3) NOT NULL REFERENCES airports(airport_id),
@@ -55,14 +63,216 @@ CREATE TABLE flights (
     -- Removed: aircraft_id, estimated times, gates, runways, duration, distance, delay, baggage, live tracking fields etc. [cite: 23, 24]
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    change_txid BIGINT, -- Writing transaction id, maintained by trigger; cursor for GET /flights/changes
+    PRIMARY KEY (flight_id, scheduled_departure),
     CONSTRAINT uq_flight UNIQUE (airline_id, flight_number, scheduled_departure) -- Basic uniqueness constraint
-);
+) PARTITION BY RANGE (scheduled_departure);
 
 COMMENT ON TABLE flights IS 'Core information about scheduled and active flights for MVP';
 
--- Add basic indexes for performance on essential lookups
-CREATE INDEX idx_flights_airline ON flights(airline_id);
-CREATE INDEX idx_flights_departure_airport ON flights(departure_airport);
-CREATE INDEX idx_flights_arrival_airport ON flights(arrival_airport);
-CREATE INDEX idx_flights_status ON flights(status);
-CREATE INDEX idx_flights_scheduled_departure ON flights(scheduled_departure);
\ No newline at end of file
+-- Each GET /flights filter leads a composite index ending in the sort key, so a filtered,
+-- time-windowed page is one index range scan in either sort direction (no sort step).
+-- The leading columns still serve plain lookups and FK checks.
+CREATE INDEX idx_flights_airline ON flights(airline_id, scheduled_departure, flight_id);
+CREATE INDEX idx_flights_departure_airport ON flights(departure_airport, scheduled_departure, flight_id);
+CREATE INDEX idx_flights_arrival_airport ON flights(arrival_airport, scheduled_departure, flight_id);
+CREATE INDEX idx_flights_route ON flights(departure_airport, arrival_airport, scheduled_departure, flight_id);
+CREATE INDEX idx_flights_flight_number ON flights(flight_number, scheduled_departure, flight_id);
+CREATE INDEX idx_flights_status ON flights(status, scheduled_departure, flight_id);
+-- Includes flight_id so keyset pagination on (scheduled_departure, flight_id) is a single index range scan
+CREATE INDEX idx_flights_scheduled_departure ON flights(scheduled_departure, flight_id);
+
+-- Keep updated_at current on every UPDATE (DEFAULT only applies on INSERT).
+-- ETag/Last-Modified on GET /flights and GET /flights/<id> are derived from it.
+CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_flights_updated_at
+    BEFORE UPDATE ON flights
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+-- Change feed support (GET /flights/changes).
+-- Every insert/update stamps the row with its 64-bit transaction id, and deletes leave a tombstone.
+-- Feeds only return changes from transactions older than the oldest one still running,
+-- so a poll can never skip a change that commits late.
+CREATE TABLE flight_tombstones (
+    flight_id INTEGER PRIMARY KEY,
+    change_txid BIGINT NOT NULL,
+    deleted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE flight_tombstones IS 'Deleted flights, kept so change-feed clients can remove them. Purge old rows with: DELETE FROM flight_tombstones WHERE deleted_at < now() - interval ''30 days''';
+
+CREATE INDEX idx_flights_change ON flights(change_txid, flight_id);
+CREATE INDEX idx_flight_tombstones_change ON flight_tombstones(change_txid, flight_id);
+
+CREATE OR REPLACE FUNCTION set_change_txid() RETURNS trigger AS $$
+BEGIN
+    NEW.change_txid = pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_flights_change_txid
+    BEFORE INSERT OR UPDATE ON flights
+    FOR EACH ROW EXECUTE FUNCTION set_change_txid();
+
+-- Statement-level on purpose: an UPDATE that moves a flight to another month's partition
+-- runs as a DELETE plus an INSERT, but only fires the UPDATE statement triggers. A move
+-- therefore leaves no tombstone, and the INSERT's BEFORE trigger restamps change_txid,
+-- so the feed reports the move as an upsert.
+CREATE OR REPLACE FUNCTION record_flight_tombstones() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO flight_tombstones (flight_id, change_txid)
+    SELECT DISTINCT o.flight_id, pg_current_xact_id()::text::bigint FROM old_rows o
+    ON CONFLICT (flight_id) DO UPDATE SET change_txid = EXCLUDED.change_txid, deleted_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_flights_tombstone
+    AFTER DELETE ON flights REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION record_flight_tombstones();
+
+-- On-time performance rollups (GET /stats/airlines/<id>, GET /stats/airports/<id>).
+-- One row per (scope, entity, UTC hour) of additive counters; days are summed from hours.
+-- Statement-level triggers fold each INSERT/UPDATE/DELETE into the rollups inside the same
+-- transaction, one grouped upsert per statement (so bulk ingests stay set-based).
+-- Rebuild or verify with: python -m app rollups rebuild|check
+CREATE TABLE flight_rollups (
+    scope VARCHAR(20) NOT NULL, -- 'airline', 'departure_airport' or 'arrival_airport'
+    entity_id VARCHAR(3) NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL, -- Start of the UTC hour (scheduled arrival for 'arrival_airport', else scheduled departure)
+    flights INTEGER NOT NULL DEFAULT 0,
+    delayed INTEGER NOT NULL DEFAULT 0,
+    cancelled INTEGER NOT NULL DEFAULT 0,
+    diverted INTEGER NOT NULL DEFAULT 0,
+    departures_reported INTEGER NOT NULL DEFAULT 0, -- actual_departure known
+    departures_on_time INTEGER NOT NULL DEFAULT 0, -- Left within 15 minutes of schedule
+    departure_delay_seconds BIGINT NOT NULL DEFAULT 0, -- Early departures count as 0
+    arrivals_reported INTEGER NOT NULL DEFAULT 0,
+    arrivals_on_time INTEGER NOT NULL DEFAULT 0,
+    arrival_delay_seconds BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, entity_id, bucket)
+);
+
+COMMENT ON TABLE flight_rollups IS 'Hourly on-time counters per airline/airport, maintained by triggers on flights';
+
+-- Adds the flights in added and subtracts those in removed. Keep in sync with
+-- services/rollups.py (recompute_statement), which the rebuild and check commands use.
+CREATE OR REPLACE FUNCTION apply_flight_rollups(removed flights[], added flights[]) RETURNS void AS $$
+    INSERT INTO flight_rollups AS r (
+        scope, entity_id, bucket, flights, delayed, cancelled, diverted,
+        departures_reported, departures_on_time, departure_delay_seconds,
+        arrivals_reported, arrivals_on_time, arrival_delay_seconds
+    )
+    SELECT
+        s.scope, s.entity_id, s.bucket,
+        SUM(f.sign),
+        SUM(f.sign * (f.status = 'Delayed')::int),
+        SUM(f.sign * (f.status = 'Cancelled')::int),
+        SUM(f.sign * (f.status = 'Diverted')::int),
+        SUM(f.sign * (f.actual_departure IS NOT NULL)::int),
+        SUM(f.sign * COALESCE((f.actual_departure <= f.scheduled_departure + INTERVAL '15 minutes')::int, 0)),
+        SUM(f.sign * COALESCE(GREATEST(EXTRACT(EPOCH FROM f.actual_departure - f.scheduled_departure), 0)::bigint, 0)),
+        SUM(f.sign * (f.actual_arrival IS NOT NULL)::int),
+        SUM(f.sign * COALESCE((f.actual_arrival <= f.scheduled_arrival + INTERVAL '15 minutes')::int, 0)),
+        SUM(f.sign * COALESCE(GREATEST(EXTRACT(EPOCH FROM f.actual_arrival - f.scheduled_arrival), 0)::bigint, 0))
+    FROM (
+        SELECT -1 AS sign, * FROM unnest(removed)
+        UNION ALL
+        SELECT 1 AS sign, * FROM unnest(added)
+    ) f
+    CROSS JOIN LATERAL (VALUES
+        ('airline', f.airline_id, date_trunc('hour', f.scheduled_departure, 'UTC')),
+        ('departure_airport', f.departure_airport, date_trunc('hour', f.scheduled_departure, 'UTC')),
+        ('arrival_airport', f.arrival_airport, date_trunc('hour', f.scheduled_arrival, 'UTC'))
+    ) AS s(scope, entity_id, bucket)
+    GROUP BY s.scope, s.entity_id, s.bucket
+    ON CONFLICT (scope, entity_id, bucket) DO UPDATE SET
+        flights = r.flights + EXCLUDED.flights,
+        delayed = r.delayed + EXCLUDED.delayed,
+        cancelled = r.cancelled + EXCLUDED.cancelled,
+        diverted = r.diverted + EXCLUDED.diverted,
+        departures_reported = r.departures_reported + EXCLUDED.departures_reported,
+        departures_on_time = r.departures_on_time + EXCLUDED.departures_on_time,
+        departure_delay_seconds = r.departure_delay_seconds + EXCLUDED.departure_delay_seconds,
+        arrivals_reported = r.arrivals_reported + EXCLUDED.arrivals_reported,
+        arrivals_on_time = r.arrivals_on_time + EXCLUDED.arrivals_on_time,
+        arrival_delay_seconds = r.arrival_delay_seconds + EXCLUDED.arrival_delay_seconds;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION maintain_flight_rollups() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM apply_flight_rollups('{}', ARRAY(SELECT n FROM new_rows n));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM apply_flight_rollups(ARRAY(SELECT o FROM old_rows o), ARRAY(SELECT n FROM new_rows n));
+    ELSE
+        PERFORM apply_flight_rollups(ARRAY(SELECT o FROM old_rows o), '{}');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_flights_rollups_insert
+    AFTER INSERT ON flights REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_flight_rollups();
+
+CREATE TRIGGER trg_flights_rollups_update
+    AFTER UPDATE ON flights REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_flight_rollups();
+
+CREATE TRIGGER trg_flights_rollups_delete
+    AFTER DELETE ON flights REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_flight_rollups();
+
+-- Monthly partitions (UTC months, named flights_YYYY_MM).
+-- Creates any missing partitions for the months from first_month through last_month and
+-- returns how many it created. Inserting a flight into a month without a partition fails,
+-- so run python -m app partitions ensure (e.g. daily from cron) to stay ahead of schedules.
+CREATE OR REPLACE FUNCTION create_flight_partitions(first_month TIMESTAMP WITH TIME ZONE, last_month TIMESTAMP WITH TIME ZONE)
+RETURNS integer AS $$
+DECLARE
+    month_start TIMESTAMP WITH TIME ZONE := date_trunc('month', first_month, 'UTC');
+    partition_name TEXT;
+    created integer := 0;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        partition_name := 'flights_' || to_char(month_start AT TIME ZONE 'UTC', 'YYYY_MM');
+        IF to_regclass(partition_name) IS NULL
+           AND to_regclass('flights_archive.' || partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF flights FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, month_start + INTERVAL '1 month'
+            );
+            created := created + 1;
+        END IF;
+        month_start := month_start + INTERVAL '1 month';
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Covers the sample data in insert_data.sql and the year ahead
+SELECT create_flight_partitions(TIMESTAMP WITH TIME ZONE '2025-01-01 00:00:00+00', now() + INTERVAL '12 months');
+
+-- Archive of completed months (python -m app partitions archive).
+-- A month whose flights have all finished (Landed, Cancelled or Diverted) and that lies
+-- past the retention window is detached from flights and moved to the flights_archive
+-- schema, indexes and all. Rollups keep counting it; the API no longer returns it.
+CREATE SCHEMA flights_archive;
+
+CREATE TABLE flight_archives (
+    partition_name VARCHAR(63) PRIMARY KEY, -- Table name in the flights_archive schema
+    range_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    range_end TIMESTAMP WITH TIME ZONE NOT NULL,
+    row_count BIGINT NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE flight_archives IS 'Monthly flights partitions moved to the flights_archive schema';
@@ -12,8 +12,62 @@ DB_HOST = 'localhost' # Or '127.0.0.1'
 DB_PORT = '5432' # Default PostgreSQL port
 DB_NAME = 'flight_mvp_db' # The database you created
 
-# Construct the SQLAlchemy Database URI
-SQLALCHEMY_DATABASE_URI = f'postgresql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+# Construct the SQLAlchemy Database URI (DATABASE_URL overrides it)
+SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', f'postgresql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}')
+# Same database through asyncpg, for the async entry point (asgi.py); ASYNC_DATABASE_URL overrides it
+ASYNC_SQLALCHEMY_DATABASE_URI = os.getenv(
+    'ASYNC_DATABASE_URL', 'postgresql+asyncpg://' + SQLALCHEMY_DATABASE_URI.split('://', 1)[-1]
+)
 
 # Optional: Disable modification tracking if not needed (improves performance)
-SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Connection pool, per worker process (see database/pool.py)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5)) # Connections kept open
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 5)) # Extra connections allowed under load
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10)) # Seconds to wait for a free connection before failing
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800)) # Replace connections older than this many seconds (-1 disables)
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true' # Test connections on checkout
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 15000)) # Server-side statement_timeout (0 disables)
+
+# Production server (python -m app serve)
+SERVER_BIND = os.getenv('SERVER_BIND', '0.0.0.0:5000')
+SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', 2))
+SERVER_THREADS = int(os.getenv('SERVER_THREADS', 4)) # Threads per sync worker; SSE streams each hold one
+
+# In-process cache for airlines/airports (reference data)
+REFERENCE_CACHE_MAX_ENTRIES = int(os.getenv('REFERENCE_CACHE_MAX_ENTRIES', 10000)) # 0 disables the cache
+REFERENCE_CACHE_TTL = float(os.getenv('REFERENCE_CACHE_TTL', 300)) # Seconds before an entry is reloaded
+AIRPORT_INDEX_TTL = float(os.getenv('AIRPORT_INDEX_TTL', 300)) # Seconds before GET /airports/nearby reloads its index from the table
+TIMETABLE_TTL = float(os.getenv('TIMETABLE_TTL', 300)) # Seconds before GET /itineraries reloads its timetable from the table
+
+# Flight event push (GET /flights/stream)
+EVENT_BACKEND = os.getenv('EVENT_BACKEND', 'local') # 'local' (single process) or 'postgres' (LISTEN/NOTIFY across workers)
+EVENT_NOTIFY_DSN = os.getenv('EVENT_NOTIFY_DSN', SQLALCHEMY_DATABASE_URI)
+EVENT_QUEUE_SIZE = int(os.getenv('EVENT_QUEUE_SIZE', 256)) # Pending events per subscriber before it is dropped
+SSE_KEEPALIVE_SECONDS = float(os.getenv('SSE_KEEPALIVE_SECONDS', 15))
+
+# Request instrumentation (services/metrics.py, GET /metrics)
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'false').lower() == 'true' # Add a Server-Timing header (db and app time) to responses
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 500)) # Log requests slower than this with their SQL (0 disables)
+MAX_QUERIES_PER_REQUEST = int(os.getenv('MAX_QUERIES_PER_REQUEST', 0)) # Debug/test guard: fail requests issuing more statements (0 disables)
+
+# Monthly flights partitions (services/partitions.py, python -m app partitions)
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', 12)) # Months of partitions 'partitions ensure' keeps ahead of now
+ARCHIVE_RETENTION_DAYS = int(os.getenv('ARCHIVE_RETENTION_DAYS', 365)) # Months that ended longer ago than this are archived
+
+# Write-behind telemetry buffer (services/write_behind.py)
+WRITE_BEHIND = os.getenv('WRITE_BEHIND', 'false').lower() == 'true' # Buffer status/actual-time-only PATCH /flights/<id> updates and write them in batches
+WRITE_BEHIND_MAX_FLIGHTS = int(os.getenv('WRITE_BEHIND_MAX_FLIGHTS', 10000)) # Flights with pending updates before new ones get 429
+WRITE_BEHIND_FLUSH_SIZE = int(os.getenv('WRITE_BEHIND_FLUSH_SIZE', 500)) # Flush as soon as this many flights are pending
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', 1.0)) # Seconds an update may wait before it is written
+WRITE_BEHIND_ROW_TTL = float(os.getenv('WRITE_BEHIND_ROW_TTL', 60)) # Seconds a flight's row answers buffered updates without being read again; 0 reads it every time
+
+# Read replicas (database/routing.py): GET requests read from them, writes go to the primary above
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()] # Comma-separated replica URIs (empty disables routing)
+REPLICA_CHECK_INTERVAL = float(os.getenv('REPLICA_CHECK_INTERVAL', 1.0)) # Seconds between replica health/replay-position checks
+REPLICA_PIN_SECONDS = float(os.getenv('REPLICA_PIN_SECONDS', 5)) # Replicas without WAL positions serve a client again this long after its last write
+
+# Bulk export (GET /flights/export, services/export.py)
+EXPORT_BATCH_ROWS = int(os.getenv('EXPORT_BATCH_ROWS', 20000)) # Rows per server-side cursor fetch and per Parquet row group / Arrow batch
+EXPORT_STATEMENT_TIMEOUT_MS = int(os.getenv('EXPORT_STATEMENT_TIMEOUT_MS', 0)) # statement_timeout for the CSV COPY, which runs for the whole export (0 disables)
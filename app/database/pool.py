@@ -0,0 +1,103 @@
+# pool.py
+# Engine options built from config.py, and connection pools that record checkout wait time.
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from database import config
+
+# Upper bounds (seconds) of the checkout wait histogram
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolMetrics:
+    """Checkout wait statistics for one kind of pool in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.bucket_counts = [0] * len(WAIT_BUCKETS)
+
+    def observe(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.bucket_counts[i] += 1
+
+    def timed_out(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool):
+        """Returns the counters plus the live occupancy of pool."""
+        capacity = pool.size() + max(config.DB_MAX_OVERFLOW, 0)
+        checked_out = pool.checkedout()
+        with self._lock:
+            return {
+                "pool_size": pool.size(),
+                "max_overflow": config.DB_MAX_OVERFLOW,
+                "checked_out": checked_out,
+                "overflow": max(pool.overflow(), 0),
+                "saturation": round(checked_out / capacity, 3) if capacity else None,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_buckets": dict(zip((str(b) for b in WAIT_BUCKETS), self.bucket_counts)),
+            }
+
+
+class InstrumentedPoolMixin:
+    """Times how long each checkout waits for a free connection."""
+
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.timed_out()
+            raise
+        self.metrics.observe(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    metrics = PoolMetrics()
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics = PoolMetrics()
+
+
+def engine_options(async_driver=False, database_uri=None):
+    """Keyword arguments for create_engine/create_async_engine (or SQLALCHEMY_ENGINE_OPTIONS).
+
+    database_uri defaults to SQLALCHEMY_DATABASE_URI; replicas pass their own.
+    """
+    database_uri = database_uri or config.SQLALCHEMY_DATABASE_URI
+    options = {
+        'poolclass': InstrumentedAsyncQueuePool if async_driver else InstrumentedQueuePool,
+        'pool_size': config.DB_POOL_SIZE,
+        'max_overflow': config.DB_MAX_OVERFLOW,
+        'pool_timeout': config.DB_POOL_TIMEOUT,
+        'pool_recycle': config.DB_POOL_RECYCLE,
+        'pool_pre_ping': config.DB_POOL_PRE_PING,
+    }
+    # statement_timeout is a PostgreSQL setting; other databases (SQLite benchmarks) skip it
+    if config.DB_STATEMENT_TIMEOUT_MS and database_uri.startswith('postgresql'):
+        timeout = str(config.DB_STATEMENT_TIMEOUT_MS)
+        if async_driver:
+            options['connect_args'] = {'server_settings': {'statement_timeout': timeout}}
+        else:
+            options['connect_args'] = {'options': f'-c statement_timeout={timeout}'}
+    return options
@@ -0,0 +1,272 @@
+# routing.py
+# Read-replica routing for the Flask app (DATABASE_REPLICA_URLS). Requests with a safe
+# method (GET/HEAD/OPTIONS) read from a healthy replica, chosen round robin; everything
+# else uses the primary. Each replica is a Flask-SQLAlchemy bind ('replica0', ...), and
+# RoutingSession sends a request's statements to the bind chosen for it.
+#
+# Read-your-writes: writes that committed answer with a consistency token, the primary's
+# WAL position after the request's last commit plus the time of the write, as a cookie
+# and an X-Consistency-Token header. Requests that commit nothing (e.g. updates accepted
+# into the write-behind buffer) get none and cost no extra query. A request that carries one only goes to a replica whose
+# last health check saw it replay that position, otherwise to the primary. Replicas
+# without WAL positions (SQLite stand-ins, or a server that is not a standby) count as
+# caught up REPLICA_PIN_SECONDS after the write.
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.pool import QueuePool
+
+from database import config, pool
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+TOKEN_COOKIE = 'db_consistency'
+TOKEN_HEADER = 'X-Consistency-Token'
+# How long a client keeps sending its token; far longer than any replica should lag
+TOKEN_MAX_AGE = 300
+
+
+def parse_lsn(value):
+    """'16/B374D848' -> integer WAL position."""
+    high, low = value.split('/')
+    return (int(high, 16) << 32) | int(low, 16)
+
+def format_lsn(lsn):
+    return f'{lsn >> 32:X}/{lsn & 0xFFFFFFFF:X}'
+
+def encode_token(lsn, written_at):
+    return f"{format_lsn(lsn) if lsn is not None else ''}@{written_at:.3f}"
+
+def decode_token(token):
+    """(lsn or None, written_at) from a consistency token, or None if it is malformed."""
+    try:
+        lsn, written_at = token.split('@')
+        return (parse_lsn(lsn) if lsn else None), float(written_at)
+    except (AttributeError, ValueError):
+        return None
+
+
+class Replica:
+    """Health of one replica as of its last check."""
+
+    def __init__(self, key, url):
+        self.key = key
+        self.url = url
+        self.healthy = False  # Until the first check succeeds
+        self.replay_lsn = None  # None when the server reports no WAL replay
+        self.checked_at = None
+        self.error = None
+
+
+class ReplicaRouter:
+    """Chooses the bind for each request and checks replica health in the background."""
+
+    def __init__(self, urls, check_interval, pin_seconds, clock=time.time):
+        self.replicas = [Replica(f'replica{index}', url) for index, url in enumerate(urls)]
+        self.check_interval = check_interval
+        self.pin_seconds = pin_seconds
+        self.clock = clock
+        self._next = 0
+        self._lock = threading.Lock()
+        self._checker_lock = threading.Lock()
+        self._app = None
+        self._checker_pid = None
+        self._counters = {'primary': 0, 'pinned': 0, **{replica.key: 0 for replica in self.replicas}}
+
+    def binds(self):
+        """SQLALCHEMY_BINDS entries for the replicas, pooled like the primary."""
+        # Plain QueuePool: the pool metrics (GET /pool/stats) describe the primary's pool
+        return {replica.key: {**pool.engine_options(database_uri=replica.url), 'url': replica.url, 'poolclass': QueuePool}
+                for replica in self.replicas}
+
+    def _caught_up(self, replica, token):
+        if token is None:
+            return True
+        lsn, written_at = token
+        if lsn is not None and replica.replay_lsn is not None:
+            return replica.replay_lsn >= lsn
+        return self.clock() - written_at >= self.pin_seconds
+
+    def choose(self, token=None):
+        """Bind key of the replica to read from, or None for the primary."""
+        with self._lock:
+            healthy = [replica for replica in self.replicas if replica.healthy]
+            candidates = [replica for replica in healthy if self._caught_up(replica, token)]
+            if not candidates:
+                # Pinned: a replica could have served the read but is behind this client's write
+                self._counters['pinned' if healthy else 'primary'] += 1
+                return None
+            replica = candidates[self._next % len(candidates)]
+            self._next += 1
+            self._counters[replica.key] += 1
+            return replica.key
+
+    def check(self, engines):
+        """Checks every replica once (engines: bind key -> engine)."""
+        for replica in self.replicas:
+            try:
+                with engines[replica.key].connect() as conn:
+                    if conn.dialect.name == 'postgresql':
+                        replayed = conn.execute(text("SELECT pg_last_wal_replay_lsn()::text")).scalar()
+                    else:
+                        conn.execute(text("SELECT 1"))
+                        replayed = None
+            except Exception as e:
+                if replica.healthy:
+                    logger.warning("Replica %s failed its health check: %s", replica.key, e)
+                with self._lock:
+                    replica.healthy = False
+                    replica.error = str(e)
+                    replica.checked_at = self.clock()
+                continue
+            with self._lock:
+                if not replica.healthy:
+                    logger.info("Replica %s is healthy", replica.key)
+                replica.healthy = True
+                replica.replay_lsn = parse_lsn(replayed) if replayed else None
+                replica.error = None
+                replica.checked_at = self.clock()
+
+    def mark_unhealthy(self, key, error):
+        """Takes a replica out of rotation until its next successful check."""
+        with self._lock:
+            for replica in self.replicas:
+                if replica.key == key and replica.healthy:
+                    logger.warning("Replica %s lost its connection: %s", key, error)
+                    replica.healthy = False
+                    replica.error = str(error)
+
+    def _run(self, pid):
+        while self._checker_pid == pid:
+            try:
+                with self._app.app_context():
+                    self.check(current_app.extensions['sqlalchemy'].engines)
+            except Exception:
+                logger.exception("Replica health check failed")
+            time.sleep(self.check_interval)
+
+    def _ensure_checker(self):
+        # Started lazily in the process that takes requests: threads do not survive the
+        # fork from a preloading master, which never takes requests itself
+        pid = os.getpid()
+        if self._checker_pid == pid:
+            return
+        with self._checker_lock:
+            if self._checker_pid == pid:
+                return
+            engines = current_app.extensions['sqlalchemy'].engines
+            for replica in self.replicas:
+                event.listen(engines[replica.key], 'handle_error', self._on_error(replica.key))
+            # First check before the first request is routed, so replicas start in rotation
+            self.check(engines)
+            self._checker_pid = pid
+        threading.Thread(target=self._run, args=(pid,), name='replica-health-check', daemon=True).start()
+
+    def _on_error(self, key):
+        def handle_error(context):
+            if context.is_disconnect:
+                self.mark_unhealthy(key, context.original_exception)
+        return handle_error
+
+    def instrument(self, app):
+        """Registers the routing hooks on a Flask app whose SQLALCHEMY_BINDS include binds()."""
+        self._app = app
+
+        @app.before_request
+        def route_request():
+            if request.method not in SAFE_METHODS:
+                return
+            self._ensure_checker()
+            token = request.headers.get(TOKEN_HEADER) or request.cookies.get(TOKEN_COOKIE)
+            g.db_bind = self.choose(decode_token(token) if token else None)
+
+        # Commits mark the request, so only requests that wrote something read the WAL position
+        event.listen(RoutingSession, 'after_commit', _note_commit)
+
+        @app.after_request
+        def issue_consistency_token(response):
+            # Also after an error: batch endpoints may have committed earlier batches
+            if request.method in SAFE_METHODS or not g.pop('db_committed', False):
+                return response
+            # One WAL position per request, read once after its last commit
+            token = encode_token(self._primary_lsn(), self.clock())
+            response.headers[TOKEN_HEADER] = token
+            response.set_cookie(TOKEN_COOKIE, token, max_age=TOKEN_MAX_AGE, httponly=True, samesite='Lax')
+            return response
+
+    def _primary_lsn(self):
+        db = current_app.extensions['sqlalchemy']
+        if db.engine.dialect.name != 'postgresql':
+            return None
+        try:
+            # The handler has committed, so this is at or past its commit record
+            return parse_lsn(db.session.execute(text("SELECT pg_current_wal_lsn()::text")).scalar_one())
+        except Exception:
+            logger.exception("Could not read the primary's WAL position; pinning by time instead")
+            db.session.rollback()
+            return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'replicas': [{
+                    'replica': replica.key,
+                    'healthy': replica.healthy,
+                    'replay_lsn': format_lsn(replica.replay_lsn) if replica.replay_lsn is not None else None,
+                    'checked_at': replica.checked_at,
+                    'error': replica.error,
+                } for replica in self.replicas],
+                'reads': dict(self._counters),
+            }
+
+    def render(self):
+        """Prometheus lines for GET /metrics."""
+        stats = self.stats()
+        lines = ['# TYPE db_replica_healthy gauge']
+        for replica in stats['replicas']:
+            lines.append(f'db_replica_healthy{{replica="{replica["replica"]}"}} {int(replica["healthy"])}')
+        lines.append('# TYPE db_reads_total counter')
+        for target, count in stats['reads'].items():
+            lines.append(f'db_reads_total{{target="{target}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _note_commit(session):
+    if has_request_context():
+        g.db_committed = True
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that runs a request's statements on the bind in g.db_bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # Flushes are writes and always go to the primary
+        if bind is None and not self._flushing and has_request_context():
+            key = g.get('db_bind')
+            if key is not None:
+                return current_app.extensions['sqlalchemy'].engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def use_primary():
+    """Runs the block's statements on the primary, e.g. loads of caches shared across requests."""
+    if not has_request_context():
+        yield
+        return
+    key = g.pop('db_bind', None)
+    try:
+        yield
+    finally:
+        if key is not None:
+            g.db_bind = key
+
+
+replica_router = ReplicaRouter(config.DATABASE_REPLICA_URLS, config.REPLICA_CHECK_INTERVAL, config.REPLICA_PIN_SECONDS)
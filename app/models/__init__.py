@@ -0,0 +1 @@
+from .models import db, init_db, Airline, Airport, Flight, FlightArchive, FlightRollup, FlightTombstone, FLIGHT_STATUSES
@@ -1,17 +1,175 @@
+# models.py
+from flask_sqlalchemy import SQLAlchemy
+
+from database.routing import RoutingSession
+
+# RoutingSession sends GET requests to read replicas when DATABASE_REPLICA_URLS is set
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Values of the flight_status ENUM in airport_tracker.sql
+FLIGHT_STATUSES = (
+    'Scheduled',
+    'Boarding',
+    'Departed',
+    'In Air',
+    'Landed',
+    'Cancelled',
+    'Diverted',
+    'Delayed',
+)
+
+
+def init_db(app):
+    """Binds the SQLAlchemy instance to the Flask app."""
+    db.init_app(app)
+
+
+class Airline(db.Model):
+    __tablename__ = 'airlines'
+
+    airline_id = db.Column(db.String(3), primary_key=True)
+    iata_code = db.Column(db.String(2), nullable=False, unique=True)
+    name = db.Column(db.String(100), nullable=False)
+    country = db.Column(db.String(50))
+
+    def to_dict(self):
+        return {
+            'airline_id': self.airline_id,
+            'iata_code': self.iata_code,
+            'name': self.name,
+            'country': self.country,
+        }
+
+    def __repr__(self):
+        return f'<Airline {self.airline_id}>'
+
+
+class Airport(db.Model):
+    __tablename__ = 'airports'
+
+    airport_id = db.Column(db.String(3), primary_key=True)
+    icao_code = db.Column(db.String(4), nullable=False, unique=True)
+    name = db.Column(db.String(100), nullable=False)
+    city = db.Column(db.String(50), nullable=False)
+    country = db.Column(db.String(50), nullable=False)
+    latitude = db.Column(db.Numeric(10, 6), nullable=False)
+    longitude = db.Column(db.Numeric(10, 6), nullable=False)
+
+    def to_dict(self):
+        return {
+            'airport_id': self.airport_id,
+            'icao_code': self.icao_code,
+            'name': self.name,
+            'city': self.city,
+            'country': self.country,
+            'latitude': str(self.latitude) if self.latitude is not None else None,
+            'longitude': str(self.longitude) if self.longitude is not None else None,
+        }
+
+    def __repr__(self):
+        return f'<Airport {self.airport_id}>'
+
+
 class Flight(db.Model):
     __tablename__ = 'flights'
+    __table_args__ = (
+        db.UniqueConstraint('airline_id', 'flight_number', 'scheduled_departure', name='uq_flight'),
+        # Filter column first, then the listing sort key; see airport_tracker.sql
+        db.Index('idx_flights_airline', 'airline_id', 'scheduled_departure', 'flight_id'),
+        db.Index('idx_flights_departure_airport', 'departure_airport', 'scheduled_departure', 'flight_id'),
+        db.Index('idx_flights_arrival_airport', 'arrival_airport', 'scheduled_departure', 'flight_id'),
+        db.Index('idx_flights_route', 'departure_airport', 'arrival_airport', 'scheduled_departure', 'flight_id'),
+        db.Index('idx_flights_flight_number', 'flight_number', 'scheduled_departure', 'flight_id'),
+        db.Index('idx_flights_status', 'status', 'scheduled_departure', 'flight_id'),
+        db.Index('idx_flights_scheduled_departure', 'scheduled_departure', 'flight_id'),
+        db.Index('idx_flights_change', 'change_txid', 'flight_id'),
+    )
 
-    flight_id = db.Column(db.String(10), primary_key=True)
-    airline_code = db.Column(db.String(3), nullable=False)
+    # On PostgreSQL the table is partitioned by month and its primary key is
+    # (flight_id, scheduled_departure) (see airport_tracker.sql); flight_id alone still
+    # identifies a flight, which is all the ORM needs
+    flight_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    airline_id = db.Column(db.String(3), db.ForeignKey('airlines.airline_id'), nullable=False)
     flight_number = db.Column(db.String(10), nullable=False)
-    departure_airport = db.Column(db.String(3), nullable=False)
-    arrival_airport = db.Column(db.String(3), nullable=False)
+    departure_airport = db.Column(db.String(3), db.ForeignKey('airports.airport_id'), nullable=False)
+    arrival_airport = db.Column(db.String(3), db.ForeignKey('airports.airport_id'), nullable=False)
     scheduled_departure = db.Column(db.DateTime(timezone=True), nullable=False)
     scheduled_arrival = db.Column(db.DateTime(timezone=True), nullable=False)
-    status = db.Column(db.String(20), nullable=False, default='Scheduled')
+    actual_departure = db.Column(db.DateTime(timezone=True))
+    actual_arrival = db.Column(db.DateTime(timezone=True))
+    status = db.Column(db.Enum(*FLIGHT_STATUSES, name='flight_status'), nullable=False, default='Scheduled')
     created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
     updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), onupdate=db.func.now())
+    # Set by the trg_flights_change_txid trigger; not part of the API representation
+    change_txid = db.Column(db.BigInteger)
+
+    def to_dict(self):
+        return {
+            'flight_id': self.flight_id,
+            'airline_id': self.airline_id,
+            'flight_number': self.flight_number,
+            'departure_airport': self.departure_airport,
+            'arrival_airport': self.arrival_airport,
+            'scheduled_departure': self.scheduled_departure.isoformat() if self.scheduled_departure else None,
+            'scheduled_arrival': self.scheduled_arrival.isoformat() if self.scheduled_arrival else None,
+            'actual_departure': self.actual_departure.isoformat() if self.actual_departure else None,
+            'actual_arrival': self.actual_arrival.isoformat() if self.actual_arrival else None,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
 
     def __repr__(self):
         return f'<Flight {self.flight_id}>'
 
+
+class FlightTombstone(db.Model):
+    __tablename__ = 'flight_tombstones'
+    __table_args__ = (
+        db.Index('idx_flight_tombstones_change', 'change_txid', 'flight_id'),
+    )
+
+    flight_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    change_txid = db.Column(db.BigInteger, nullable=False)
+    deleted_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+
+    def __repr__(self):
+        return f'<FlightTombstone {self.flight_id}>'
+
+
+class FlightRollup(db.Model):
+    """Hourly on-time counters per airline and per airport, kept by triggers in airport_tracker.sql."""
+    __tablename__ = 'flight_rollups'
+
+    # 'airline' (bucketed by scheduled departure), 'departure_airport' (same) or
+    # 'arrival_airport' (bucketed by scheduled arrival)
+    scope = db.Column(db.String(20), primary_key=True)
+    entity_id = db.Column(db.String(3), primary_key=True)
+    bucket = db.Column(db.DateTime(timezone=True), primary_key=True)  # Start of the UTC hour
+    flights = db.Column(db.Integer, nullable=False, default=0)
+    delayed = db.Column(db.Integer, nullable=False, default=0)
+    cancelled = db.Column(db.Integer, nullable=False, default=0)
+    diverted = db.Column(db.Integer, nullable=False, default=0)
+    departures_reported = db.Column(db.Integer, nullable=False, default=0)
+    departures_on_time = db.Column(db.Integer, nullable=False, default=0)
+    departure_delay_seconds = db.Column(db.BigInteger, nullable=False, default=0)
+    arrivals_reported = db.Column(db.Integer, nullable=False, default=0)
+    arrivals_on_time = db.Column(db.Integer, nullable=False, default=0)
+    arrival_delay_seconds = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<FlightRollup {self.scope} {self.entity_id} {self.bucket}>'
+
+
+class FlightArchive(db.Model):
+    """A monthly flights partition moved to the flights_archive schema (services/partitions.py)."""
+    __tablename__ = 'flight_archives'
+
+    partition_name = db.Column(db.String(63), primary_key=True)
+    range_start = db.Column(db.DateTime(timezone=True), nullable=False)
+    range_end = db.Column(db.DateTime(timezone=True), nullable=False)
+    row_count = db.Column(db.BigInteger, nullable=False)
+    archived_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+
+    def __repr__(self):
+        return f'<FlightArchive {self.partition_name}>'
@@ -0,0 +1,240 @@
+# airport_index.py
+# In-memory k-nearest / radius search over airports for GET /airports/nearby.
+# Airports are points on the unit sphere; a k-d tree over their (x, y, z) coordinates
+# is searched by chord length, which orders points exactly like great-circle distance.
+import heapq
+import math
+import threading
+import time
+
+from database import config
+from database.routing import use_primary
+from models import db
+from services import fast_json
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_NEARBY = 10
+MAX_NEARBY = 1000
+# Points per k-d tree leaf; leaves are scanned linearly
+LEAF_SIZE = 16
+# Changes absorbed (pending adds + removals) before the tree is rebuilt from memory
+MIN_REBUILD_CHANGES = 64
+
+
+def to_unit_vector(latitude, longitude):
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+def chord_to_km(squared_chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(squared_chord) / 2))
+
+def km_to_squared_chord(distance_km):
+    if distance_km >= math.pi * EARTH_RADIUS_KM:
+        return 4.0  # The whole sphere
+    return (2 * math.sin(distance_km / (2 * EARTH_RADIUS_KM))) ** 2
+
+
+def parse_nearby_args(args):
+    """Returns (latitude, longitude, k, radius_km or None) for GET /airports/nearby.
+
+    Raises ValueError with a client-facing message.
+    """
+    try:
+        latitude = float(args['lat'])
+        longitude = float(args['lon'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("lat and lon are required numbers")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("lat must be within [-90, 90] and lon within [-180, 180]")
+
+    radius_km = None
+    if args.get('radius_km') is not None:
+        try:
+            radius_km = float(args['radius_km'])
+        except ValueError:
+            radius_km = -1
+        if not radius_km > 0:
+            raise ValueError("radius_km must be a positive number")
+
+    # A radius search returns everything inside it (up to the cap) unless k narrows it
+    k = args.get('k')
+    if k is None:
+        return latitude, longitude, (DEFAULT_NEARBY if radius_km is None else MAX_NEARBY), radius_km
+    try:
+        k = int(k)
+    except ValueError:
+        k = 0
+    if not 1 <= k <= MAX_NEARBY:
+        raise ValueError(f"k must be an integer between 1 and {MAX_NEARBY}")
+    return latitude, longitude, k, radius_km
+
+
+class KDTree:
+    """Static k-d tree over 3-D points; leaves hold contiguous slices of the point arrays."""
+
+    def __init__(self, points):
+        # points: list of (airport_id, (x, y, z))
+        self.ids = []
+        self.coords = []
+        # Node: (axis, split, left, right) for inner nodes, (-1, start, end) for leaves
+        self.nodes = []
+        if points:
+            self._build(list(points))
+
+    def _build(self, points):
+        if len(points) <= LEAF_SIZE:
+            start = len(self.ids)
+            for airport_id, coord in points:
+                self.ids.append(airport_id)
+                self.coords.append(coord)
+            self.nodes.append((-1, start, len(self.ids)))
+            return len(self.nodes) - 1
+
+        spreads = [max(p[1][a] for p in points) - min(p[1][a] for p in points) for a in range(3)]
+        axis = spreads.index(max(spreads))
+        points.sort(key=lambda p: p[1][axis])
+        middle = len(points) // 2
+        index = len(self.nodes)
+        self.nodes.append(None)  # Filled in once the children exist
+        left = self._build(points[:middle])
+        right = self._build(points[middle:])
+        self.nodes[index] = (axis, points[middle][1][axis], left, right)
+        return index
+
+    def search(self, query, heap, k, max_d2, skip):
+        """Pushes (-squared_chord, airport_id) for the k closest points within max_d2 into heap."""
+        if not self.nodes:
+            return
+        nodes, coords, ids = self.nodes, self.coords, self.ids
+        qx, qy, qz = query
+        stack = [(0, 0.0)]
+        while stack:
+            node_index, plane_d2 = stack.pop()
+            bound = -heap[0][0] if len(heap) == k else max_d2
+            if plane_d2 > bound:
+                continue
+            node = nodes[node_index]
+            if node[0] == -1:
+                for i in range(node[1], node[2]):
+                    x, y, z = coords[i]
+                    d2 = (x - qx) ** 2 + (y - qy) ** 2 + (z - qz) ** 2
+                    if d2 <= bound and ids[i] not in skip:
+                        if len(heap) == k:
+                            heapq.heapreplace(heap, (-d2, ids[i]))
+                        else:
+                            heapq.heappush(heap, (-d2, ids[i]))
+                        bound = -heap[0][0] if len(heap) == k else max_d2
+                continue
+            axis, split, left, right = node
+            diff = query[axis] - split
+            near, far = (left, right) if diff < 0 else (right, left)
+            # Far side first on the stack so the near side is searched first
+            stack.append((far, diff * diff))
+            stack.append((near, 0.0))
+
+
+class AirportIndex:
+    """Spatial index of all airports, loaded from the table on first use.
+
+    Writes in this process are applied incrementally: new or moved airports go to a
+    small pending set scanned alongside the tree, and their old tree entries are
+    skipped until enough changes pile up to rebuild the tree from memory. Each worker
+    has its own index, so the TTL bounds how long another worker's writes go unseen.
+    """
+
+    def __init__(self, ttl, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.airports = None  # airport_id -> to_dict() snapshot
+        self._points = {}  # airport_id -> unit vector
+        self._tree = KDTree([])
+        self._pending = {}  # Added or moved since the last build
+        self._stale = set()  # Tree entries to skip (moved or deleted)
+        self._expires = 0.0
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # From the primary: the index outlives the request and must not start out behind
+        with use_primary():
+            rows = db.session.execute(fast_json.AIRPORTS.statement()).all()
+        self.airports = {}
+        self._points = {}
+        for row in rows:
+            airport = fast_json.AIRPORTS.convert(row)
+            self.airports[airport['airport_id']] = airport
+            self._points[airport['airport_id']] = to_unit_vector(float(airport['latitude']), float(airport['longitude']))
+        self._rebuild()
+        self._expires = self.clock() + self.ttl
+
+    def _rebuild(self):
+        self._tree = KDTree(self._points.items())
+        self._pending = {}
+        self._stale = set()
+        self.rebuilds += 1
+
+    def _ensure_loaded(self):
+        if self.airports is None or self._expires <= self.clock():
+            self._load()
+
+    def nearest(self, latitude, longitude, k, radius_km=None):
+        """Returns up to k (airport dict, distance_km) pairs, closest first."""
+        query = to_unit_vector(latitude, longitude)
+        max_d2 = 4.0 if radius_km is None else km_to_squared_chord(radius_km)
+        with self._lock:
+            self._ensure_loaded()
+            heap = []
+            self._tree.search(query, heap, k, max_d2, self._stale)
+            for airport_id, (x, y, z) in self._pending.items():
+                d2 = (x - query[0]) ** 2 + (y - query[1]) ** 2 + (z - query[2]) ** 2
+                if d2 <= (-heap[0][0] if len(heap) == k else max_d2):
+                    if len(heap) == k:
+                        heapq.heapreplace(heap, (-d2, airport_id))
+                    else:
+                        heapq.heappush(heap, (-d2, airport_id))
+            return [(self.airports[airport_id], chord_to_km(-d2)) for d2, airport_id in sorted(heap, reverse=True)]
+
+    def upsert(self, airport):
+        """Applies a created or updated airport (its to_dict())."""
+        with self._lock:
+            if self.airports is None:
+                return  # Not loaded yet; the first query reads the table
+            airport_id = airport['airport_id']
+            self.airports[airport_id] = airport
+            self._points[airport_id] = to_unit_vector(float(airport['latitude']), float(airport['longitude']))
+            self._stale.add(airport_id)
+            self._pending[airport_id] = self._points[airport_id]
+            self._maybe_rebuild()
+
+    def remove(self, airport_id):
+        with self._lock:
+            if self.airports is None or airport_id not in self.airports:
+                return
+            del self.airports[airport_id]
+            del self._points[airport_id]
+            self._pending.pop(airport_id, None)
+            self._stale.add(airport_id)
+            self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        if len(self._pending) + len(self._stale) > max(MIN_REBUILD_CHANGES, int(len(self._points) ** 0.5)):
+            self._rebuild()
+
+    def invalidate(self):
+        """Reloads from the table on the next query (e.g. after a bulk ingest)."""
+        with self._lock:
+            self.airports = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "airports": len(self._points) if self.airports is not None else 0,
+                "pending": len(self._pending),
+                "stale": len(self._stale),
+                "rebuilds": self.rebuilds,
+                "ttl_seconds": self.ttl,
+            }
+
+
+airport_index = AirportIndex(config.AIRPORT_INDEX_TTL)
@@ -0,0 +1,455 @@
+# bulk.py
+# Set-based ingest for the /<resource>/bulk endpoints, and batched status updates
+# (PATCH /flights/status).
+import json
+from datetime import timezone
+from itertools import islice
+
+from dateutil import parser
+from sqlalchemy import DateTime, Integer, String, cast, column, literal_column, select, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
+
+from models import db, Airline, Airport, Flight, FLIGHT_STATUSES
+from services import partitions
+
+# Rows per multi-row INSERT statement (and per commit)
+BATCH_SIZE = 1000
+# How to treat rows whose unique key already exists
+CONFLICT_POLICIES = ('error', 'skip', 'upsert')
+# Allowed flight_status changes for PATCH /flights/status. Feeds may skip intermediate
+# states, but never move a flight backwards: Delayed can follow Boarding (held at the
+# gate), but a delayed flight does not go back to Scheduled. Landed, Cancelled and
+# Diverted are final. Repeating the current status is always allowed and changes nothing.
+STATUS_TRANSITIONS = {
+    'Scheduled': ('Delayed', 'Boarding', 'Departed', 'In Air', 'Cancelled'),
+    'Delayed': ('Boarding', 'Departed', 'In Air', 'Cancelled'),
+    'Boarding': ('Delayed', 'Departed', 'In Air', 'Cancelled'),
+    'Departed': ('In Air', 'Landed', 'Diverted'),
+    'In Air': ('Landed', 'Diverted'),
+    'Landed': (),
+    'Cancelled': (),
+    'Diverted': (),
+}
+# Per-row outcomes of a status update
+STATUS_RESULTS = ('updated', 'unchanged', 'stale', 'rejected', 'not_found', 'invalid', 'failed')
+
+
+class MalformedRecord:
+    """Stands in for an NDJSON line that is not valid JSON, reported as that row's error."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def iter_records(body_lines, is_ndjson):
+    """Yields decoded records from a JSON array or an NDJSON body.
+
+    NDJSON is decoded line by line so large feeds are never held in memory at once.
+    Earlier batches may be committed by the time a bad line is read, so it is yielded
+    as a MalformedRecord instead of failing the request. Raises ValueError if a JSON
+    array body is not valid.
+    """
+    if is_ndjson:
+        for line in body_lines:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield MalformedRecord(str(e))
+        return
+
+    records = json.loads(b''.join(body_lines))
+    if not isinstance(records, list):
+        raise ValueError("Expected a JSON array")
+    yield from records
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _parse_timestamp(value):
+    ts = parser.isoparse(value)
+    # Naive timestamps are taken as UTC so returned keys can be matched back to input rows
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+
+
+def _require(data, fields):
+    if not isinstance(data, dict) or not all(k in data for k in fields):
+        raise ValueError("Missing required fields")
+
+def _require_strings(data, fields):
+    # Keys and codes are matched in sets and IN lists, so e.g. a JSON list must not get that far
+    for field in fields:
+        if data.get(field) is not None and not isinstance(data[field], str):
+            raise ValueError(f"Invalid {field}")
+
+
+def prepare_airline(data):
+    _require(data, ('airline_id', 'iata_code', 'name'))
+    _require_strings(data, ('airline_id', 'iata_code', 'name', 'country'))
+    return {
+        'airline_id': data['airline_id'],
+        'iata_code': data['iata_code'],
+        'name': data['name'],
+        'country': data.get('country'),
+    }
+
+
+def prepare_airport(data):
+    _require(data, ('airport_id', 'icao_code', 'name', 'city', 'country', 'latitude', 'longitude'))
+    _require_strings(data, ('airport_id', 'icao_code', 'name', 'city', 'country'))
+    try:
+        latitude = float(data['latitude'])
+        longitude = float(data['longitude'])
+    except (TypeError, ValueError):
+        raise ValueError("Invalid latitude or longitude format")
+    return {
+        'airport_id': data['airport_id'],
+        'icao_code': data['icao_code'],
+        'name': data['name'],
+        'city': data['city'],
+        'country': data['country'],
+        'latitude': latitude,
+        'longitude': longitude,
+    }
+
+
+def prepare_flight(data):
+    _require(data, ('airline_id', 'flight_number', 'departure_airport', 'arrival_airport',
+                    'scheduled_departure', 'scheduled_arrival'))
+    _require_strings(data, ('airline_id', 'flight_number', 'departure_airport', 'arrival_airport'))
+    status = data.get('status', 'Scheduled')
+    if status not in FLIGHT_STATUSES:
+        raise ValueError(f"Invalid status {status}")
+    try:
+        return {
+            'airline_id': data['airline_id'],
+            'flight_number': data['flight_number'],
+            'departure_airport': data['departure_airport'],
+            'arrival_airport': data['arrival_airport'],
+            'scheduled_departure': _parse_timestamp(data['scheduled_departure']),
+            'scheduled_arrival': _parse_timestamp(data['scheduled_arrival']),
+            'actual_departure': _parse_timestamp(data['actual_departure']) if data.get('actual_departure') else None,
+            'actual_arrival': _parse_timestamp(data['actual_arrival']) if data.get('actual_arrival') else None,
+            'status': status,
+        }
+    except (TypeError, ValueError):
+        raise ValueError("Invalid timestamp format. Use ISO 8601 format.")
+
+
+def check_flight_fks(rows):
+    """Returns an error message (or None) per row, using one query per referenced table.
+
+    Rows scheduled outside every partition are refused here too, rather than failing
+    the whole batch's INSERT.
+    """
+    airline_ids = {row['airline_id'] for row in rows}
+    airport_ids = {row['departure_airport'] for row in rows} | {row['arrival_airport'] for row in rows}
+    known_airlines = set(db.session.scalars(select(Airline.airline_id).where(Airline.airline_id.in_(airline_ids))))
+    known_airports = set(db.session.scalars(select(Airport.airport_id).where(Airport.airport_id.in_(airport_ids))))
+    months = partitions.partition_months()
+
+    messages = []
+    for row in rows:
+        if not partitions.has_partition(months, row['scheduled_departure']):
+            messages.append(partitions.MISSING_PARTITION_MESSAGE)
+        elif row['airline_id'] not in known_airlines:
+            messages.append(f"Airline {row['airline_id']} not found")
+        elif row['departure_airport'] not in known_airports:
+            messages.append(f"Departure airport {row['departure_airport']} not found")
+        elif row['arrival_airport'] not in known_airports:
+            messages.append(f"Arrival airport {row['arrival_airport']} not found")
+        else:
+            messages.append(None)
+    return messages
+
+
+def _check_unique(rows, model, key_column, unique_column):
+    """Error message (or None) per row whose unique_column value belongs to another record.
+
+    ON CONFLICT only covers the key, so such a row would otherwise fail its whole batch.
+    """
+    key, unique = getattr(model, key_column), getattr(model, unique_column)
+    owners = dict(db.session.execute(
+        select(unique, key).where(unique.in_({row[unique_column] for row in rows}))
+    ).all())
+    messages, claimed = [], {}
+    for row in rows:
+        value = row[unique_column]
+        owner = owners.get(value, claimed.get(value))
+        if owner is not None and owner != row[key_column]:
+            messages.append(f"{unique_column} {value} already belongs to {model.__name__.lower()} {owner}")
+        else:
+            claimed[value] = row[key_column]
+            messages.append(None)
+    return messages
+
+def check_airline_codes(rows):
+    return _check_unique(rows, Airline, 'airline_id', 'iata_code')
+
+def check_airport_codes(rows):
+    return _check_unique(rows, Airport, 'airport_id', 'icao_code')
+
+
+# Per-model settings: row preparation, unique key used for conflicts, optional set-based
+# check returning an error message (or None) per row
+BULK_MODELS = {
+    Airline: (prepare_airline, ('airline_id',), check_airline_codes),
+    Airport: (prepare_airport, ('airport_id',), check_airport_codes),
+    Flight: (prepare_flight, ('airline_id', 'flight_number', 'scheduled_departure'), check_flight_fks),
+}
+
+
+def _write_batch(model, rows, key_columns, policy):
+    """Inserts rows with one statement, returning {key: 'inserted' | 'updated'} for rows written."""
+    table = model.__table__
+    stmt = pg_insert(table).values(rows)
+    if policy == 'upsert':
+        update_columns = [c for c in rows[0] if c not in key_columns]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={c: stmt.excluded[c] for c in update_columns},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=key_columns)
+    # xmax is 0 for freshly inserted tuples and non-zero for ones updated by ON CONFLICT
+    stmt = stmt.returning(*(table.c[c] for c in key_columns), literal_column('xmax = 0').label('inserted'))
+
+    written = {}
+    for row in db.session.execute(stmt):
+        written[tuple(row[:-1])] = 'inserted' if row.inserted else 'updated'
+    return written
+
+
+def bulk_ingest(model, records, policy='error', batch_size=BATCH_SIZE):
+    """Validates and inserts records in batches, returning a per-row report.
+
+    Each batch is committed on its own, so rows in earlier batches stay written
+    if a later batch fails.
+    """
+    prepare, key_columns, check_rows = BULK_MODELS[model]
+    report = {"inserted": 0, "updated": 0, "skipped": 0, "errors": []}
+
+    for batch in _batched(enumerate(records), batch_size):
+        rows, indexes, seen = [], [], set()
+        for index, data in batch:
+            if isinstance(data, MalformedRecord):
+                report["errors"].append({"index": index, "message": "Invalid JSON", "error": data.error})
+                continue
+            try:
+                row = prepare(data)
+            except ValueError as e:
+                report["errors"].append({"index": index, "message": str(e)})
+                continue
+            key = tuple(row[c] for c in key_columns)
+            # A single INSERT ... ON CONFLICT cannot touch the same key twice
+            if key in seen:
+                report["errors"].append({"index": index, "message": "Duplicate record in request"})
+                continue
+            seen.add(key)
+            rows.append(row)
+            indexes.append(index)
+
+        if rows and check_rows:
+            valid_rows, valid_indexes = [], []
+            for row, index, message in zip(rows, indexes, check_rows(rows)):
+                if message:
+                    report["errors"].append({"index": index, "message": message})
+                else:
+                    valid_rows.append(row)
+                    valid_indexes.append(index)
+            rows, indexes = valid_rows, valid_indexes
+
+        if not rows:
+            continue
+
+        failed = set()
+        try:
+            written = _write_batch(model, rows, key_columns, policy)
+            db.session.commit()
+        except (IntegrityError, DataError):
+            db.session.rollback()
+            # A row the checks could not foresee (e.g. a value too long for its column):
+            # write the batch row by row, so only the offending rows are reported
+            written = {}
+            for row, index in zip(rows, indexes):
+                try:
+                    written.update(_write_batch(model, [row], key_columns, policy))
+                    db.session.commit()
+                except (IntegrityError, DataError) as e:
+                    db.session.rollback()
+                    failed.add(index)
+                    report["errors"].append(
+                        {"index": index, "message": f"Failed to create {model.__name__.lower()}", "error": str(e)}
+                    )
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            report["errors"].extend(
+                {"index": index, "message": f"Failed to create {model.__name__.lower()}", "error": str(e)}
+                for index in indexes
+            )
+            continue
+
+        for row, index in zip(rows, indexes):
+            if index in failed:
+                continue
+            outcome = written.get(tuple(row[c] for c in key_columns))
+            if outcome:
+                report[outcome] += 1
+            elif policy == 'skip':
+                report["skipped"] += 1
+            else:
+                report["errors"].append({"index": index, "message": f"{model.__name__} already exists"})
+
+    return report
+
+
+def prepare_status_update(data):
+    """Validates one PATCH /flights/status record; returns the flight_id, status and actual times given."""
+    _require(data, ('flight_id', 'status'))
+    if not isinstance(data['flight_id'], int) or isinstance(data['flight_id'], bool):
+        raise ValueError("Invalid flight_id")
+    if data['status'] not in FLIGHT_STATUSES:
+        raise ValueError(f"Invalid status {data['status']}")
+    row = {'flight_id': data['flight_id'], 'status': data['status']}
+    try:
+        for field in ('actual_departure', 'actual_arrival'):
+            if field in data:
+                row[field] = _parse_timestamp(data[field]) if data[field] else None
+    except (TypeError, ValueError):
+        raise ValueError("Invalid timestamp format. Use ISO 8601 format.")
+    return row
+
+
+def _write_statuses(changed):
+    """Writes {flight_id: new state} with one UPDATE ... FROM (VALUES ...); returns the flights' to_dict()."""
+    changes = values(
+        column('flight_id', Integer),
+        column('scheduled_departure', DateTime(timezone=True)),
+        column('status', String),
+        column('actual_departure', DateTime(timezone=True)),
+        column('actual_arrival', DateTime(timezone=True)),
+        name='changes',
+    ).data([
+        (flight_id, state['scheduled_departure'], state['status'], state['actual_departure'], state['actual_arrival'])
+        for flight_id, state in changed.items()
+    ])
+    stmt = update(Flight).where(
+        Flight.flight_id == changes.c.flight_id,
+        # Lets PostgreSQL go straight to each flight's month partition
+        Flight.scheduled_departure == changes.c.scheduled_departure,
+    ).values(
+        status=cast(changes.c.status, Flight.status.type),
+        # Cast so a column of NULLs is not taken as text
+        actual_departure=cast(changes.c.actual_departure, DateTime(timezone=True)),
+        actual_arrival=cast(changes.c.actual_arrival, DateTime(timezone=True)),
+    ).returning(Flight).execution_options(synchronize_session=False)
+    return [flight.to_dict() for flight in db.session.execute(stmt).scalars()]
+
+
+def apply_status_batch(rows, check_transitions=True):
+    """Validates (index, row) pairs against the stored flights and writes the changes.
+
+    Rows hold a flight_id and any of status, actual_departure and actual_arrival.
+    Returns (results, updated flights); the caller commits. Rows for the same flight
+    apply in order, so a batch may carry e.g. Boarding then Departed for one flight.
+
+    A disallowed status is stale rather than rejected when a later row of the batch takes
+    the flight to its current status: the batch is a replay of steps it already recorded
+    (a client retrying Boarding, Departed for a Departed flight).
+    """
+    flight_ids = sorted({row['flight_id'] for _, row in rows})
+    # Locked in flight_id order, so concurrent overlapping batches cannot deadlock
+    stored = db.session.execute(
+        select(Flight.flight_id, Flight.scheduled_departure, Flight.status,
+               Flight.actual_departure, Flight.actual_arrival)
+        .where(Flight.flight_id.in_(flight_ids)).order_by(Flight.flight_id).with_for_update()
+    )
+    states = {flight.flight_id: dict(flight._mapping) for flight in stored}
+
+    # Statuses each row's flight is sent to by the rows after it
+    upcoming, statuses = [], {}
+    for _, row in reversed(rows):
+        later = statuses.setdefault(row['flight_id'], set())
+        upcoming.append(frozenset(later))
+        if 'status' in row:
+            later.add(row['status'])
+    upcoming.reverse()
+
+    results, changed = [], {}
+    for (index, row), later in zip(rows, upcoming):
+        result = {"index": index, "flight_id": row['flight_id']}
+        state = states.get(row['flight_id'])
+        if state is None:
+            results.append({**result, "result": "not_found", "message": "Flight not found"})
+            continue
+        status = row.get('status', state['status'])
+        if check_transitions and status != state['status'] and status not in STATUS_TRANSITIONS[state['status']]:
+            if state['status'] in later:
+                results.append({**result, "result": "stale", "status": state['status'],
+                                "message": f"Flight is already past {status}"})
+            else:
+                results.append({**result, "result": "rejected", "status": state['status'],
+                                "message": f"Cannot change status from {state['status']} to {status}"})
+            continue
+        new_state = {**state, **row}
+        if new_state == state:
+            results.append({**result, "result": "unchanged", "status": state['status']})
+            continue
+        states[row['flight_id']] = changed[row['flight_id']] = new_state
+        results.append({**result, "result": "updated", "status": new_state['status']})
+
+    return results, _write_statuses(changed) if changed else []
+
+
+def apply_status_updates(records, batch_size=BATCH_SIZE, on_commit=None):
+    """Applies {flight_id, status, actual_departure?, actual_arrival?} records in batches.
+
+    Each batch is one locking SELECT, one UPDATE and one commit. Returns counts per
+    outcome and a result per record, in input order. on_commit, if given, is called
+    with the updated flights' to_dict() after each batch commits.
+    """
+    report = {outcome: 0 for outcome in STATUS_RESULTS}
+    report["results"] = []
+
+    for batch in _batched(enumerate(records), batch_size):
+        results, rows = [], []
+        for index, data in batch:
+            if isinstance(data, MalformedRecord):
+                results.append({"index": index, "flight_id": None, "result": "invalid",
+                                "message": "Invalid JSON", "error": data.error})
+                continue
+            try:
+                rows.append((index, prepare_status_update(data)))
+            except ValueError as e:
+                flight_id = data.get('flight_id') if isinstance(data, dict) else None
+                results.append({"index": index, "flight_id": flight_id, "result": "invalid", "message": str(e)})
+
+        flights = []
+        if rows:
+            try:
+                applied, flights = apply_status_batch(rows)
+                db.session.commit()
+                results.extend(applied)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                flights = []
+                results.extend(
+                    {"index": index, "flight_id": row['flight_id'], "result": "failed",
+                     "message": "Failed to update flight status", "error": str(e)}
+                    for index, row in rows
+                )
+
+        results.sort(key=lambda result: result["index"])
+        for result in results:
+            report[result["result"]] += 1
+        report["results"].extend(results)
+        if flights and on_commit:
+            on_commit(flights)
+
+    return report
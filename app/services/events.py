@@ -0,0 +1,173 @@
+# events.py
+# In-process pub/sub of flight changes, feeding GET /flights/stream.
+import asyncio
+import json
+import logging
+import queue
+import select
+import threading
+
+from database import config
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL channel used by the 'postgres' backend
+NOTIFY_CHANNEL = 'flight_events'
+
+
+class Subscription:
+    """A subscriber's bounded queue plus the filters it was opened with.
+
+    If the consumer falls behind and the queue fills up, the subscription is
+    marked as overflowed and receives no more events; the stream then closes and
+    the client should resync from GET /flights/changes.
+    """
+
+    def __init__(self, airline_id=None, airport=None, statuses=None, max_queue=256):
+        self.airline_id = airline_id
+        self.airport = airport
+        self.statuses = set(statuses) if statuses else None
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def matches(self, flight):
+        if self.airline_id and flight.get('airline_id') != self.airline_id:
+            return False
+        if self.airport and self.airport not in (flight.get('departure_airport'), flight.get('arrival_airport')):
+            return False
+        if self.statuses and flight.get('status') not in self.statuses:
+            return False
+        return True
+
+    def offer(self, event):
+        if self.overflowed or not self.matches(event['flight']):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+
+class AsyncSubscription(Subscription):
+    """Subscription delivering into an asyncio.Queue on the given event loop (used by asgi.py)."""
+
+    def __init__(self, loop, airline_id=None, airport=None, statuses=None, max_queue=256):
+        super().__init__(airline_id, airport, statuses, max_queue)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def offer(self, event):
+        if self.overflowed or not self.matches(event['flight']):
+            return
+        # Publishers run on other threads; hand the event to the loop that owns the queue
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class FlightEventBus:
+    """Delivers events to subscribers in this process."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def dispatch(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.offer(event)
+
+    def publish(self, kind, flight):
+        """Called by the write handlers after commit."""
+        self.dispatch({"type": kind, "flight": flight})
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+class PostgresFlightEventBus(FlightEventBus):
+    """Fans events out to every worker through PostgreSQL LISTEN/NOTIFY.
+
+    publish() only sends a NOTIFY; each worker, including the publisher, receives
+    it on a background LISTEN connection and dispatches it locally.
+    """
+
+    def __init__(self, dsn):
+        super().__init__()
+        self.dsn = dsn
+        self._listener = None
+        self._publish_connection = None
+        self._publish_lock = threading.Lock()
+
+    def _connect(self):
+        import psycopg2
+        connection = psycopg2.connect(self.dsn)
+        connection.autocommit = True
+        return connection
+
+    def publish(self, kind, flight):
+        payload = json.dumps({"type": kind, "flight": flight})
+        with self._publish_lock:
+            try:
+                if self._publish_connection is None or self._publish_connection.closed:
+                    self._publish_connection = self._connect()
+                with self._publish_connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, payload))
+            except Exception:
+                # The write is already committed; a lost notification must not fail the request
+                logger.exception("Failed to publish flight event")
+                self._publish_connection = None
+
+    def subscribe(self, subscription):
+        self._ensure_listener()
+        return super().subscribe(subscription)
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='flight-events-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            connection = None
+            try:
+                connection = self._connect()
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                while True:
+                    if select.select([connection], [], [], 5) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        self.dispatch(json.loads(notify.payload))
+            except Exception:
+                logger.exception("Flight event listener failed, reconnecting")
+                if connection is not None:
+                    connection.close()
+                threading.Event().wait(1)
+
+
+def create_event_bus():
+    if config.EVENT_BACKEND == 'postgres':
+        return PostgresFlightEventBus(config.EVENT_NOTIFY_DSN)
+    return FlightEventBus()
+
+
+event_bus = create_event_bus()
@@ -0,0 +1,231 @@
+# export.py
+# Bulk export for GET /flights/export: every flight matching the /flights filters, as a
+# stream whose memory use does not grow with the number of rows.
+#
+#   csv      PostgreSQL COPY ... TO STDOUT, passed through in chunks without building a
+#            Python object per row (the csv module on other databases)
+#   ndjson   one JSON object per line from a server-side cursor (services/fast_json.py)
+#   parquet  record batches of EXPORT_BATCH_ROWS rows from a server-side cursor, one row
+#   arrow    group (Parquet) or IPC stream message (Arrow) each; needs pyarrow
+#
+# Callers own the HTTP response and the session, as with services/flight_api.py.
+import csv
+import io
+import queue
+import threading
+
+from sqlalchemy import Boolean, DateTime, Integer, Numeric, text
+
+from database import config
+from models import Flight
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Optional: only format=parquet and format=arrow need it
+    pyarrow = None
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+ARROW_FORMATS = ('parquet', 'arrow')
+# COPY output is handed over in chunks of about this size; at most COPY_QUEUE_CHUNKS
+# of them wait for a slow client before COPY itself is held back
+COPY_CHUNK_BYTES = 256 * 1024
+COPY_QUEUE_CHUNKS = 16
+
+
+def parse_format(args):
+    """The requested export format; raises ValueError with a client-facing message."""
+    fmt = args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Invalid format. Use one of {', '.join(EXPORT_FORMATS)}.")
+    return fmt
+
+def available(fmt):
+    """False when the format needs pyarrow and it is not installed."""
+    return fmt not in ARROW_FORMATS or pyarrow is not None
+
+def export_statement(filters, serializer, descending=True):
+    """The /flights listing query without pagination or the extra cursor columns."""
+    query = serializer.statement().where(*filters)
+    if descending:
+        return query.order_by(Flight.scheduled_departure.desc(), Flight.flight_id.desc())
+    return query.order_by(Flight.scheduled_departure, Flight.flight_id)
+
+
+# --- CSV ---
+
+class _CopySink:
+    """File-like target for psycopg2's copy_expert, read from by the response generator."""
+
+    def __init__(self):
+        self.queue = queue.Queue(COPY_QUEUE_CHUNKS)
+        self.cancelled = False
+        self.error = None
+        self._pending = []
+        self._pending_bytes = 0
+
+    def _put(self, item):
+        # Gives up once the response is closed, so COPY cannot block on a gone client
+        while not self.cancelled:
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, data):
+        self._pending.append(bytes(data))
+        self._pending_bytes += len(data)
+        if self._pending_bytes >= COPY_CHUNK_BYTES:
+            self._put(b''.join(self._pending))
+            self._pending = []
+            self._pending_bytes = 0
+
+    def finish(self, error=None):
+        self.error = error
+        if self._pending:
+            self._put(b''.join(self._pending))
+        self._put(None)
+
+
+def _copy_chunks(session, statement):
+    connection = session.connection()
+    dbapi_connection = connection.connection.dbapi_connection
+    # A single COPY statement runs for the whole export; the transaction ends with the request
+    session.execute(text(f"SET LOCAL statement_timeout = {int(config.EXPORT_STATEMENT_TIMEOUT_MS)}"))
+    session.execute(text("SET LOCAL TimeZone = 'UTC'"))
+    cursor = dbapi_connection.cursor()
+    compiled = statement.compile(dialect=connection.dialect)
+    query = cursor.mogrify(str(compiled), compiled.params).decode()
+    sink = _CopySink()
+
+    def run():
+        try:
+            cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", sink)
+        except Exception as e:
+            sink.finish(e)
+        else:
+            sink.finish()
+
+    # copy_expert only returns at the end, so it writes from a thread while this
+    # generator hands its chunks to the server as they arrive
+    worker = threading.Thread(target=run, name='flights-export-copy', daemon=True)
+    worker.start()
+    try:
+        while True:
+            chunk = sink.queue.get()
+            if chunk is None:
+                break
+            yield chunk
+        if sink.error is not None:
+            raise sink.error
+    finally:
+        if worker.is_alive():
+            # Client went away: stop the COPY on the server rather than reading it to the end
+            sink.cancelled = True
+            dbapi_connection.cancel()
+            worker.join()
+
+def _csv_chunks(rows, serializer):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(serializer.keys)
+    for batch in rows.partitions():
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+# --- NDJSON ---
+
+def _ndjson_chunks(rows, serializer):
+    dumps_row = serializer.dumps_row
+    for batch in rows.partitions():
+        yield b''.join(dumps_row(row) + b'\n' for row in batch)
+
+
+# --- Parquet / Arrow ---
+
+class _BufferSink(io.RawIOBase):
+    """Write-only file that collects what pyarrow writes until take() hands it out."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_type(column_type):
+    if isinstance(column_type, DateTime):
+        return pyarrow.timestamp('us', tz='UTC' if column_type.timezone else None)
+    if isinstance(column_type, Boolean):
+        return pyarrow.bool_()
+    if isinstance(column_type, Integer):
+        return pyarrow.int64()
+    if isinstance(column_type, Numeric):
+        return pyarrow.decimal128(column_type.precision or 38, column_type.scale or 0)
+    return pyarrow.string()
+
+def arrow_schema(serializer):
+    return pyarrow.schema([
+        pyarrow.field(column.key, _arrow_type(column.type), nullable=column.nullable)
+        for column in serializer.columns
+    ])
+
+def _arrow_chunks(rows, serializer, fmt):
+    schema = arrow_schema(serializer)
+    sink = _BufferSink()
+    if fmt == 'parquet':
+        writer = pyarrow.parquet.ParquetWriter(sink, schema, compression='zstd')
+    else:
+        writer = pyarrow.ipc.new_stream(sink, schema)
+    for batch in rows.partitions():
+        # Column by column: pyarrow converts each list in C
+        columns = zip(*batch)
+        writer.write_batch(pyarrow.record_batch(
+            [pyarrow.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+        ))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def export_chunks(session, statement, serializer, fmt):
+    """Yields the export as byte chunks; runs its queries as it is consumed."""
+    if fmt == 'csv' and session.get_bind().dialect.name == 'postgresql':
+        yield from _copy_chunks(session, statement)
+        return
+    # Server-side cursor: EXPORT_BATCH_ROWS rows in memory at a time
+    rows = session.execute(statement.execution_options(yield_per=config.EXPORT_BATCH_ROWS))
+    if fmt == 'csv':
+        yield from _csv_chunks(rows, serializer)
+    elif fmt == 'ndjson':
+        yield from _ndjson_chunks(rows, serializer)
+    else:
+        yield from _arrow_chunks(rows, serializer, fmt)
@@ -0,0 +1,101 @@
+# fast_json.py
+# Read-only listing path that skips ORM hydration: select plain columns, get row
+# tuples back, and turn them into JSON bytes with a serializer compiled per model.
+# Uses orjson when it is installed, the standard json module otherwise.
+import json
+
+from sqlalchemy import DateTime, Numeric, select
+
+from models import Airline, Airport, Flight
+
+try:
+    import orjson
+except ImportError:  # Optional accelerator
+    orjson = None
+
+
+def _compile_converter(keys, kinds):
+    """Builds `convert(row) -> dict` as straight-line code, one expression per column.
+
+    Datetimes become ISO 8601 strings (orjson encodes them natively in the same
+    format) and Decimals become strings, matching the models' to_dict().
+    """
+    fields = []
+    for index, (key, kind) in enumerate(zip(keys, kinds)):
+        value = f"row[{index}]"
+        if kind == 'datetime' and orjson is None:
+            value = f"(None if {value} is None else {value}.isoformat())"
+        elif kind == 'decimal':
+            value = f"(None if {value} is None else str({value}))"
+        fields.append(f"{key!r}: {value}")
+    source = "def convert(row):\n    return {" + ", ".join(fields) + "}\n"
+    namespace = {}
+    exec(compile(source, f"<serializer {','.join(keys)}>", 'exec'), namespace)
+    return namespace['convert']
+
+
+if orjson is not None:
+    def _dumps(value):
+        return orjson.dumps(value)
+else:
+    _encoder = json.JSONEncoder(separators=(',', ':'))
+
+    def _dumps(value):
+        return _encoder.encode(value).encode()
+
+
+class RowSerializer:
+    """Column projection plus a compiled row-to-JSON converter."""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.keys = [column.key for column in self.columns]
+        kinds = []
+        for column in self.columns:
+            if isinstance(column.type, DateTime):
+                kinds.append('datetime')
+            elif isinstance(column.type, Numeric):
+                kinds.append('decimal')
+            else:
+                kinds.append('plain')
+        self.convert = _compile_converter(self.keys, kinds)
+        self._subsets = {}
+
+    @classmethod
+    def for_model(cls, model):
+        # Same keys as to_dict(), in table order, so both paths produce the same objects
+        return cls(column for column in model.__table__.columns if column.key in model().to_dict())
+
+    def subset(self, keys):
+        """Serializer for only the given keys (kept in this serializer's order).
+
+        Raises ValueError for keys this serializer does not have.
+        """
+        unknown = set(keys) - set(self.keys)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        wanted = tuple(key for key in self.keys if key in keys)
+        if wanted not in self._subsets:
+            self._subsets[wanted] = RowSerializer(column for column in self.columns if column.key in wanted)
+        return self._subsets[wanted]
+
+    def statement(self, *extra_columns):
+        """SELECT of just the serialized columns; rows come back as tuples, not model instances.
+
+        extra_columns are appended after the serialized ones and left out of the JSON.
+        """
+        return select(*self.columns, *extra_columns)
+
+    def dumps(self, rows):
+        """Encodes an iterable of rows as a JSON array (bytes)."""
+        convert = self.convert
+        return _dumps([convert(row) for row in rows])
+
+    def dumps_row(self, row):
+        return _dumps(self.convert(row))
+
+
+AIRLINES = RowSerializer.for_model(Airline)
+AIRPORTS = RowSerializer.for_model(Airport)
+FLIGHTS = RowSerializer.for_model(Flight)
+SERIALIZERS = {Airline: AIRLINES, Airport: AIRPORTS, Flight: FLIGHTS}
@@ -0,0 +1,296 @@
+# flight_api.py
+# Request parsing, statement building and serialization for the /flights routes.
+# Framework-free so app.py (Flask) and asgi.py (async) share one implementation;
+# callers own the HTTP request/response and the database session.
+import base64
+import hashlib
+import json
+from datetime import datetime, time, timedelta, timezone
+
+from dateutil import parser
+from sqlalchemy import func, literal, literal_column, select, tuple_, union_all
+
+from models import Airline, Airport, Flight, FlightTombstone
+from services.fast_json import FLIGHTS
+
+# Page size bounds for keyset pagination on GET /flights
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Rows fetched per round trip from the server-side cursor when streaming
+STREAM_BATCH_SIZE = 1000
+STREAM_FORMATS = ('json', 'ndjson')
+
+FLIGHT_REQUIRED_FIELDS = ('airline_id', 'flight_number', 'departure_airport', 'arrival_airport',
+                          'scheduled_departure', 'scheduled_arrival')
+
+# Oldest transaction id still running; changes from it or later may not be visible yet
+SNAPSHOT_XMIN = literal_column('pg_snapshot_xmin(pg_current_snapshot())::text::bigint')
+
+
+# --- Cursors ---
+
+def encode_cursor(row):
+    """Builds an opaque cursor from the last row of a page (see flights_statement)."""
+    raw = f"{row.cursor_departure.isoformat()}|{row.cursor_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """Returns (scheduled_departure, flight_id) for a cursor, raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        scheduled_departure, flight_id = raw.rsplit('|', 1)
+        return parser.isoparse(scheduled_departure), int(flight_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+def encode_change_cursor(change_txid, flight_id):
+    return base64.urlsafe_b64encode(f"{change_txid}|{flight_id}".encode()).decode()
+
+def decode_change_cursor(cursor):
+    """Returns (change_txid, flight_id) for a change-feed cursor, raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        change_txid, flight_id = raw.split('|')
+        return int(change_txid), int(flight_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+def parse_page_size(limit):
+    """Returns the page size for a ?limit= value, raises ValueError if out of range."""
+    page_size = min(int(limit), MAX_PAGE_SIZE) if limit else DEFAULT_PAGE_SIZE
+    if page_size < 1:
+        raise ValueError
+    return page_size
+
+INVALID_LIMIT_MESSAGE = f"Invalid limit. Use an integer between 1 and {MAX_PAGE_SIZE}."
+
+
+# --- Listing ---
+
+# Equality filters: query parameter -> column. Each is the leading column of a composite
+# index ending in (scheduled_departure, flight_id); see airport_tracker.sql.
+EQUALITY_FILTERS = {
+    'status': Flight.status,
+    'airline_id': Flight.airline_id,
+    'departure_airport': Flight.departure_airport,
+    'arrival_airport': Flight.arrival_airport,
+    'flight_number': Flight.flight_number,
+}
+SORT_OPTIONS = ('-scheduled_departure', 'scheduled_departure')
+INVALID_TIMESTAMP_MESSAGE = "Invalid timestamp format. Use ISO 8601 format."
+
+def _parse_instant(value):
+    ts = parser.isoparse(value)
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+
+def flight_filters(args):
+    """Builds the WHERE conditions for the /flights filter query parameters.
+
+    Raises ValueError with a client-facing message for malformed values.
+    """
+    filters = []
+    for name, column in EQUALITY_FILTERS.items():
+        value = args.get(name)
+        if value:
+            filters.append(column == value)
+
+    # Time window on scheduled_departure: departs_after inclusive, departs_before exclusive.
+    # date=YYYY-MM-DD is shorthand for that UTC day.
+    try:
+        if args.get('date'):
+            day = datetime.combine(datetime.strptime(args['date'], '%Y-%m-%d').date(), time(), timezone.utc)
+            filters.append(Flight.scheduled_departure >= day)
+            filters.append(Flight.scheduled_departure < day + timedelta(days=1))
+        if args.get('departs_after'):
+            filters.append(Flight.scheduled_departure >= _parse_instant(args['departs_after']))
+        if args.get('departs_before'):
+            filters.append(Flight.scheduled_departure < _parse_instant(args['departs_before']))
+    except ValueError:
+        raise ValueError(INVALID_TIMESTAMP_MESSAGE)
+    return filters
+
+def flight_serializer(args):
+    """Serializer for ?fields=a,b,c (all fields by default); raises ValueError for unknown fields."""
+    fields = args.get('fields')
+    if not fields:
+        return FLIGHTS
+    return FLIGHTS.subset([field.strip() for field in fields.split(',') if field.strip()])
+
+def sort_descending(args):
+    """True for newest-first (the default), False for ?sort=scheduled_departure."""
+    sort = args.get('sort', SORT_OPTIONS[0])
+    if sort not in SORT_OPTIONS:
+        raise ValueError(f"Invalid sort. Use one of {', '.join(SORT_OPTIONS)}.")
+    return sort == SORT_OPTIONS[0]
+
+def flights_statement(filters, serializer=FLIGHTS, descending=True):
+    """Listing query returning plain row tuples (no ORM hydration), to be encoded with serializer.
+
+    The sort key is always selected (as cursor_departure/cursor_id) so pages can be
+    chained whatever ?fields= asks for, and updated_at (as cursor_updated_at) for the
+    page's ETag.
+    """
+    query = serializer.statement(
+        Flight.scheduled_departure.label('cursor_departure'), Flight.flight_id.label('cursor_id'),
+        Flight.updated_at.label('cursor_updated_at'),
+    ).where(*filters)
+    # (scheduled_departure, flight_id) is unique, so pages never skip or repeat rows
+    if descending:
+        return query.order_by(Flight.scheduled_departure.desc(), Flight.flight_id.desc())
+    return query.order_by(Flight.scheduled_departure, Flight.flight_id)
+
+def page_statement(query, cursor, page_size, descending=True):
+    """Restricts a listing to the page after cursor; fetches one extra row to detect a next page."""
+    if cursor:
+        last = decode_cursor(cursor)
+        key = tuple_(Flight.scheduled_departure, Flight.flight_id)
+        query = query.where(key < last if descending else key > last)
+        # Implied by the row comparison, but only a plain bound on the partition key lets
+        # PostgreSQL skip the months already paged past
+        query = query.where(Flight.scheduled_departure <= last[0] if descending
+                            else Flight.scheduled_departure >= last[0])
+    return query.limit(page_size + 1)
+
+def stream_open(fmt):
+    return b'' if fmt == 'ndjson' else b'['
+
+def stream_item(row, fmt, first, serializer=FLIGHTS):
+    if fmt == 'ndjson':
+        return serializer.dumps_row(row) + b'\n'
+    return serializer.dumps_row(row) if first else b',' + serializer.dumps_row(row)
+
+def stream_close(fmt):
+    return b'' if fmt == 'ndjson' else b']'
+
+def stream_chunks(rows, fmt, serializer=FLIGHTS):
+    """Yields flight rows as JSON array or NDJSON byte chunks."""
+    yield stream_open(fmt)
+    first = True
+    for row in rows:
+        yield stream_item(row, fmt, first, serializer)
+        first = False
+    yield stream_close(fmt)
+
+
+# --- Server-Sent Events ---
+
+SSE_PREAMBLE = 'retry: 3000\n\n'
+SSE_OVERFLOW = 'event: overflow\ndata: {}\n\n'
+# Comment line keeps proxies from closing an idle connection
+SSE_KEEPALIVE = ': keepalive\n\n'
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no', # Disable nginx response buffering
+}
+
+def sse_event(event):
+    return f"event: flight.{event['type']}\ndata: {json.dumps(event['flight'])}\n\n"
+
+
+# --- Conditional requests ---
+
+def flight_etag(flight_id, updated_at):
+    return f"{flight_id}-{updated_at.timestamp():.6f}" if updated_at else str(flight_id)
+
+def collection_validators_statement(filters):
+    return select(func.max(Flight.updated_at), func.count()).select_from(Flight).where(*filters)
+
+def collection_etag(last_modified, count, query_string):
+    # The query string is part of the tag since cursor/limit change the body
+    raw = f"{last_modified.isoformat() if last_modified else ''}|{count}|{query_string}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def page_etag(rows, query_string):
+    """ETag for a keyset page from the rows fetched for it (including the look-ahead row).
+
+    Built from the page itself, so a conditional page request costs no more than the
+    page; any insert, update or delete that changes the page changes its ids or times.
+    """
+    raw = '|'.join(
+        f"{row.cursor_id}:{row.cursor_updated_at.timestamp() if row.cursor_updated_at else ''}" for row in rows
+    )
+    return hashlib.sha1(f"{raw}|{query_string}".encode()).hexdigest()
+
+def validators_match(if_none_match, if_modified_since, etag, last_modified):
+    """if_none_match is a container of tags (or None), if_modified_since an aware datetime (or None)."""
+    if if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        return '*' in if_none_match or etag in if_none_match
+    if if_modified_since and last_modified:
+        # HTTP dates have second precision
+        return last_modified.replace(microsecond=0) <= if_modified_since
+    return False
+
+
+# --- Change feed ---
+
+def change_feed_statement(position, page_size):
+    def changed(model, deleted):
+        key = tuple_(model.change_txid, model.flight_id)
+        return select(model.change_txid, model.flight_id, literal(deleted).label('deleted')).where(
+            key > position, model.change_txid < SNAPSHOT_XMIN
+        )
+
+    # Both branches are range scans on their (change_txid, flight_id) index
+    changes = union_all(changed(Flight, False), changed(FlightTombstone, True)).subquery()
+    return select(changes).order_by(changes.c.change_txid, changes.c.flight_id).limit(page_size + 1)
+
+def change_feed_body(rows, flights, page_size, since):
+    """Builds the response body from change rows and the {flight_id: Flight} rows they refer to."""
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    results = []
+    for row in rows:
+        flight = flights.get(row.flight_id)
+        if row.deleted or flight is None:
+            # Deleted since the feed query ran: report the delete now
+            results.append({"op": "delete", "flight_id": row.flight_id})
+        else:
+            results.append({"op": "upsert", "flight": flight.to_dict()})
+
+    next_since = encode_change_cursor(rows[-1].change_txid, rows[-1].flight_id) if rows else since
+    return {"changes": results, "next_since": next_since, "has_more": has_more}
+
+
+# --- Writes ---
+
+def flight_fk_checks(data):
+    """Returns (model, identifier, error message) for each foreign key present in data, in check order."""
+    checks = []
+    if 'airline_id' in data:
+        checks.append((Airline, data['airline_id'], f"Airline {data['airline_id']} not found"))
+    if 'departure_airport' in data:
+        checks.append((Airport, data['departure_airport'], f"Departure airport {data['departure_airport']} not found"))
+    if 'arrival_airport' in data:
+        checks.append((Airport, data['arrival_airport'], f"Arrival airport {data['arrival_airport']} not found"))
+    return checks
+
+def parse_new_flight(data):
+    """Returns Flight column values for a create request; raises ValueError on bad timestamps."""
+    # Convert ISO timestamp strings back to datetime objects
+    return {
+        'airline_id': data['airline_id'],
+        'flight_number': data['flight_number'],
+        'departure_airport': data['departure_airport'],
+        'arrival_airport': data['arrival_airport'],
+        'scheduled_departure': parser.isoparse(data['scheduled_departure']),
+        'scheduled_arrival': parser.isoparse(data['scheduled_arrival']),
+        'actual_departure': parser.isoparse(data['actual_departure']) if data.get('actual_departure') else None,
+        'actual_arrival': parser.isoparse(data['actual_arrival']) if data.get('actual_arrival') else None,
+        'status': data.get('status', 'Scheduled'), # Use default if not provided
+    }
+
+def parse_flight_changes(data):
+    """Returns the Flight column values to change for an update request; raises ValueError on bad timestamps."""
+    changes = {}
+    # Update only fields provided in the request
+    for field in ('airline_id', 'flight_number', 'departure_airport', 'arrival_airport', 'status'):
+        if field in data:
+            changes[field] = data[field]
+    for field in ('scheduled_departure', 'scheduled_arrival'):
+        if field in data:
+            changes[field] = parser.isoparse(data[field])
+    for field in ('actual_departure', 'actual_arrival'):
+        if field in data:
+            changes[field] = parser.isoparse(data[field]) if data[field] else None
+    return changes
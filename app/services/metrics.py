@@ -0,0 +1,212 @@
+# metrics.py
+# Per-request instrumentation for the Flask app: latency, SQL statement count and time
+# (from SQLAlchemy engine events), rows returned and response size, per route and
+# status code. Rendered in the Prometheus text format at GET /metrics.
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from database import config
+from database.pool import WAIT_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the request latency histogram
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Statements kept per request for the slow-request log
+MAX_LOGGED_STATEMENTS = 50
+MAX_STATEMENT_CHARS = 500
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised after a request that issued more than MAX_QUERIES_PER_REQUEST statements.
+
+    Raised from an after_request hook, so handlers cannot swallow it; with
+    app.testing set, the test client re-raises it in the test.
+    """
+
+
+class SqlStats:
+    """SQL work done on behalf of one request."""
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.log = []  # (seconds, statement), first MAX_LOGGED_STATEMENTS only
+
+
+# Set for the duration of a request; engine events outside a request are not counted
+_current = ContextVar('request_sql_stats', default=None)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.statements += 1
+    stats.seconds += elapsed
+    # -1 for server-side cursors, whose rows are not known up front
+    if cursor.rowcount > 0 and cursor.description is not None:
+        stats.rows += cursor.rowcount
+    if len(stats.log) < MAX_LOGGED_STATEMENTS:
+        stats.log.append((elapsed, statement[:MAX_STATEMENT_CHARS]))
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # Failed statements (timeouts, constraint violations) never reach after_cursor_execute;
+    # drop their start time so it does not pile up on the pooled connection
+    conn = context.connection
+    if conn is None or conn.closed or conn.invalidated:
+        return  # The DBAPI connection and its info are discarded anyway
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.seconds += elapsed
+        if len(stats.log) < MAX_LOGGED_STATEMENTS and context.statement:
+            stats.log.append((elapsed, context.statement[:MAX_STATEMENT_CHARS]))
+
+
+class RequestMetrics:
+    """Cumulative per-(route, method, status) series for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, labels, seconds, stats, response_bytes):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {
+                    'buckets': [0] * len(LATENCY_BUCKETS), 'count': 0, 'seconds': 0.0,
+                    'sql_statements': 0, 'sql_seconds': 0.0, 'rows': 0, 'bytes': 0,
+                }
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    series['buckets'][i] += 1
+            series['count'] += 1
+            series['seconds'] += seconds
+            series['sql_statements'] += stats.statements
+            series['sql_seconds'] += stats.seconds
+            series['rows'] += stats.rows
+            series['bytes'] += response_bytes
+
+    def render(self):
+        with self._lock:
+            series = {labels: {**values, 'buckets': list(values['buckets'])} for labels, values in self._series.items()}
+        lines = [
+            '# HELP http_request_duration_seconds Time spent in the handler.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for labels, values in sorted(series.items()):
+            label_text = _labels(labels)
+            for bound, count in zip(LATENCY_BUCKETS, values['buckets']):
+                lines.append(f'http_request_duration_seconds_bucket{{{label_text},le="{bound}"}} {count}')
+            lines.append(f'http_request_duration_seconds_bucket{{{label_text},le="+Inf"}} {values["count"]}')
+            lines.append(f'http_request_duration_seconds_sum{{{label_text}}} {values["seconds"]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{label_text}}} {values["count"]}')
+        for name, key, help_text in (
+            ('http_request_sql_statements_total', 'sql_statements', 'SQL statements executed by requests.'),
+            ('http_request_sql_seconds_total', 'sql_seconds', 'Time spent executing SQL for requests.'),
+            ('http_request_rows_total', 'rows', 'Rows returned by SQL statements for requests.'),
+            ('http_response_bytes_total', 'bytes', 'Response body bytes (responses with a known length).'),
+        ):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for labels, values in sorted(series.items()):
+                lines.append(f'{name}{{{_labels(labels)}}} {values[key]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    route, method, status = labels
+    route = route.replace('\\', '\\\\').replace('"', '\\"')
+    return f'route="{route}",method="{method}",status="{status}"'
+
+def render_pool(metrics, pool):
+    """Prometheus lines for a database/pool.py PoolMetrics snapshot."""
+    snapshot = metrics.snapshot(pool)
+    lines = []
+    for name, key, kind in (
+        ('db_pool_size', 'pool_size', 'gauge'),
+        ('db_pool_checked_out', 'checked_out', 'gauge'),
+        ('db_pool_overflow', 'overflow', 'gauge'),
+        ('db_pool_checkouts_total', 'checkouts', 'counter'),
+        ('db_pool_timeouts_total', 'timeouts', 'counter'),
+    ):
+        lines.append(f'# TYPE {name} {kind}')
+        lines.append(f'{name} {snapshot[key]}')
+    lines.append('# TYPE db_pool_wait_seconds histogram')
+    for bound in WAIT_BUCKETS:
+        lines.append(f'db_pool_wait_seconds_bucket{{le="{bound}"}} {snapshot["wait_buckets"][str(bound)]}')
+    lines.append(f'db_pool_wait_seconds_bucket{{le="+Inf"}} {snapshot["checkouts"]}')
+    lines.append(f'db_pool_wait_seconds_sum {snapshot["wait_seconds_total"]}')
+    lines.append(f'db_pool_wait_seconds_count {snapshot["checkouts"]}')
+    return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
+
+
+def instrument(app):
+    """Registers the request hooks on a Flask app."""
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_started = time.perf_counter()
+        g.sql_stats = SqlStats()
+        g.sql_stats_token = _current.set(g.sql_stats)
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        stats = g.sql_stats
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        # Streamed bodies have no length up front and count as 0
+        response_bytes = response.content_length or 0
+        request_metrics.observe((route, request.method, response.status_code), elapsed, stats, response_bytes)
+
+        if config.MAX_QUERIES_PER_REQUEST and stats.statements > config.MAX_QUERIES_PER_REQUEST:
+            statements = ''.join(f'\n  {sql}' for _, sql in stats.log)
+            raise QueryBudgetExceeded(
+                f"{request.method} {route} issued {stats.statements} SQL statements "
+                f"(MAX_QUERIES_PER_REQUEST={config.MAX_QUERIES_PER_REQUEST}):{statements}"
+            )
+        if config.SERVER_TIMING:
+            response.headers['Server-Timing'] = (
+                f'db;dur={stats.seconds * 1000:.2f};desc="{stats.statements} queries", '
+                f'app;dur={elapsed * 1000:.2f}'
+            )
+        if config.SLOW_REQUEST_MS and elapsed * 1000 >= config.SLOW_REQUEST_MS:
+            statements = ''.join(f'\n  {seconds * 1000:8.2f} ms  {sql}' for seconds, sql in stats.log)
+            logger.warning(
+                "Slow request: %s %s -> %s in %.1f ms (%d SQL statements, %.1f ms SQL)%s",
+                request.method, request.full_path, response.status_code, elapsed * 1000,
+                stats.statements, stats.seconds * 1000, statements,
+            )
+        return response
+
+    @app.teardown_request
+    def end_request_metrics(exc):
+        token = g.pop('sql_stats_token', None)
+        if token is not None:
+            _current.reset(token)
@@ -0,0 +1,137 @@
+# partitions.py
+# Monthly partitions of the flights table (PostgreSQL, see airport_tracker.sql): creating
+# them ahead of the schedule, and archiving months whose flights have all finished.
+#
+# Archiving detaches a month and moves it to the flights_archive schema. Archived months
+# are always the oldest ones, so everything before archived_before() is in the archive
+# and everything after it is still attached.
+import re
+from datetime import datetime, timezone
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import bindparam, func, select, text
+
+from models import db, FlightArchive
+
+ARCHIVE_SCHEMA = 'flights_archive'
+# Flights in these states never change again
+COMPLETED_STATUSES = ('Landed', 'Cancelled', 'Diverted')
+# Wait at most this long for the table locks detaching needs; queued behind a long query,
+# DETACH would otherwise block every other flights query until it got them
+ARCHIVE_LOCK_TIMEOUT = '10s'
+_PARTITION_NAME = re.compile(r'^flights_(\d{4})_(\d{2})$')
+# There is no DEFAULT partition: a flight scheduled outside every attached month is
+# refused by PostgreSQL (check_violation, "no partition of relation ... found for row")
+MISSING_PARTITION_MESSAGE = ("No partition for this scheduled_departure; "
+                             "run 'python -m app partitions ensure' to create its month")
+
+
+def is_partitioned():
+    """True when flights is a partitioned table (PostgreSQL with airport_tracker.sql)."""
+    if db.engine.dialect.name != 'postgresql':
+        return False
+    return db.session.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('flights'))"
+    )).scalar_one()
+
+def _month_range(name):
+    match = _PARTITION_NAME.match(name)
+    start = datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)
+    return start, start + relativedelta(months=1)
+
+def list_partitions():
+    """Attached monthly partitions, oldest first, with the planner's row estimate."""
+    rows = db.session.execute(text(
+        "SELECT c.relname, c.reltuples FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('flights') ORDER BY c.relname"
+    )).all()
+    partitions = []
+    for name, reltuples in rows:
+        if not _PARTITION_NAME.match(name):
+            continue
+        start, end = _month_range(name)
+        # reltuples is -1 until the partition is first analyzed
+        partitions.append({'name': name, 'start': start, 'end': end, 'estimated_rows': max(int(reltuples), 0)})
+    return partitions
+
+def partition_months():
+    """(start, end) of every attached month, or None when flights is not partitioned."""
+    if not is_partitioned():
+        return None
+    return [(partition['start'], partition['end']) for partition in list_partitions()]
+
+def has_partition(months, scheduled_departure):
+    """Whether a flight with this scheduled_departure can be written, given partition_months()."""
+    return months is None or any(start <= scheduled_departure < end for start, end in months)
+
+def is_missing_partition(error):
+    """True for the database error raised when a row falls outside every partition."""
+    orig = getattr(error, 'orig', None)
+    # psycopg2 sets pgcode; the asyncpg adapter sets sqlstate
+    code = getattr(orig, 'pgcode', None) or getattr(orig, 'sqlstate', None)
+    return code == '23514' and 'no partition of relation' in str(orig)
+
+def create_partitions(first, last):
+    """Creates the missing partitions for the months from first through last; returns how many."""
+    created = db.session.execute(
+        text("SELECT create_flight_partitions(:first, :last)"), {'first': first, 'last': last}
+    ).scalar_one()
+    db.session.commit()
+    return created
+
+def ensure(months_ahead, now=None):
+    """Creates partitions for the current month and the next months_ahead months."""
+    now = now or datetime.now(timezone.utc)
+    return create_partitions(now, now + relativedelta(months=months_ahead))
+
+def archived_before():
+    """End of the newest archived month, or None if nothing has been archived."""
+    if db.engine.dialect.name != 'postgresql':
+        return None
+    return db.session.execute(select(func.max(FlightArchive.range_end))).scalar()
+
+
+def _archive_partition(partition, dry_run):
+    """Archives one partition unless some of its flights are unfinished; returns its report."""
+    name = partition['name']
+    report = {'partition': name, 'start': partition['start'].isoformat(), 'end': partition['end'].isoformat()}
+    db.session.execute(text(f"SET LOCAL lock_timeout = '{ARCHIVE_LOCK_TIMEOUT}'"))
+    # Blocks writes to this month only, so no flight can change status before the detach
+    db.session.execute(text(f'LOCK TABLE "{name}" IN SHARE MODE'))
+    rows, unfinished = db.session.execute(
+        text(f'SELECT count(*), count(*) FILTER (WHERE status NOT IN :statuses) FROM "{name}"')
+        .bindparams(bindparam('statuses', value=list(COMPLETED_STATUSES), expanding=True))
+    ).one()
+    report['rows'] = rows
+    if unfinished:
+        db.session.rollback()
+        return {**report, 'action': 'blocked', 'unfinished': unfinished}
+    if dry_run:
+        db.session.rollback()
+        return {**report, 'action': 'would archive'}
+
+    # Detaching fires no delete triggers: rollups keep the month, the change feed
+    # records no tombstones, and the rows stay queryable in the archive schema
+    db.session.execute(text(f'ALTER TABLE flights DETACH PARTITION "{name}"'))
+    db.session.execute(text(f'ALTER TABLE "{name}" SET SCHEMA {ARCHIVE_SCHEMA}'))
+    db.session.add(FlightArchive(partition_name=name, range_start=partition['start'],
+                                 range_end=partition['end'], row_count=rows))
+    db.session.commit()
+    return {**report, 'action': 'archived'}
+
+def archive(retention, now=None, dry_run=False):
+    """Archives the months that ended more than retention (a timedelta) ago, oldest first.
+
+    Stops at the first month that still has unfinished flights, so archived months stay
+    a contiguous prefix of the timeline. Returns one report dict per month considered.
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - retention
+    reports = []
+    for partition in list_partitions():
+        if partition['end'] > cutoff:
+            break
+        report = _archive_partition(partition, dry_run)
+        reports.append(report)
+        if report['action'] == 'blocked':
+            break
+    return reports
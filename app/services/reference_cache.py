@@ -0,0 +1,127 @@
+# reference_cache.py
+# Read-through cache for the small, rarely changing airlines/airports tables.
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from database import config
+from database.routing import use_primary
+from models import db
+from services import fast_json
+
+# Key under which a table's full listing is cached
+ALL = '*'
+
+
+class ReferenceCache:
+    """Bounded LRU cache with a TTL, holding to_dict() snapshots of reference rows.
+
+    Each worker process has its own cache, so the TTL bounds how long another
+    worker's writes can go unseen. Writes in this process call invalidate().
+    """
+
+    def __init__(self, max_entries, ttl, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Bumped on every invalidation so a load that raced with a write is not stored
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], self._generations.get(key[0], 0)
+            self.misses += 1
+            return None, self._generations.get(key[0], 0)
+
+    def _store(self, key, value, generation):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                return
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, model, identifier):
+        """Returns the row as a dict, or None if it does not exist."""
+        key = (model.__tablename__, identifier)
+        value, generation = self._lookup(key)
+        if value is not None:
+            return value
+        # Shared by every request, so never filled from a replica that may lag behind
+        with use_primary():
+            obj = db.session.get(model, identifier)
+        if obj is None:
+            return None
+        value = obj.to_dict()
+        self._store(key, value, generation)
+        return value
+
+    def peek(self, model, identifier):
+        """Returns (cached dict or None, generation) without touching the database.
+
+        For callers with their own session (asgi.py): on a miss, load the row and
+        hand it back with fill() using the same generation.
+        """
+        return self._lookup((model.__tablename__, identifier))
+
+    def fill(self, model, identifier, value, generation):
+        self._store((model.__tablename__, identifier), value, generation)
+
+    def exists(self, model, identifier):
+        return self.get(model, identifier) is not None
+
+    def get_all(self, model):
+        """Returns (JSON body bytes, etag) for the whole table."""
+        key = (model.__tablename__, ALL)
+        value, generation = self._lookup(key)
+        if value is not None:
+            return value
+        serializer = fast_json.SERIALIZERS[model]
+        with use_primary():
+            body = serializer.dumps(db.session.execute(serializer.statement()).all())
+        value = (body, hashlib.sha1(body).hexdigest())
+        self._store(key, value, generation)
+        return value
+
+    def invalidate(self, model, identifier=None):
+        """Drops one row (or the whole table if identifier is None) and the table's listing."""
+        table = model.__tablename__
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            if identifier is None:
+                for key in [k for k in self._entries if k[0] == table]:
+                    del self._entries[key]
+            else:
+                self._entries.pop((table, identifier), None)
+                self._entries.pop((table, ALL), None)
+
+    def clear(self):
+        with self._lock:
+            for table in {k[0] for k in self._entries} | set(self._generations):
+                self._generations[table] = self._generations.get(table, 0) + 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+            }
+
+
+reference_cache = ReferenceCache(config.REFERENCE_CACHE_MAX_ENTRIES, config.REFERENCE_CACHE_TTL)
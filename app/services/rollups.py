@@ -0,0 +1,174 @@
+# rollups.py
+# On-time performance statistics served from the flight_rollups table, plus the full
+# recomputation used to rebuild it and to check the trigger-maintained counters.
+from datetime import datetime, timedelta, timezone
+
+from dateutil import parser
+from sqlalchemy import BigInteger, and_, cast, except_, extract, func, insert, literal, or_, select, text, union_all
+
+from models import db, Flight, FlightRollup
+from services import partitions
+
+# A departure/arrival within this long after schedule is on time (the DOT definition)
+ON_TIME_THRESHOLD = timedelta(minutes=15)
+BUCKETS = ('day', 'hour')
+DEFAULT_RANGE = timedelta(days=7)
+MAX_BUCKETS = 2000
+# Upper bound on a flight's duration: arrival buckets this far past the archive boundary
+# can still include flights from archived months
+MAX_FLIGHT_DURATION = timedelta(days=1)
+COUNTERS = (
+    'flights', 'delayed', 'cancelled', 'diverted',
+    'departures_reported', 'departures_on_time', 'departure_delay_seconds',
+    'arrivals_reported', 'arrivals_on_time', 'arrival_delay_seconds',
+)
+
+
+# --- Full recomputation ---
+
+def _delay_seconds(actual, scheduled):
+    # Rounded per flight, exactly as apply_flight_rollups() does in airport_tracker.sql
+    return func.coalesce(func.sum(cast(func.greatest(extract('epoch', actual - scheduled), 0), BigInteger)), 0)
+
+def _scope_statement(scope, entity, bucket_time, since):
+    bucket = func.date_trunc('hour', bucket_time, 'UTC')
+    statement = select(
+        literal(scope).label('scope'),
+        entity.label('entity_id'),
+        bucket.label('bucket'),
+        func.count().label('flights'),
+        func.count().filter(Flight.status == 'Delayed').label('delayed'),
+        func.count().filter(Flight.status == 'Cancelled').label('cancelled'),
+        func.count().filter(Flight.status == 'Diverted').label('diverted'),
+        func.count(Flight.actual_departure).label('departures_reported'),
+        func.count().filter(Flight.actual_departure <= Flight.scheduled_departure + ON_TIME_THRESHOLD)
+            .label('departures_on_time'),
+        _delay_seconds(Flight.actual_departure, Flight.scheduled_departure).label('departure_delay_seconds'),
+        func.count(Flight.actual_arrival).label('arrivals_reported'),
+        func.count().filter(Flight.actual_arrival <= Flight.scheduled_arrival + ON_TIME_THRESHOLD)
+            .label('arrivals_on_time'),
+        _delay_seconds(Flight.actual_arrival, Flight.scheduled_arrival).label('arrival_delay_seconds'),
+    ).group_by(entity, bucket)
+    # since is hour-aligned, so this keeps exactly the buckets from since on
+    return statement.where(bucket_time >= since) if since else statement
+
+def recompute_statement(since=None):
+    """Rollup rows (for buckets from since on, if given) computed from scratch with GROUP BY over flights."""
+    return union_all(
+        _scope_statement('airline', Flight.airline_id, Flight.scheduled_departure, since),
+        _scope_statement('departure_airport', Flight.departure_airport, Flight.scheduled_departure, since),
+        _scope_statement('arrival_airport', Flight.arrival_airport, Flight.scheduled_arrival, since),
+    )
+
+def recomputable_since():
+    """First bucket that can be recomputed from flights alone, or None for all of them.
+
+    Rollups for archived months (services/partitions.py) are kept but can no longer be
+    recomputed, so rebuild and check leave them alone.
+    """
+    archived_before = partitions.archived_before()
+    return archived_before + MAX_FLIGHT_DURATION if archived_before else None
+
+def rebuild():
+    """Replaces flight_rollups with a full recomputation; returns the number of rows written.
+
+    Buckets before recomputable_since() (archived months) are kept as they are.
+
+    Flight writes are blocked (SHARE lock) until the transaction commits, so no trigger
+    update can land between the recomputation and the swap.
+    """
+    # Scans all of flights: exempt from the pool's statement_timeout (DB_STATEMENT_TIMEOUT_MS)
+    db.session.execute(text("SET LOCAL statement_timeout = 0"))
+    db.session.execute(text("LOCK TABLE flights IN SHARE MODE"))
+    since = recomputable_since()
+    clear = FlightRollup.__table__.delete()
+    db.session.execute(clear.where(FlightRollup.bucket >= since) if since else clear)
+    result = db.session.execute(
+        insert(FlightRollup).from_select(('scope', 'entity_id', 'bucket') + COUNTERS, recompute_statement(since))
+    )
+    db.session.commit()
+    return result.rowcount
+
+def check(limit=20):
+    """Compares flight_rollups with a full recomputation.
+
+    Returns (mismatched row count, up to limit examples as (source, row) pairs), where
+    source says which side has the row: 'expected' (recomputed) or 'stored'.
+    All-zero stored rows, left behind when a bucket's last flight goes away, are ignored,
+    and so are buckets before recomputable_since() (archived months).
+    """
+    # One snapshot for both queries. Set before recomputable_since() runs the transaction's
+    # first query, after which PostgreSQL no longer accepts an isolation level
+    db.session.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+    db.session.execute(text("SET LOCAL statement_timeout = 0"))
+    columns = [getattr(FlightRollup, name) for name in ('scope', 'entity_id', 'bucket') + COUNTERS]
+    since = recomputable_since()
+    stored = select(*columns).where(or_(*(column != 0 for column in columns[3:])))
+    if since:
+        stored = stored.where(FlightRollup.bucket >= since)
+    expected = recompute_statement(since)
+    missing = except_(expected, stored).subquery()
+    extra = except_(stored, expected).subquery()
+    differences = union_all(
+        select(literal('expected').label('source'), missing),
+        select(literal('stored').label('source'), extra),
+    ).subquery()
+
+    count = db.session.execute(select(func.count()).select_from(differences)).scalar_one()
+    examples = db.session.execute(select(differences).limit(limit)).all()
+    db.session.rollback()
+    return count, [(row.source, row) for row in examples]
+
+
+# --- Queries ---
+
+def parse_stats_args(args):
+    """Returns (start, end, bucket) for the /stats endpoints; raises ValueError with a client-facing message."""
+    bucket = args.get('bucket', BUCKETS[0])
+    if bucket not in BUCKETS:
+        raise ValueError(f"Invalid bucket. Use one of {', '.join(BUCKETS)}.")
+    try:
+        end = parser.isoparse(args['to']) if args.get('to') else datetime.now(timezone.utc)
+        start = parser.isoparse(args['from']) if args.get('from') else end - DEFAULT_RANGE
+    except ValueError:
+        raise ValueError("Invalid timestamp format. Use ISO 8601 format.")
+    start = start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+    end = end if end.tzinfo else end.replace(tzinfo=timezone.utc)
+    if start >= end:
+        raise ValueError("from must be earlier than to")
+    if (end - start) / timedelta(**{f'{bucket}s': 1}) > MAX_BUCKETS:
+        raise ValueError(f"Range too large: at most {MAX_BUCKETS} {bucket} buckets per request")
+    return start, end, bucket
+
+def buckets_statement(scope, entity_id, start, end, bucket):
+    """Summed counters per hour or per UTC day for one airline/airport, oldest first."""
+    start_of = FlightRollup.bucket if bucket == 'hour' else func.date_trunc('day', FlightRollup.bucket, 'UTC')
+    return select(
+        start_of.label('start'),
+        *(func.sum(getattr(FlightRollup, name)).label(name) for name in COUNTERS),
+    ).where(
+        and_(FlightRollup.scope == scope, FlightRollup.entity_id == entity_id,
+             FlightRollup.bucket >= start, FlightRollup.bucket < end)
+    ).group_by(start_of).order_by(start_of)
+
+def summarize(counters):
+    """Counters plus the derived rates and average delays (None when nothing was reported)."""
+    counters = {name: int(counters[name] or 0) for name in COUNTERS}
+    summary = {name: counters[name] for name in ('flights', 'delayed', 'cancelled', 'diverted')}
+    for leg in ('departure', 'arrival'):
+        reported = counters[f'{leg}s_reported']
+        summary[f'{leg}s_reported'] = reported
+        summary[f'on_time_{leg}_rate'] = round(counters[f'{leg}s_on_time'] / reported, 4) if reported else None
+        summary[f'avg_{leg}_delay_minutes'] = (
+            round(counters[f'{leg}_delay_seconds'] / reported / 60, 2) if reported else None
+        )
+    return summary
+
+def performance(scope, entity_id, start, end, bucket):
+    """Totals and per-bucket summaries for one airline/airport over [start, end)."""
+    rows = db.session.execute(buckets_statement(scope, entity_id, start, end, bucket)).all()
+    totals = {name: sum(getattr(row, name) or 0 for row in rows) for name in COUNTERS}
+    return {
+        "totals": summarize(totals),
+        "buckets": [{"start": row.start.isoformat(), **summarize(row._mapping)} for row in rows],
+    }
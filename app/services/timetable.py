@@ -0,0 +1,261 @@
+# timetable.py
+# In-memory flight timetable and multi-leg itinerary search for GET /itineraries.
+# Flights are kept as parallel arrays sorted by scheduled departure and searched with
+# the Connection Scan Algorithm: one forward pass over the departures in the search
+# window, tracking the earliest arrival at each airport per number of legs flown.
+import bisect
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from dateutil import parser
+from sqlalchemy import select
+
+from database import config
+from database.routing import use_primary
+from models import db, Flight
+
+DEFAULT_MAX_LEGS = 3
+MAX_LEGS = 4
+DEFAULT_MIN_CONNECTION_MINUTES = 45
+# Departures considered after depart_after; bounds the scan for unreachable destinations
+SEARCH_WINDOW = timedelta(hours=48)
+LOAD_BATCH_SIZE = 10000
+INF = float('inf')
+
+
+def parse_itinerary_args(args):
+    """Returns (origin, destination, depart_after, max_legs, min_connection) for GET /itineraries.
+
+    Raises ValueError with a client-facing message.
+    """
+    origin = args.get('from')
+    destination = args.get('to')
+    if not origin or not destination:
+        raise ValueError("from and to are required")
+    if origin == destination:
+        raise ValueError("from and to must be different airports")
+
+    if args.get('depart_after'):
+        try:
+            depart_after = parser.isoparse(args['depart_after'])
+        except ValueError:
+            raise ValueError("Invalid timestamp format. Use ISO 8601 format.")
+        if depart_after.tzinfo is None:
+            depart_after = depart_after.replace(tzinfo=timezone.utc)
+    else:
+        depart_after = datetime.now(timezone.utc)
+
+    try:
+        max_legs = int(args.get('max_legs', DEFAULT_MAX_LEGS))
+    except ValueError:
+        max_legs = 0
+    if not 1 <= max_legs <= MAX_LEGS:
+        raise ValueError(f"max_legs must be an integer between 1 and {MAX_LEGS}")
+
+    try:
+        minutes = int(args.get('min_connection', DEFAULT_MIN_CONNECTION_MINUTES))
+    except ValueError:
+        minutes = -1
+    if minutes < 0:
+        raise ValueError("min_connection must be a non-negative number of minutes")
+    return origin, destination, depart_after, max_legs, timedelta(minutes=minutes)
+
+
+class Timetable:
+    """Non-cancelled flights as connections (departure, arrival, from, to, flight_id).
+
+    Loaded from the flights table on first use. Writes in this process are applied in
+    place (a sorted insert/delete on each array); each worker holds its own copy, so
+    the TTL bounds how long another worker's writes go unseen.
+    """
+
+    def __init__(self, ttl, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.loaded = False
+        self._expires = 0.0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Epoch seconds, sorted by departure
+        self.departures = array('d')
+        self.arrivals = array('d')
+        # Airports are interned to small integers
+        self.origins = array('l')
+        self.destinations = array('l')
+        self.flight_ids = array('q')
+        self.airport_numbers = {}
+        self.airport_codes = []
+        self._departure_of = {}  # flight_id -> departure, to find a flight's slot
+
+    def _airport_number(self, code):
+        number = self.airport_numbers.get(code)
+        if number is None:
+            number = self.airport_numbers[code] = len(self.airport_codes)
+            self.airport_codes.append(code)
+        return number
+
+    def load_rows(self, rows):
+        """Replaces the timetable with rows of (flight_id, from, to, departure, arrival),
+        already sorted by departure."""
+        self._reset()
+        for flight_id, origin, destination, departure, arrival in rows:
+            departure = departure.timestamp()
+            self.departures.append(departure)
+            self.arrivals.append(arrival.timestamp())
+            self.origins.append(self._airport_number(origin))
+            self.destinations.append(self._airport_number(destination))
+            self.flight_ids.append(flight_id)
+            self._departure_of[flight_id] = departure
+        self.loaded = True
+        self._expires = self.clock() + self.ttl
+
+    def _load(self):
+        query = select(
+            Flight.flight_id, Flight.departure_airport, Flight.arrival_airport,
+            Flight.scheduled_departure, Flight.scheduled_arrival,
+        ).where(Flight.status != 'Cancelled').order_by(Flight.scheduled_departure, Flight.flight_id)
+        # From the primary: the timetable outlives the request and must not start out behind
+        with use_primary():
+            self.load_rows(db.session.execute(query.execution_options(yield_per=LOAD_BATCH_SIZE)))
+
+    def _ensure_loaded(self):
+        if not self.loaded or self._expires <= self.clock():
+            self._load()
+
+    def _insert(self, flight_id, origin, destination, departure, arrival):
+        position = bisect.bisect_right(self.departures, departure)
+        self.departures.insert(position, departure)
+        self.arrivals.insert(position, arrival)
+        self.origins.insert(position, self._airport_number(origin))
+        self.destinations.insert(position, self._airport_number(destination))
+        self.flight_ids.insert(position, flight_id)
+        self._departure_of[flight_id] = departure
+
+    def _delete(self, flight_id):
+        departure = self._departure_of.pop(flight_id, None)
+        if departure is None:
+            return
+        position = bisect.bisect_left(self.departures, departure)
+        while self.flight_ids[position] != flight_id:
+            position += 1
+        for column in (self.departures, self.arrivals, self.origins, self.destinations, self.flight_ids):
+            del column[position]
+
+    def upsert(self, flight):
+        """Applies a created or updated flight (its to_dict())."""
+        with self._lock:
+            if not self.loaded:
+                return  # The first search reads the table
+            self._delete(flight['flight_id'])
+            if flight['status'] != 'Cancelled':
+                self._insert(
+                    flight['flight_id'], flight['departure_airport'], flight['arrival_airport'],
+                    parser.isoparse(flight['scheduled_departure']).timestamp(),
+                    parser.isoparse(flight['scheduled_arrival']).timestamp(),
+                )
+
+    def contains(self, flight_id):
+        with self._lock:
+            return flight_id in self._departure_of
+
+    def remove(self, flight_id):
+        with self._lock:
+            if self.loaded:
+                self._delete(flight_id)
+
+    def invalidate(self):
+        """Reloads from the table on the next search (e.g. after a bulk ingest)."""
+        with self._lock:
+            self.loaded = False
+
+    def search(self, origin, destination, depart_after, max_legs, min_connection):
+        """Returns itineraries as lists of flight_ids, one per leg count that arrives earlier
+        than every itinerary with fewer legs (the Pareto front of legs vs arrival), earliest
+        arrival first.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            source = self.airport_numbers.get(origin)
+            target = self.airport_numbers.get(destination)
+            if source is None or target is None:
+                return []
+
+            departures, arrivals = self.departures, self.arrivals
+            origins, destinations = self.origins, self.destinations
+            start = depart_after.timestamp()
+            transfer = min_connection.total_seconds()
+            horizon = start + SEARCH_WINDOW.total_seconds()
+
+            # labels[airport][legs]: earliest arrival there using exactly that many legs.
+            # The destination is kept apart (arrived[legs]) so nothing boards from it.
+            labels = [None] * len(self.airport_codes)
+            labels[source] = [start] + [INF] * max_legs
+            arrived = [INF] * (max_legs + 1)
+            # cutoff[legs]: earliest arrival at the destination with at most that many legs.
+            # Boarding a flight that leaves after cutoff[legs + 1] cannot improve on it.
+            cutoff = [INF] * (max_legs + 1)
+            parents = {}  # (airport, legs) -> connection index of the last leg
+
+            end = bisect.bisect_right(departures, horizon)
+            for i in range(bisect.bisect_left(departures, start), end):
+                reached = labels[origins[i]]
+                if reached is None:
+                    continue
+                departure = departures[i]
+                if departure >= cutoff[1]:
+                    break  # A nonstop already arrived; every later itinerary is worse
+                for legs in range(max_legs):
+                    if departure >= cutoff[legs + 1]:
+                        break
+                    # Connections need min_connection on the ground; the first leg does not
+                    ready = reached[legs] if legs == 0 else reached[legs] + transfer
+                    if ready > departure:
+                        continue
+                    there = destinations[i]
+                    arrival = arrivals[i]
+                    if there == target:
+                        if arrival < arrived[legs + 1]:
+                            arrived[legs + 1] = arrival
+                            parents[(there, legs + 1)] = i
+                            for more in range(legs + 1, max_legs + 1):
+                                cutoff[more] = min(cutoff[more], arrival)
+                    else:
+                        best = labels[there]
+                        if best is None:
+                            best = labels[there] = [INF] * (max_legs + 1)
+                        if arrival < best[legs + 1]:
+                            best[legs + 1] = arrival
+                            parents[(there, legs + 1)] = i
+                    # Boarding with fewer legs dominates boarding the same flight with more
+                    break
+
+            itineraries = []
+            best_arrival = INF
+            for legs in range(1, max_legs + 1):
+                if arrived[legs] < best_arrival:
+                    best_arrival = arrived[legs]
+                    itineraries.append(self._journey(parents, target, legs))
+            itineraries.reverse()
+            return itineraries
+
+    def _journey(self, parents, target, legs):
+        flight_ids = []
+        airport = target
+        while legs:
+            i = parents[(airport, legs)]
+            flight_ids.append(self.flight_ids[i])
+            airport = self.origins[i]
+            legs -= 1
+        flight_ids.reverse()
+        return flight_ids
+
+    def stats(self):
+        with self._lock:
+            return {"flights": len(self.departures), "airports": len(self.airport_codes), "ttl_seconds": self.ttl}
+
+
+timetable = Timetable(config.TIMETABLE_TTL)
@@ -0,0 +1,292 @@
+# write_behind.py
+# Optional write-behind mode for flight telemetry (WRITE_BEHIND=true). Updates that only
+# touch status/actual times are merged per flight in memory (last write wins per field)
+# and written in batches by a background thread, with one set-based UPDATE per batch
+# (services/bulk.py). Trackers resending the same flight many times a minute then cost
+# one row write per flush instead of one transaction per request.
+#
+# The buffer is per process: reads see pending updates only in the worker that accepted
+# them, and pending updates are lost if the process dies without a clean shutdown.
+#
+# Accepting an update reads nothing: the 202 body is the flight's last known row (kept
+# for WRITE_BEHIND_ROW_TTL seconds and refreshed by every flush that writes it) with the
+# pending fields applied. Only a flight with no known row is read from the database.
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from dateutil import parser
+
+from database import config
+from models import db, FLIGHT_STATUSES
+from services import bulk
+
+logger = logging.getLogger(__name__)
+
+# Fields a request may change for it to be buffered; anything else is written directly
+TELEMETRY_FIELDS = ('status', 'actual_departure', 'actual_arrival')
+
+
+class BufferFull(Exception):
+    """Raised when a new flight would exceed the buffer's capacity (HTTP 429)."""
+
+
+def parse_telemetry(data):
+    """Column values for a telemetry-only update, or None if data changes other fields.
+
+    Raises ValueError with a client-facing message, since buffered updates cannot report
+    errors once accepted.
+    """
+    if not data or not set(data) <= set(TELEMETRY_FIELDS):
+        return None
+    if 'status' in data and data['status'] not in FLIGHT_STATUSES:
+        raise ValueError(f"Invalid status. Use one of {', '.join(FLIGHT_STATUSES)}.")
+    fields = {}
+    try:
+        if 'status' in data:
+            fields['status'] = data['status']
+        for field in ('actual_departure', 'actual_arrival'):
+            if field in data:
+                fields[field] = parser.isoparse(data[field]) if data[field] else None
+    except (TypeError, ValueError):
+        raise ValueError("Invalid timestamp format. Use ISO 8601 format.")
+    return fields
+
+def overlay(flight_data, fields):
+    """A flight's to_dict() with pending fields applied."""
+    return {
+        **flight_data,
+        **{field: value.isoformat() if hasattr(value, 'isoformat') else value for field, value in fields.items()},
+    }
+
+
+class WriteBehindBuffer:
+    """Pending telemetry per flight, flushed on size (flush_size flights) or age (flush_interval)."""
+
+    def __init__(self, max_flights, flush_size, flush_interval, row_ttl=60.0, clock=time.monotonic):
+        self.max_flights = max_flights
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.row_ttl = row_ttl
+        self.clock = clock
+        self._condition = threading.Condition()
+        self._pending = OrderedDict()  # flight_id -> (fields, first accepted at), oldest first
+        self._flushing = {}  # flight_id -> fields being written right now
+        self._rows = OrderedDict()  # flight_id -> (expires at, to_dict()), least recently used first
+        self._app = None
+        self._on_flushed = None
+        self._worker = None
+        self._worker_pid = None
+        self._stopping = False
+        self._counters = {
+            'accepted': 0,  # Updates accepted into the buffer
+            'coalesced': 0,  # Updates merged into an already pending flight: row writes saved
+            'rejected': 0,  # Updates refused because the buffer was full
+            'flushed_rows': 0,  # Rows written by flushes
+            'flushes': 0,  # Flush UPDATE statements
+            'flush_failures': 0,  # Failed flushes (their updates are requeued)
+            'dropped': 0,  # Updates for flights deleted before they were flushed
+            'row_hits': 0,  # Updates accepted without reading the flight
+            'row_misses': 0,  # Updates that had to read the flight first
+        }
+
+    def configure(self, app, on_flushed=None):
+        """app provides the database session; on_flushed gets the updated flights' to_dict()."""
+        self._app = app
+        self._on_flushed = on_flushed
+
+    def submit(self, flight_id, fields):
+        """Merges fields into the flight's pending update; raises BufferFull."""
+        with self._condition:
+            self._ensure_worker()
+            entry = self._pending.get(flight_id)
+            if entry is None:
+                if len(self._pending) >= self.max_flights:
+                    self._counters['rejected'] += 1
+                    self._condition.notify()
+                    raise BufferFull()
+                self._pending[flight_id] = (dict(fields), self.clock())
+            else:
+                entry[0].update(fields)
+                self._counters['coalesced'] += 1
+            self._counters['accepted'] += 1
+            if len(self._pending) >= self.flush_size:
+                self._condition.notify()
+
+    def known_row(self, flight_id):
+        """The flight's last known to_dict(), or None if it has to be read from the database."""
+        with self._condition:
+            entry = self._rows.get(flight_id)
+            if entry is None or entry[0] <= self.clock():
+                self._counters['row_misses'] += 1
+                return None
+            self._rows.move_to_end(flight_id)
+            self._counters['row_hits'] += 1
+            return entry[1]
+
+    def remember(self, flight_data):
+        """Keeps a flight's to_dict() for known_row(); returns it."""
+        with self._condition:
+            self._remember(flight_data)
+        return flight_data
+
+    def _remember(self, flight_data):
+        if self.row_ttl <= 0:
+            return
+        self._rows[flight_data['flight_id']] = (self.clock() + self.row_ttl, flight_data)
+        self._rows.move_to_end(flight_data['flight_id'])
+        while len(self._rows) > self.max_flights:
+            self._rows.popitem(last=False)
+
+    def pending_for(self, flight_id):
+        """Fields accepted but not yet committed for a flight, or None (read-your-writes)."""
+        with self._condition:
+            entry = self._pending.get(flight_id)
+            if entry is None and flight_id not in self._flushing:
+                return None
+            return {**self._flushing.get(flight_id, {}), **(entry[0] if entry else {})}
+
+    def take(self, flight_id):
+        """Removes and returns a flight's pending fields (or None) before a direct write.
+
+        Waits for an in-progress flush of the flight, so it cannot commit older values
+        over the direct write. The flight's known row is dropped, since the write changes it.
+        """
+        with self._condition:
+            while flight_id in self._flushing:
+                self._condition.wait()
+            self._rows.pop(flight_id, None)
+            entry = self._pending.pop(flight_id, None)
+            return entry[0] if entry else None
+
+    def flush(self, everything=False):
+        """Writes the oldest flush_size pending flights (all of them with everything=True).
+
+        Returns False if a write failed; its updates are back in the buffer.
+        """
+        while True:
+            with self._condition:
+                count = len(self._pending) if everything else min(len(self._pending), self.flush_size)
+                batch = [self._pending.popitem(last=False) for _ in range(min(count, self.flush_size))]
+                self._flushing.update((flight_id, fields) for flight_id, (fields, _) in batch)
+            if not batch:
+                return True
+            try:
+                written = self._write(batch)
+            finally:
+                with self._condition:
+                    for flight_id, _ in batch:
+                        self._flushing.pop(flight_id, None)
+                    self._condition.notify_all()
+            if not written or not everything:
+                return written
+
+    def _write(self, batch):
+        rows = [(index, {'flight_id': flight_id, **fields}) for index, (flight_id, (fields, _)) in enumerate(batch)]
+        try:
+            with self._app.app_context():
+                try:
+                    # Same semantics as PATCH /flights/<id>: no transition checks
+                    results, flights = bulk.apply_status_batch(rows, check_transitions=False)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+        except Exception:
+            logger.exception("Write-behind flush of %d flights failed; requeued", len(batch))
+            with self._condition:
+                self._counters['flush_failures'] += 1
+                # Back to the front, oldest first
+                for flight_id, (fields, accepted_at) in reversed(batch):
+                    # Updates accepted since the batch was taken are newer and win
+                    newer = self._pending.pop(flight_id, None)
+                    merged = {**fields, **newer[0]} if newer else fields
+                    self._pending[flight_id] = (merged, accepted_at)
+                    self._pending.move_to_end(flight_id, last=False)
+            return False
+
+        with self._condition:
+            self._counters['flushes'] += 1
+            self._counters['flushed_rows'] += len(flights)
+            self._counters['dropped'] += sum(result['result'] == 'not_found' for result in results)
+            for result in results:
+                if result['result'] == 'not_found':
+                    self._rows.pop(result['flight_id'], None)
+            for flight_data in flights:
+                self._remember(flight_data)
+        if flights and self._on_flushed:
+            self._on_flushed(flights)
+        return True
+
+    def _due(self):
+        if not self._pending:
+            return False
+        oldest = next(iter(self._pending.values()))[1]
+        return len(self._pending) >= self.flush_size or self.clock() - oldest >= self.flush_interval
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopping and not self._due():
+                    if self._pending:
+                        oldest = next(iter(self._pending.values()))[1]
+                        timeout = max(0.0, oldest + self.flush_interval - self.clock())
+                    else:
+                        timeout = self.flush_interval
+                    self._condition.wait(timeout)
+                stopping = self._stopping
+            written = self.flush(everything=stopping)
+            if stopping:
+                return
+            if not written:
+                # Database trouble: retry after a pause instead of spinning
+                with self._condition:
+                    self._condition.wait(self.flush_interval)
+
+    def _ensure_worker(self):
+        # Started lazily in the process that takes requests: threads do not survive the
+        # fork from a preloading master, which never takes requests itself
+        if self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        self._stopping = False
+        self._worker_pid = os.getpid()
+        self._worker = threading.Thread(target=self._run, name='write-behind-flusher', daemon=True)
+        self._worker.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout=30):
+        """Flushes everything pending and stops the background thread (idempotent)."""
+        with self._condition:
+            worker = self._worker if self._worker_pid == os.getpid() else None
+            self._stopping = True
+            self._condition.notify_all()
+        if worker is not None and worker.is_alive():
+            worker.join(timeout)
+        if self._pending:
+            self.flush(everything=True)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'pending_flights': len(self._pending),
+                'max_flights': self.max_flights,
+                **self._counters,
+            }
+
+    def render(self):
+        """Prometheus lines for GET /metrics."""
+        stats = self.stats()
+        lines = ['# TYPE write_behind_pending_flights gauge', f'write_behind_pending_flights {stats["pending_flights"]}']
+        for key in self._counters:
+            lines.append(f'# TYPE write_behind_{key}_total counter')
+            lines.append(f'write_behind_{key}_total {stats[key]}')
+        return '\n'.join(lines) + '\n'
+
+
+write_behind_buffer = WriteBehindBuffer(
+    config.WRITE_BEHIND_MAX_FLIGHTS, config.WRITE_BEHIND_FLUSH_SIZE, config.WRITE_BEHIND_FLUSH_INTERVAL,
+    config.WRITE_BEHIND_ROW_TTL,
+)